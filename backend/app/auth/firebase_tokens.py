@@ -0,0 +1,205 @@
+# app/auth/firebase_tokens.py
+"""
+Offline verification of Firebase ID tokens.
+
+Google's signing certificates are kept in a local key cache that a background
+task refreshes according to the Cache-Control max-age Google sends, so checking
+a token never needs a network call. Tokens that passed verification are kept in
+a bounded LRU (keyed by the SHA-256 of the token, expiring at the token's
+`exp`), so repeated requests with the same bearer token skip the RSA check.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+
+import httpx
+from jose import jwk, jwt
+from jose.exceptions import JOSEError
+
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger("firebase_tokens")
+
+GOOGLE_CERTS_URL = os.getenv(
+    "FIREBASE_CERTS_URL",
+    "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com",
+)
+TOKEN_CACHE_SIZE = int(os.getenv("FIREBASE_TOKEN_CACHE_SIZE", "10000"))
+CLOCK_SKEW_SECONDS = int(os.getenv("FIREBASE_CLOCK_SKEW_SECONDS", "60"))
+
+# never hammer Google when an unknown kid shows up
+MIN_REFRESH_INTERVAL = 60
+# refresh a bit before the certs Google gave us expire
+REFRESH_MARGIN = 300
+DEFAULT_MAX_AGE = 3600
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class InvalidFirebaseToken(Exception):
+    pass
+
+
+class FirebaseKeyCache:
+    """kid -> prepared RSA public key, refreshed from Google's x509 endpoint."""
+
+    def __init__(self, certs_url: str = GOOGLE_CERTS_URL):
+        self.certs_url = certs_url
+        self._keys: dict = {}
+        self._expires_at = 0.0
+        self._last_fetch = 0.0
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def load(self, certs: dict[str, str], max_age: int = DEFAULT_MAX_AGE):
+        """Install a {kid: PEM certificate or public key} mapping."""
+        self._keys = {kid: jwk.construct(pem, "RS256") for kid, pem in certs.items()}
+        self._expires_at = time.time() + max_age
+
+    def get(self, kid: str):
+        return self._keys.get(kid)
+
+    @property
+    def stale(self) -> bool:
+        return time.time() >= self._expires_at
+
+    async def refresh(self, force: bool = False):
+        async with self._lock:
+            now = time.time()
+            if not force and not self.stale:
+                return
+            if force and now - self._last_fetch < MIN_REFRESH_INTERVAL:
+                return
+            self._last_fetch = now
+
+            async with httpx.AsyncClient(timeout=10) as client:
+                resp = await client.get(self.certs_url)
+                resp.raise_for_status()
+
+            match = _MAX_AGE_RE.search(resp.headers.get("cache-control", ""))
+            max_age = int(match.group(1)) if match else DEFAULT_MAX_AGE
+            self.load(resp.json(), max_age)
+            logger.info(f"Loaded {len(self._keys)} Firebase signing keys (max-age={max_age}s)")
+
+    async def get_or_fetch(self, kid: str):
+        key = self.get(kid)
+        if key is not None and not self.stale:
+            return key
+        try:
+            await self.refresh(force=key is None)
+        except Exception as e:
+            logger.warning(f"Firebase key refresh failed: {e}")
+        return self.get(kid)
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh(force=True)
+                delay = max(self._expires_at - time.time() - REFRESH_MARGIN, MIN_REFRESH_INTERVAL)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Firebase key refresh failed: {e}")
+                delay = MIN_REFRESH_INTERVAL
+            await asyncio.sleep(delay)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class VerifiedTokenCache(LRUCache):
+    """Bounded LRU of already-verified tokens, each entry dropped at its `exp`."""
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        super().__init__(maxsize)
+
+    @staticmethod
+    def key_for(id_token: str) -> str:
+        return hashlib.sha256(id_token.encode()).hexdigest()
+
+
+class FirebaseTokenVerifier:
+    def __init__(
+        self,
+        project_id: str | None,
+        keys: FirebaseKeyCache | None = None,
+        cache: VerifiedTokenCache | None = None,
+    ):
+        self.project_id = project_id
+        self.keys = keys or FirebaseKeyCache()
+        self.cache = cache or VerifiedTokenCache()
+
+    async def verify(self, id_token: str) -> dict:
+        """
+        Return the decoded claims (plus `uid`) of a valid Firebase ID token,
+        or raise InvalidFirebaseToken.
+        """
+        cache_key = VerifiedTokenCache.key_for(id_token)
+        claims = self.cache.get(cache_key)
+        if claims is not None:
+            return dict(claims)
+
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except JOSEError as e:
+            raise InvalidFirebaseToken(f"Malformed token: {e}")
+
+        if header.get("alg") != "RS256":
+            raise InvalidFirebaseToken("Unexpected token algorithm")
+
+        kid = header.get("kid")
+        if not kid:
+            raise InvalidFirebaseToken("Token has no 'kid' header")
+
+        key = await self.keys.get_or_fetch(kid)
+        if key is None:
+            raise InvalidFirebaseToken("Token signed with an unknown key")
+
+        claims = self._decode(id_token, key)
+        self.cache.put(cache_key, claims, float(claims["exp"]))
+        return dict(claims)
+
+    def _decode(self, id_token: str, key) -> dict:
+        if not self.project_id:
+            raise InvalidFirebaseToken("Firebase project id is not configured")
+
+        try:
+            claims = jwt.decode(
+                id_token,
+                key,
+                algorithms=["RS256"],
+                audience=self.project_id,
+                issuer=f"https://securetoken.google.com/{self.project_id}",
+                options={"leeway": CLOCK_SKEW_SECONDS, "require_exp": True, "require_iat": True},
+            )
+        except JOSEError as e:
+            raise InvalidFirebaseToken(str(e))
+
+        sub = claims.get("sub")
+        if not isinstance(sub, str) or not sub or len(sub) > 128:
+            raise InvalidFirebaseToken("Invalid 'sub' claim")
+
+        # jose only checks that iat is a number
+        now = time.time()
+        if claims["iat"] > now + CLOCK_SKEW_SECONDS:
+            raise InvalidFirebaseToken("Token 'iat' is in the future")
+
+        auth_time = claims.get("auth_time")
+        if auth_time is not None and auth_time > now + CLOCK_SKEW_SECONDS:
+            raise InvalidFirebaseToken("Token 'auth_time' is in the future")
+
+        claims["uid"] = sub
+        return claims
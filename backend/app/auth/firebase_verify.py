@@ -1,17 +1,25 @@
 # app/auth/firebase_verify.py
+import os
 import firebase_admin
 from firebase_admin import credentials, auth
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
 from typing import Optional
 from fastapi import Depends, HTTPException, Request, status, Header
 
-from app.database import get_db
+from app.database import get_async_db
+from app.auth.firebase_tokens import FirebaseTokenVerifier, InvalidFirebaseToken
+from app.auth import user_cache
+from app.auth.user_cache import UserSnapshot
 
 # Initialize Firebase Admin once
 cred = credentials.Certificate("app/firebase_service_account.json")
 firebase_admin.initialize_app(cred)
 
+# ID tokens are checked offline against cached Google signing keys
+token_verifier = FirebaseTokenVerifier(os.getenv("FIREBASE_PROJECT_ID") or cred.project_id)
+
 
 async def verify_firebase_token(token_or_request: Optional[str | Request] = None):
     """
@@ -35,9 +43,8 @@ async def verify_firebase_token(token_or_request: Optional[str | Request] = None
         raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
 
     try:
-        decoded_token = auth.verify_id_token(id_token)
-        return decoded_token
-    except Exception as e:
+        return await token_verifier.verify(id_token)
+    except InvalidFirebaseToken as e:
         raise HTTPException(status_code=401, detail=f"Invalid Firebase token: {str(e)}")
     
 
@@ -51,25 +58,39 @@ async def get_current_firebase_user(request: Request) -> dict:
     id_token = auth_header.split("Bearer ", 1)[1].strip()
 
     try:
-        decoded = auth.verify_id_token(id_token)
-        return decoded
-    except Exception as e:
+        return await token_verifier.verify(id_token)
+    except InvalidFirebaseToken as e:
         raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
 
 
 async def get_current_user(
     request: Request,
-    db: Session = Depends(get_db)
-) -> User:
-    """Get the actual User model from database based on Firebase token."""
+    db: AsyncSession = Depends(get_async_db)
+) -> UserSnapshot:
+    """
+    Resolve the SQL user behind the Firebase token.
+    Memoized on the request and served from the user cache across requests,
+    so the steady state issues no query.
+    """
+    current = getattr(request.state, "current_user", None)
+    if current is not None:
+        return current
+
     firebase_data = await get_current_firebase_user(request)
+    firebase_uid = firebase_data["uid"]
     email = firebase_data.get("email")
-    
-    if not email:
-        raise HTTPException(status_code=401, detail="No email in Firebase token")
-    
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found in database")
-    
-    return user
\ No newline at end of file
+
+    current = user_cache.get(firebase_uid)
+    if current is None:
+        user = await db.scalar(select(User).where(User.firebase_uid == firebase_uid))
+        if not user:
+            if not email:
+                raise HTTPException(status_code=401, detail="No email in Firebase token")
+            # older rows were created before we stored firebase_uid
+            user = await db.scalar(select(User).where(User.email == email))
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found in database")
+        current = user_cache.put(user, firebase_uid)
+
+    request.state.current_user = current
+    return current
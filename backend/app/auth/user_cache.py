@@ -0,0 +1,70 @@
+# app/auth/user_cache.py
+"""
+In-process cache of `firebase_uid -> UserSnapshot`.
+
+Authenticated routes only need a handful of User columns, so we keep an
+immutable snapshot of them instead of querying `Users` on every request.
+Every code path that writes a User row must call `invalidate(firebase_uid)`.
+Entries also expire after USER_CACHE_TTL seconds, which bounds staleness
+across uvicorn workers (each worker has its own cache). Roles are changed
+in the database directly, so authorization checks (app.deps) read them fresh
+rather than from the snapshot.
+"""
+import os
+from dataclasses import dataclass
+
+from app.models.user import User
+from app.utils.cache import LRUCache
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "300"))
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    user_id: int
+    firebase_uid: str | None
+    email: str
+    username: str
+    first_name: str | None
+    last_name: str | None
+    role: str | None
+    is_verified: bool | None
+
+
+def snapshot_from_user(user: User) -> UserSnapshot:
+    return UserSnapshot(
+        user_id=user.user_id,
+        firebase_uid=user.firebase_uid,
+        email=user.email,
+        username=user.username,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        role=user.role,
+        is_verified=user.is_verified,
+    )
+
+
+_users = LRUCache(USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
+def get(firebase_uid: str) -> UserSnapshot | None:
+    return _users.get(firebase_uid)
+
+
+def put(user: User | UserSnapshot, firebase_uid: str | None = None) -> UserSnapshot:
+    """Cache a snapshot of `user`; `firebase_uid` overrides the key for legacy rows without one."""
+    snapshot = user if isinstance(user, UserSnapshot) else snapshot_from_user(user)
+    key = firebase_uid or snapshot.firebase_uid
+    if key:
+        _users.put(key, snapshot)
+    return snapshot
+
+
+def invalidate(firebase_uid: str | None):
+    if firebase_uid:
+        _users.pop(firebase_uid)
+
+
+def clear():
+    _users.clear()
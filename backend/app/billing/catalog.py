@@ -0,0 +1,142 @@
+# app/billing/catalog.py
+"""
+In-memory snapshot of the active product catalog.
+
+Checkout and the public price list read SKUs from an immutable snapshot
+instead of querying Products. A background task probes the catalog version
+(max(updated_at) and row count) every CATALOG_REFRESH_INTERVAL seconds and
+reloads only when it changed; writes through the ORM in this process mark
+the snapshot stale right away (see `invalidate`).
+"""
+import asyncio
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Mapping
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.database import AsyncSessionLocal
+from app.models.product import Product
+
+logger = logging.getLogger("billing")
+
+CATALOG_REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", "30"))
+
+
+@dataclass(frozen=True)
+class ProductSnapshot:
+    sku: str
+    name: str
+    description: str | None
+    unit_amount_cents: int
+    currency: str
+    stripe_price_id: str | None
+    stripe_product_id: str | None
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: tuple[datetime | None, int]
+    products: Mapping[str, ProductSnapshot]
+    etag: str
+
+
+def _probe(db: Session) -> tuple[datetime | None, int]:
+    return tuple(db.execute(select(func.max(Product.updated_at), func.count(Product.id))).one())
+
+
+def _load(db: Session) -> CatalogSnapshot:
+    version = _probe(db)
+    rows = db.scalars(
+        select(Product).where(Product.is_active == True).order_by(Product.sku)  # noqa: E712
+    ).all()
+    products = {
+        p.sku: ProductSnapshot(
+            sku=p.sku,
+            name=p.name,
+            description=p.description,
+            unit_amount_cents=p.unit_amount_cents,
+            currency=p.currency,
+            stripe_price_id=p.stripe_price_id,
+            stripe_product_id=p.stripe_product_id,
+        )
+        for p in rows
+    }
+    digest = hashlib.sha256(
+        repr(sorted((s.sku, s.name, s.description, s.unit_amount_cents, s.currency) for s in products.values())).encode()
+    ).hexdigest()[:32]
+    return CatalogSnapshot(version=version, products=MappingProxyType(products), etag=f'"{digest}"')
+
+
+class ProductCatalog:
+    def __init__(self, session_factory=AsyncSessionLocal, refresh_interval: float = CATALOG_REFRESH_INTERVAL):
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self._snapshot: CatalogSnapshot | None = None
+        self._stale = True
+        self._task: asyncio.Task | None = None
+
+    def load(self, db: Session) -> CatalogSnapshot:
+        self._stale = False
+        self._snapshot = _load(db)
+        return self._snapshot
+
+    def snapshot(self, db: Session) -> CatalogSnapshot:
+        """Current snapshot; `db` is only used when it has to be (re)loaded."""
+        if self._stale or self._snapshot is None:
+            return self.load(db)
+        return self._snapshot
+
+    def get_many(self, db: Session, skus: list[str]) -> dict[str, ProductSnapshot]:
+        """Active products among `skus`, by SKU."""
+        products = self.snapshot(db).products
+        return {sku: products[sku] for sku in skus if sku in products}
+
+    def invalidate(self):
+        """Reload on next use, e.g. after editing products."""
+        self._stale = True
+
+    def refresh_if_changed(self, db: Session) -> bool:
+        if self._snapshot is not None and not self._stale and _probe(db) == self._snapshot.version:
+            return False
+        self.load(db)
+        return True
+
+    async def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                async with self.session_factory() as db:
+                    if await db.run_sync(self.refresh_if_changed):
+                        logger.info(f"Product catalog reloaded ({len(self._snapshot.products)} active)")
+            except Exception:
+                logger.exception("Product catalog refresh failed")
+
+
+catalog = ProductCatalog()
+
+
+# ORM writes in this process don't have to wait for the version probe
+@event.listens_for(Product, "after_insert")
+@event.listens_for(Product, "after_update")
+@event.listens_for(Product, "after_delete")
+def _product_changed(mapper, connection, target):
+    catalog.invalidate()
@@ -0,0 +1,192 @@
+# app/billing/inbox.py
+"""
+Applies Stripe events recorded in the StripeEvents inbox.
+
+The webhook only verifies and stores each event (deduplicated by Stripe's
+event id) and returns; the processor here leases unprocessed events oldest
+first, runs the handler for their type and stamps processed_at. Handlers are
+idempotent, and an event is marked processed only after its handler has
+committed, so a crash at any point leads to a re-run, never to a lost or a
+doubled effect. Failures are retried with backoff until they succeed.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from app.crud import outbox as crud_outbox
+from app.crud import payment as crud_payment
+from app.crud import stripe_event as crud_stripe_event
+from app.crud import ticket as crud_ticket
+from app.database import AsyncSessionLocal
+from app.mail.outbox import outbox_worker
+from app.models.user import User
+
+logger = logging.getLogger("billing")
+
+STRIPE_EVENT_BATCH_SIZE = int(os.getenv("STRIPE_EVENT_BATCH_SIZE", "20"))
+STRIPE_EVENT_POLL_INTERVAL = float(os.getenv("STRIPE_EVENT_POLL_INTERVAL", "5"))
+STRIPE_EVENT_RETRY_BASE = float(os.getenv("STRIPE_EVENT_RETRY_BASE", "5"))
+STRIPE_EVENT_RETRY_MAX = float(os.getenv("STRIPE_EVENT_RETRY_MAX", "600"))
+STRIPE_EVENT_LEASE_SECONDS = float(os.getenv("STRIPE_EVENT_LEASE_SECONDS", "120"))
+
+
+def apply_checkout_completed(db: Session, session: dict):
+    """
+    Mark the payment paid, issue its tickets and queue their email (all idempotent),
+    in one transaction. Returns True when the payment was found.
+    """
+    session_id = session.get("id")
+    payment_intent = session.get("payment_intent")
+    session_metadata = session.get("metadata") or {}
+
+    payment = None
+    if session_id:
+        payment = crud_payment.get_payment_by_stripe_session_id(db, session_id)
+
+    if not payment and session_metadata.get("payment_id"):
+        payment = crud_payment.get_payment_by_id(db, int(session_metadata["payment_id"]))
+
+    if not payment:
+        return False
+
+    # Mark paid (idempotent)
+    if payment.status != "paid":
+        crud_payment.mark_payment_paid(db, payment.id, payment_intent_id=payment_intent, commit=False)
+
+    # Create tickets only once (idempotent)
+    tickets = crud_ticket.issue_tickets_for_payment(db, payment, commit=False)
+
+    user = db.query(User).filter_by(firebase_uid=payment.firebase_uid).first()
+    if user and user.email and tickets:
+        # one email per payment; a replay finds the existing row and adds nothing
+        crud_outbox.enqueue_email(
+            db,
+            kind="tickets",
+            dedupe_key=f"tickets:{payment.id}",
+            recipient=user.email,
+            payload={
+                "event_name": tickets[0].event_name,
+                "tickets": [
+                    {"ticket_code": t.ticket_code, "event_name": t.event_name, "ticket_type": t.ticket_type}
+                    for t in tickets
+                ],
+            },
+        )
+    db.commit()
+    return True
+
+
+# event type -> handler(db, event["data"]["object"]); other types are recorded and skipped
+HANDLERS = {
+    "checkout.session.completed": apply_checkout_completed,
+}
+
+
+class ProcessorStats:
+    def __init__(self):
+        self.processed = 0
+        self.failures = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+
+    def record(self, lag: float):
+        self.processed += 1
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.total_lag += lag
+
+    def snapshot(self) -> dict:
+        # lag = receive (webhook insert) -> processed
+        return {
+            "processed": self.processed,
+            "failures": self.failures,
+            "lag_last_ms": round(self.last_lag * 1000, 1),
+            "lag_max_ms": round(self.max_lag * 1000, 1),
+            "lag_avg_ms": round(self.total_lag / self.processed * 1000, 1) if self.processed else 0.0,
+        }
+
+
+class StripeEventProcessor:
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        batch_size: int = STRIPE_EVENT_BATCH_SIZE,
+        poll_interval: float = STRIPE_EVENT_POLL_INTERVAL,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.stats = ProcessorStats()
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        # unprocessed events stay in the inbox for the next start
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def notify(self):
+        """Wake the processor now instead of at the next poll (a new event was stored)."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                claimed = await self.process_due()
+            except Exception:
+                logger.exception("Stripe event pass failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def process_due(self) -> int:
+        """Lease one batch of events and apply them in order; returns the batch size."""
+        async with self.session_factory() as db:
+            events = await db.run_sync(
+                crud_stripe_event.claim_due_events, self.batch_size, STRIPE_EVENT_LEASE_SECONDS
+            )
+            for event in events:
+                await db.run_sync(self._apply, event)
+        return len(events)
+
+    def _apply(self, db: Session, event):
+        handler = HANDLERS.get(event.type)
+        try:
+            if handler is not None:
+                handler(db, json.loads(event.payload)["data"]["object"])
+        except Exception as e:
+            db.rollback()
+            delay = min(STRIPE_EVENT_RETRY_BASE * 2 ** (event.attempts - 1), STRIPE_EVENT_RETRY_MAX)
+            crud_stripe_event.mark_event_failed(db, event.event_id, repr(e), delay)
+            self.stats.failures += 1
+            logger.exception(f"Stripe event {event.event_id} ({event.type}) failed, retrying in {delay}s")
+            return
+
+        processed_at = crud_stripe_event.mark_event_processed(db, event.event_id)
+        self.stats.record((processed_at - event.received_at).total_seconds())
+        if event.type == "checkout.session.completed":
+            outbox_worker.notify()
+
+
+stripe_event_processor = StripeEventProcessor()
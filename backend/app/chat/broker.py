@@ -0,0 +1,145 @@
+# app/chat/broker.py
+"""
+Pub/sub brokers for chat fan-out.
+
+A message is published once per chat; every worker that has a participant of
+that chat connected is subscribed to it and delivers the message to its own
+sockets. InProcessBroker is enough for a single worker, RedisBroker (or any
+Redis-protocol server, including one listening on a unix:// socket) lets
+several uvicorn workers share chats.
+"""
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("chat")
+
+# (chat_id, serialized payload) -> None
+MessageHandler = Callable[[int, str], Awaitable[None]]
+
+
+class ChatBroker(ABC):
+    """Interface every backend implements."""
+
+    @abstractmethod
+    async def start(self, handler: MessageHandler):
+        ...
+
+    @abstractmethod
+    async def stop(self):
+        ...
+
+    @abstractmethod
+    async def subscribe(self, chat_id: int):
+        ...
+
+    @abstractmethod
+    async def unsubscribe(self, chat_id: int):
+        ...
+
+    @abstractmethod
+    async def publish(self, chat_id: int, data: str):
+        ...
+
+
+class InProcessBroker(ChatBroker):
+    def __init__(self):
+        self._handler: MessageHandler | None = None
+        self._channels: set[int] = set()
+
+    async def start(self, handler: MessageHandler):
+        self._handler = handler
+
+    async def stop(self):
+        self._channels.clear()
+        self._handler = None
+
+    async def subscribe(self, chat_id: int):
+        self._channels.add(chat_id)
+
+    async def unsubscribe(self, chat_id: int):
+        self._channels.discard(chat_id)
+
+    async def publish(self, chat_id: int, data: str):
+        if self._handler is not None and chat_id in self._channels:
+            await self._handler(chat_id, data)
+
+
+class RedisBroker(ChatBroker):
+    def __init__(self, url: str, prefix: str = "chat:", client=None):
+        """`client` replaces the connection made from `url` (an asyncio Redis with decode_responses=True)."""
+        self.url = url
+        self.prefix = prefix
+        if client is None:
+            from redis import asyncio as aioredis
+
+            client = aioredis.from_url(url, decode_responses=True)
+        self._redis = client
+        self._pubsub = self._redis.pubsub()
+        self._handler: MessageHandler | None = None
+        self._has_channels = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def _channel(self, chat_id: int) -> str:
+        return f"{self.prefix}{chat_id}"
+
+    async def start(self, handler: MessageHandler):
+        self._handler = handler
+        self._task = asyncio.get_running_loop().create_task(self._reader())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._pubsub.aclose()
+        await self._redis.aclose()
+
+    async def subscribe(self, chat_id: int):
+        await self._pubsub.subscribe(self._channel(chat_id))
+        self._has_channels.set()
+
+    async def unsubscribe(self, chat_id: int):
+        await self._pubsub.unsubscribe(self._channel(chat_id))
+
+    async def publish(self, chat_id: int, data: str):
+        await self._redis.publish(self._channel(chat_id), data)
+
+    async def _reader(self):
+        while True:
+            if not self._pubsub.subscribed:
+                self._has_channels.clear()
+                await self._has_channels.wait()
+                continue
+
+            try:
+                msg = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # redis-py re-subscribes our channels when the connection comes back
+                logger.warning(f"Chat broker read failed: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            if msg is None or msg.get("type") != "message":
+                continue
+
+            chat_id = int(msg["channel"][len(self.prefix):])
+            try:
+                await self._handler(chat_id, msg["data"])
+            except Exception:
+                logger.exception(f"Chat delivery failed chat={chat_id}")
+
+
+def create_broker(url: str | None) -> ChatBroker:
+    """Empty url -> in-process broker; redis://, rediss:// or unix:// -> RedisBroker."""
+    if not url:
+        return InProcessBroker()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(url)
+    raise ValueError(f"Unsupported CHAT_BROKER_URL: {url}")
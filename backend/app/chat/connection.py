@@ -0,0 +1,90 @@
+# app/chat/connection.py
+import asyncio
+import logging
+import os
+
+from fastapi import WebSocket
+
+logger = logging.getLogger("chat")
+
+SEND_QUEUE_SIZE = int(os.getenv("CHAT_SEND_QUEUE_SIZE", "100"))
+# what to do when a client can't keep up: "drop_oldest" or "disconnect"
+SEND_OVERFLOW_POLICY = os.getenv("CHAT_SEND_OVERFLOW", "drop_oldest")
+
+# 1013 = "try again later"
+OVERFLOW_CLOSE_CODE = 1013
+
+
+class ChatConnection:
+    """
+    One WebSocket with its own bounded outbound queue and writer task, so a
+    slow or dead client only ever delays itself.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        queue_size: int = SEND_QUEUE_SIZE,
+        overflow: str = SEND_OVERFLOW_POLICY,
+    ):
+        if overflow not in ("drop_oldest", "disconnect"):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.websocket = websocket
+        self.overflow = overflow
+        self.dropped = 0
+        self.closed = False
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        self._task = asyncio.get_running_loop().create_task(self._writer())
+        # held so the loop's weak reference isn't the only one
+        self._close_task: asyncio.Task | None = None
+
+    def offer(self, data: str):
+        """Queue already-serialized data without waiting on the socket."""
+        if self.closed:
+            return
+        try:
+            self._queue.put_nowait(data)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        if self.overflow == "disconnect":
+            logger.info("WS send queue full, disconnecting slow client")
+            self._close(OVERFLOW_CLOSE_CODE)
+            return
+
+        self._queue.get_nowait()
+        self._queue.put_nowait(data)
+        self.dropped += 1
+
+    async def _writer(self):
+        try:
+            while True:
+                data = await self._queue.get()
+                await self.websocket.send_text(data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"WS send failed: {e}")
+            self.closed = True
+
+    def _close(self, code: int):
+        self.closed = True
+        self._task.cancel()
+        self._close_task = asyncio.get_running_loop().create_task(self._safe_close(code))
+
+    async def _safe_close(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    async def stop(self):
+        self.closed = True
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        if self._close_task is not None:
+            await self._close_task
@@ -0,0 +1,61 @@
+# app/chat/hub.py
+import json
+import os
+
+from fastapi import WebSocket
+
+from app.chat.broker import ChatBroker, create_broker
+from app.chat.connection import ChatConnection
+
+
+class ChatHub:
+    """
+    Sockets connected to *this* worker, grouped by chat.
+    The worker subscribes to a chat on the broker while it holds at least one
+    of its participants and delivers whatever the broker hands back.
+    """
+
+    def __init__(self, broker: ChatBroker):
+        self.broker = broker
+        self._local: dict[int, set[ChatConnection]] = {}
+
+    async def start(self):
+        await self.broker.start(self._deliver)
+
+    async def stop(self):
+        await self.broker.stop()
+        # snapshot: socket handlers may leave() while we await
+        for connection in [c for connections in self._local.values() for c in connections]:
+            await connection.stop()
+        self._local.clear()
+
+    async def join(self, chat_id: int, websocket: WebSocket) -> ChatConnection:
+        connection = ChatConnection(websocket)
+        connections = self._local.setdefault(chat_id, set())
+        first = not connections
+        connections.add(connection)
+        if first:
+            await self.broker.subscribe(chat_id)
+        return connection
+
+    async def leave(self, chat_id: int, connection: ChatConnection):
+        await connection.stop()
+        connections = self._local.get(chat_id)
+        if connections is None:
+            return
+        connections.discard(connection)
+        if not connections:
+            del self._local[chat_id]
+            await self.broker.unsubscribe(chat_id)
+
+    async def publish(self, chat_id: int, payload: dict):
+        # serialized once here, whatever the number of receivers
+        await self.broker.publish(chat_id, json.dumps(payload, default=str))
+
+    async def _deliver(self, chat_id: int, data: str):
+        # never awaits a socket: each connection's writer task does the sending
+        for connection in self._local.get(chat_id, ()):
+            connection.offer(data)
+
+
+hub = ChatHub(create_broker(os.getenv("CHAT_BROKER_URL")))
@@ -0,0 +1,198 @@
+# app/chat/persistence.py
+"""
+Write-behind persistence for chat messages.
+
+The WebSocket handler gets the message id and timestamp back immediately and
+can broadcast right away; a single writer task drains the queue and flushes
+messages to ChatMessages (through the async engine) in multi-row INSERTs
+whenever MESSAGE_BATCH_SIZE messages are waiting or MESSAGE_FLUSH_INTERVAL
+has passed.
+
+Messages have already been broadcast when they are queued, so while the
+writer runs a failed flush is retried with capped backoff for as long as it
+takes; the bounded queue pushes back on senders meanwhile. Once `stop()` is
+draining, a batch gets MESSAGE_FLUSH_ATTEMPTS more attempts and everything
+has to be written within MESSAGE_SHUTDOWN_TIMEOUT; what isn't is dropped and
+its ids are logged.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.crud.chat import get_existing_messages, save_messages_bulk
+from app.database import AsyncSessionLocal
+from app.utils.ids import id_generator
+
+logger = logging.getLogger("chat")
+
+MESSAGE_BATCH_SIZE = int(os.getenv("CHAT_MESSAGE_BATCH_SIZE", "200"))
+MESSAGE_FLUSH_INTERVAL = float(os.getenv("CHAT_MESSAGE_FLUSH_INTERVAL", "0.05"))
+MESSAGE_QUEUE_SIZE = int(os.getenv("CHAT_MESSAGE_QUEUE_SIZE", "10000"))
+MESSAGE_FLUSH_ATTEMPTS = int(os.getenv("CHAT_MESSAGE_FLUSH_ATTEMPTS", "8"))
+MESSAGE_SHUTDOWN_TIMEOUT = float(os.getenv("CHAT_MESSAGE_SHUTDOWN_TIMEOUT", "10"))
+RETRY_DELAY = 0.1
+MAX_RETRY_DELAY = 5.0
+
+
+class MessageWriter:
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        batch_size: int = MESSAGE_BATCH_SIZE,
+        flush_interval: float = MESSAGE_FLUSH_INTERVAL,
+        queue_size: int = MESSAGE_QUEUE_SIZE,
+        flush_attempts: int = MESSAGE_FLUSH_ATTEMPTS,
+        shutdown_timeout: float = MESSAGE_SHUTDOWN_TIMEOUT,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.flush_attempts = flush_attempts
+        self.shutdown_timeout = shutdown_timeout
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self._deadline: float | None = None
+        # messages that could not be written; see _write
+        self.dropped = 0
+        self.conflicts = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._stopping = False
+        self._deadline = None
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop accepting messages and wait until everything queued is written,
+        or dropped once shutdown_timeout has passed.
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        self._deadline = asyncio.get_running_loop().time() + self.shutdown_timeout
+        await self._task
+        self._task = None
+
+    async def submit(self, chat_id: int, sender_uid: str, content: str) -> dict:
+        """
+        Queue a message and return its row (with message_id and timestamp).
+        Waits when the queue is full, which pushes back on the sender.
+        """
+        if self._task is None or self._stopping:
+            raise RuntimeError("Message writer is not running")
+
+        message = {
+            "message_id": id_generator.next_id(),
+            "chat_id": chat_id,
+            "sender_uid": sender_uid,
+            "content": content,
+            "timestamp": datetime.utcnow().replace(microsecond=0),
+        }
+        await self._queue.put(message)
+        return message
+
+    def _time_left(self) -> float:
+        if self._deadline is None:
+            return float("inf")
+        return self._deadline - asyncio.get_running_loop().time()
+
+    def _drop(self, batch: list[dict], reason: str):
+        self.dropped += len(batch)
+        logger.error(f"Dropping {len(batch)} chat messages ({reason}): ids {[m['message_id'] for m in batch]}")
+
+    async def _run(self):
+        while True:
+            if self._stopping and self._time_left() <= 0:
+                left = []
+                while not self._queue.empty():
+                    left.append(self._queue.get_nowait())
+                if left:
+                    self._drop(left, "shutdown timeout")
+                return
+            batch = await self._next_batch()
+            if batch:
+                await self._flush(batch)
+            elif self._stopping:
+                return
+
+    async def _next_batch(self) -> list[dict]:
+        batch: list[dict] = []
+        try:
+            batch.append(await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval))
+        except asyncio.TimeoutError:
+            return batch
+
+        deadline = asyncio.get_running_loop().time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _flush(self, batch: list[dict]):
+        delay = RETRY_DELAY
+        attempt = 0
+        # attempts made since stop() began; only those are limited
+        draining_attempts = 0
+        while True:
+            attempt += 1
+            if self._stopping:
+                draining_attempts += 1
+            try:
+                async with self.session_factory() as db:
+                    await db.run_sync(self._write, batch)
+                return
+            except Exception:
+                if self._stopping and (draining_attempts >= self.flush_attempts or self._time_left() <= delay):
+                    logger.exception(f"Flushing {len(batch)} chat messages failed {attempt} times")
+                    self._drop(batch, "database unavailable at shutdown")
+                    return
+                logger.exception(f"Flushing {len(batch)} chat messages failed (attempt {attempt}), retrying in {delay}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+
+    def _write(self, db: Session, batch: list[dict]):
+        try:
+            save_messages_bulk(db, batch)
+        except IntegrityError:
+            # a previous attempt may have committed before failing, or one row
+            # is bad (e.g. its chat is gone): write what is missing row by row
+            db.rollback()
+            existing = get_existing_messages(db, [m["message_id"] for m in batch])
+            for m in batch:
+                stored = existing.get(m["message_id"])
+                if stored == (m["chat_id"], m["sender_uid"], m["content"]):
+                    continue  # written by the earlier attempt
+                if stored is not None:
+                    # same id, different message: two processes generated the same id
+                    self.conflicts += 1
+                    logger.error(
+                        f"Chat message id {m['message_id']} is already used by another message "
+                        f"(chat={stored[0]} sender={stored[1]}); dropping chat={m['chat_id']} sender={m['sender_uid']}"
+                    )
+                    continue
+                try:
+                    save_messages_bulk(db, [m])
+                except IntegrityError:
+                    db.rollback()
+                    self.dropped += 1
+                    logger.exception(f"Dropping chat message {m['message_id']} that cannot be written")
+
+
+message_writer = MessageWriter()
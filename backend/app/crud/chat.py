@@ -1,7 +1,10 @@
+from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, desc, func
+from sqlalchemy import or_, and_, desc, func, case, select, update, insert, union_all
 from app.models.chat import Chat, ChatMessage
 from app.models.user import User
+from app.utils.ids import id_generator
+from app.utils.keyset import older_than, sort_key
 
 def get_existing_chat(db: Session, ride_id: int, driver_uid: str, passenger_uid: str):
     return db.query(Chat).filter(
@@ -26,15 +29,71 @@ def create_chat(db: Session, ride_id: int, driver_uid: str, passenger_uid: str):
 
 def save_message(db: Session, chat_id: int, sender_uid: str, content: str):
     msg = ChatMessage(
+        message_id=id_generator.next_id(),
         chat_id=chat_id,
         sender_uid=sender_uid,
         content=content
     )
     db.add(msg)
+    db.flush()
+    _touch_chat(db, chat_id, msg.message_id)
     db.commit()
     db.refresh(msg)
     return msg
 
+
+def save_messages_bulk(db: Session, messages: list[dict]):
+    """
+    Persist messages that already carry message_id and timestamp with a single
+    multi-row INSERT, then move each chat's last_message_* forward once.
+    """
+    if not messages:
+        return
+
+    db.execute(insert(ChatMessage), messages)
+
+    latest: dict[int, dict] = {}
+    for m in messages:
+        current = latest.get(m["chat_id"])
+        if current is None or m["message_id"] > current["message_id"]:
+            latest[m["chat_id"]] = m
+    for m in latest.values():
+        _touch_chat(db, m["chat_id"], m["message_id"], m["timestamp"])
+
+    db.commit()
+
+
+def get_existing_messages(db: Session, message_ids: list[int]) -> dict[int, tuple[int, str, str]]:
+    """message_id -> (chat_id, sender_uid, content) for the ids already stored."""
+    rows = db.execute(
+        select(ChatMessage.message_id, ChatMessage.chat_id, ChatMessage.sender_uid, ChatMessage.content)
+        .where(ChatMessage.message_id.in_(message_ids))
+    )
+    return {r.message_id: (r.chat_id, r.sender_uid, r.content) for r in rows}
+
+
+def _touch_chat(db: Session, chat_id: int, message_id: int, timestamp: datetime | None = None):
+    """Point Chat.last_message_* at `message_id` unless a newer message is already there."""
+    if timestamp is None:
+        timestamp = (
+            select(ChatMessage.timestamp)
+            .where(ChatMessage.message_id == message_id)
+            .scalar_subquery()
+        )
+    db.execute(
+        update(Chat)
+        .where(
+            Chat.chat_id == chat_id,
+            or_(Chat.last_message_id.is_(None), Chat.last_message_id < message_id),
+        )
+        .values(
+            last_message_id=message_id,
+            last_message_at=timestamp,
+            last_activity_at=timestamp,
+        )
+    )
+
+
 def get_chat_messages(
     db: Session,
     chat_id: int,
@@ -50,51 +109,62 @@ def get_chat_messages(
         q.order_by(ChatMessage.message_id.desc()).limit(limit).all()
     )
 
-def get_user_chats(db: Session, user_uid: str):
-
-    last_message_subq = (
-        db.query(
-            ChatMessage.chat_id,
-            func.max(ChatMessage.timestamp).label("last_ts")
-        )
-        .group_by(ChatMessage.chat_id)
-        .subquery()
+def get_user_chats(
+    db: Session,
+    user_uid: str,
+    limit: int | None = 50,
+    before: tuple[datetime, int] | None = None,
+):
+    """
+    Inbox for `user_uid`, most recent activity first, in a single query.
+    `before` is the (updated_at, chat_id) of the last row of the previous page.
+    The chats the user drives and the ones they ride in are read as two
+    branches, each walking its (uid, last_activity_at, chat_id) index in order.
+    """
+    activity = sort_key(db, Chat.last_activity_at)
+
+    def branch(*where):
+        q = select(Chat.chat_id).where(*where)
+        if before is not None:
+            q = q.where(older_than(db, Chat.last_activity_at, Chat.chat_id, *before))
+        q = q.order_by(activity.desc(), Chat.chat_id.desc())
+        if limit is not None:
+            q = q.limit(limit)
+        sub = q.subquery()
+        return select(sub.c.chat_id)
+
+    page = union_all(
+        branch(Chat.driver_uid == user_uid),
+        branch(Chat.passenger_uid == user_uid, Chat.driver_uid != user_uid),
+    ).subquery("page")
+
+    other_uid = case(
+        (Chat.driver_uid == user_uid, Chat.passenger_uid),
+        else_=Chat.driver_uid,
     )
-
-    chats = (
-        db.query(Chat, last_message_subq.c.last_ts)
-        .outerjoin(last_message_subq, Chat.chat_id == last_message_subq.c.chat_id)
-        .filter(
-            or_(
-                Chat.driver_uid == user_uid,
-                Chat.passenger_uid == user_uid
-            )
+    q = (
+        select(
+            Chat.chat_id,
+            Chat.last_activity_at.label("updated_at"),
+            User.username,
+            ChatMessage.content,
+            ChatMessage.sender_uid,
         )
-        .order_by(desc(last_message_subq.c.last_ts))
-        .all()
+        .join(page, page.c.chat_id == Chat.chat_id)
+        .outerjoin(ChatMessage, ChatMessage.message_id == Chat.last_message_id)
+        .outerjoin(User, User.firebase_uid == other_uid)
+        .order_by(desc(activity), desc(Chat.chat_id))
     )
-
-    result = []
-
-    for chat, last_ts in chats:
-        other_uid = chat.passenger_uid if chat.driver_uid == user_uid else chat.driver_uid
-
-        other_user = db.query(User).filter(User.firebase_uid == other_uid).first()
-        last_message = (
-            db.query(ChatMessage)
-            .filter(ChatMessage.chat_id == chat.chat_id)
-            .order_by(ChatMessage.message_id.desc())
-            .first()
-        )
-
-        has_new = last_message is not None and last_message.sender_uid != user_uid
-
-        result.append({
-            "chat_id": chat.chat_id,
-            "title": other_user.username if other_user else "Unknown",
-            "last_message": last_message.content if last_message else None,
-            "updated_at": last_message.timestamp if last_message else chat.created_at,
-            "has_new": has_new,
-        })
-
-    return result
\ No newline at end of file
+    if limit is not None:
+        q = q.limit(limit)
+
+    return [
+        {
+            "chat_id": row.chat_id,
+            "title": row.username or "Unknown",
+            "last_message": row.content,
+            "updated_at": row.updated_at,
+            "has_new": row.sender_uid is not None and row.sender_uid != user_uid,
+        }
+        for row in db.execute(q)
+    ]
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.id_node import IdNodeLease
+
+
+def claim_id_node(db: Session, owner: str, ttl_seconds: float, max_node: int) -> int | None:
+    """
+    Lease a node id for `owner`: an expired one if there is any, else the next
+    unused one. None when all max_node + 1 ids are held.
+    """
+    for _ in range(max_node + 1):
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl_seconds)
+        stale = db.scalar(
+            select(IdNodeLease.node_id)
+            .where(IdNodeLease.expires_at < now)
+            .order_by(IdNodeLease.node_id)
+            .limit(1)
+        )
+        if stale is not None:
+            taken = db.execute(
+                update(IdNodeLease)
+                .where(IdNodeLease.node_id == stale, IdNodeLease.expires_at < now)
+                .values(owner=owner, expires_at=expires_at)
+            ).rowcount
+            db.commit()
+            if taken:
+                return stale
+            continue  # another process took it first
+
+        # ids are handed out densely from 0, so the row count is the next free one
+        next_node = db.scalar(select(func.count(IdNodeLease.node_id)))
+        if next_node > max_node:
+            return None
+        db.add(IdNodeLease(node_id=next_node, owner=owner, expires_at=expires_at))
+        try:
+            db.commit()
+            return next_node
+        except IntegrityError:
+            db.rollback()
+    return None
+
+
+def renew_id_node(db: Session, node_id: int, owner: str, ttl_seconds: float) -> bool:
+    """Extend our lease; False if it is no longer ours."""
+    renewed = db.execute(
+        update(IdNodeLease)
+        .where(IdNodeLease.node_id == node_id, IdNodeLease.owner == owner)
+        .values(expires_at=datetime.utcnow() + timedelta(seconds=ttl_seconds))
+    ).rowcount
+    db.commit()
+    return renewed == 1
+
+
+def release_id_node(db: Session, node_id: int, owner: str):
+    db.execute(
+        update(IdNodeLease)
+        .where(IdNodeLease.node_id == node_id, IdNodeLease.owner == owner)
+        .values(expires_at=datetime.utcnow())
+    )
+    db.commit()
@@ -0,0 +1,73 @@
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.outbox import EmailOutbox
+
+
+def enqueue_email(db: Session, kind: str, dedupe_key: str, recipient: str, payload: dict):
+    """
+    Add an outbox row unless one with `dedupe_key` exists. Does not commit:
+    the caller commits it together with whatever caused the email.
+    """
+    existing = db.scalar(select(EmailOutbox.id).where(EmailOutbox.dedupe_key == dedupe_key))
+    if existing is not None:
+        return None
+    row = EmailOutbox(
+        kind=kind,
+        dedupe_key=dedupe_key,
+        recipient=recipient,
+        payload=json.dumps(payload),
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.add(row)
+    return row
+
+
+def claim_due_emails(db: Session, limit: int, lease_seconds: float) -> list[EmailOutbox]:
+    """
+    Lease up to `limit` due rows to the caller: their next_attempt_at moves to
+    the end of the lease, so other workers skip them, and a worker that dies
+    mid-send releases them when the lease runs out.
+    """
+    now = datetime.utcnow()
+    rows = db.scalars(
+        select(EmailOutbox)
+        .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    lease_until = now + timedelta(seconds=lease_seconds)
+    for row in rows:
+        row.attempts += 1
+        row.next_attempt_at = lease_until
+    db.commit()
+    return rows
+
+
+def mark_email_sent(db: Session, outbox_id: int):
+    db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id == outbox_id)
+        .values(status="sent", sent_at=datetime.utcnow(), last_error=None)
+    )
+    db.commit()
+
+
+def mark_email_failed(db: Session, outbox_id: int, error: str, retry_in: float | None):
+    """Schedule another attempt in `retry_in` seconds, or give up when it is None."""
+    values = {"last_error": error[:500]}
+    if retry_in is None:
+        values["status"] = "failed"
+    else:
+        values["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=retry_in)
+    db.execute(update(EmailOutbox).where(EmailOutbox.id == outbox_id).values(**values))
+    db.commit()
+
+
+def count_emails_by_status(db: Session) -> dict[str, int]:
+    rows = db.execute(select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)).all()
+    return {status: n for status, n in rows}
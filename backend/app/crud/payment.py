@@ -1,7 +1,8 @@
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from app.models.payment import Payment
-from app.models.ticket import Ticket, TicketStatus
-import uuid
+from app.models.ticket import TicketStatus
+from app.crud.ticket import issue_tickets
 from datetime import datetime
 import json
 
@@ -10,42 +11,48 @@ import json
 # PAYMENT CRUD
 # -------------------------
 
-def create_pending_payment_for_cart(db: Session, firebase_uid: str, items: list[dict]):
+def create_pending_payment_for_cart(db: Session, firebase_uid: str, items: list[dict], commit: bool = True):
     """
-    Creates a Payment row in pending state.
-    'items' is list of {sku, quantity} or anything you want to store later.
-    For now we keep it minimal: just create the payment.
+    Creates a Payment row in pending state with its resolved cart in items_json.
+    With commit=False it is only flushed (so the id is known), for callers
+    that commit it together with their own writes.
     """
     p = Payment(
         firebase_uid=firebase_uid,
         status="pending",
+        items_json=json.dumps(items),
     )
     db.add(p)
-    db.commit()
-    db.refresh(p)
+    if commit:
+        db.commit()
+        db.refresh(p)
+    else:
+        db.flush()
     return p
 
-def attach_stripe_session_to_payment(db: Session, payment_id: int, session_id: str):
-    p = db.query(Payment).filter(Payment.id == payment_id).first()
-    if not p:
-        return None
-    p.stripe_session_id = session_id
+def attach_stripe_session_to_payment(db: Session, payment_id: int, session_id: str) -> bool:
+    """Single UPDATE; returns False when the payment does not exist."""
+    result = db.execute(
+        update(Payment).where(Payment.id == payment_id).values(stripe_session_id=session_id)
+    )
     db.commit()
-    db.refresh(p)
-    return p
+    return result.rowcount > 0
 
 def get_payment_by_stripe_session_id(db: Session, session_id: str):
     return db.query(Payment).filter(Payment.stripe_session_id == session_id).first()
 
-def mark_payment_paid(db: Session, payment_id: int, payment_intent_id: str | None = None):
+def mark_payment_paid(db: Session, payment_id: int, payment_intent_id: str | None = None, commit: bool = True):
     p = db.query(Payment).filter(Payment.id == payment_id).first()
     if not p:
         return None
     p.status = "paid"
     p.stripe_payment_intent_id = payment_intent_id
     p.paid_at = datetime.utcnow()
-    db.commit()
-    db.refresh(p)
+    if commit:
+        db.commit()
+        db.refresh(p)
+    else:
+        db.flush()
     return p
 
 def get_payment_by_id(db: Session, payment_id: int):
@@ -74,27 +81,4 @@ def create_pending_tickets_for_cart(
     items_resolved: list of dicts already validated server-side, e.g.
     [{ "ticket_type": "1-Day Pass", "event_name":"RFF Festival 2025", "date":..., "price":60.00, "amount_total_cents":6000, "quantity":2 }, ...]
     """
-    created = []
-    for it in items_resolved:
-        qty = int(it["quantity"])
-        for _ in range(qty):
-            t = Ticket(
-                firebase_uid=firebase_uid,
-                payment_id=payment_id,
-                event_name=it["event_name"],
-                ticket_type=it["ticket_type"],
-                date=it["date"],
-                price=it["price"],
-                amount_total_cents=int(it["amount_total_cents"]),
-                status=TicketStatus.pending,
-                ticket_code=uuid.uuid4().hex,
-            )
-            db.add(t)
-            created.append(t)
-
-    db.commit()
-    return created
-
-
-
-
+    return issue_tickets(db, firebase_uid, payment_id, items_resolved, TicketStatus.pending)
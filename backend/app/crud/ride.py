@@ -1,5 +1,14 @@
+import os
 from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, delete, func, insert, inspect, literal, or_, select, update
 from app import models, schemas
+from app.schemas.ride import RideStatus
+from app.utils.text import location_trigrams
+from app.utils.geo import bounding_box, covering_cells, geohash_encode, haversine_km, KM_PER_DEGREE_LAT
+import math
+
+# share of the query's trigrams a location must contain to match (typo tolerance)
+RIDE_SEARCH_MIN_SIMILARITY = float(os.getenv("RIDE_SEARCH_MIN_SIMILARITY", "0.5"))
 
 
 # --- Ride CRUD ---
@@ -15,12 +24,124 @@ def search_rides(
     db: Session,
     origin: str,
     destination: str,
+    limit: int = 20,
+    offset: int = 0,
 ):
-    return db.query(models.Ride).filter(
-        models.Ride.origin.ilike(f"%{origin}%"),
-        models.Ride.destination.ilike(f"%{destination}%"),
-        models.Ride.available_seats > 0,
-    ).all()
+    """
+    Rides with free seats whose origin/destination resemble the query, best
+    match first (then earliest departure). Served from RideLocationTokens, so
+    no full scan of Rides; an empty side is not filtered on.
+    """
+    wanted = {"o": location_trigrams(origin), "d": location_trigrams(destination)}
+    wanted = {field: grams for field, grams in wanted.items() if grams}
+    if not wanted:
+        return (
+            db.query(models.Ride)
+            .filter(models.Ride.available_seats > 0)
+            .order_by(models.Ride.departure_time, models.Ride.ride_id)
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+
+    tok = models.RideLocationToken
+    hits = {
+        field: func.sum(case((tok.field == field, 1), else_=0))
+        for field in wanted
+    }
+    score = sum(hits[field] * literal(1.0 / len(grams)) for field, grams in wanted.items())
+
+    matches = (
+        select(tok.ride_id, score.label("score"))
+        .where(or_(*(and_(tok.field == field, tok.token.in_(grams)) for field, grams in wanted.items())))
+        .group_by(tok.ride_id)
+        .having(and_(*(
+            hits[field] >= max(1, round(len(grams) * RIDE_SEARCH_MIN_SIMILARITY))
+            for field, grams in wanted.items()
+        )))
+        .subquery()
+    )
+
+    return (
+        db.query(models.Ride)
+        .join(matches, matches.c.ride_id == models.Ride.ride_id)
+        .filter(models.Ride.available_seats > 0)
+        .order_by(matches.c.score.desc(), models.Ride.departure_time, models.Ride.ride_id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+
+
+def search_rides_near(
+    db: Session,
+    lat: float,
+    lng: float,
+    radius_km: float,
+    limit: int = 20,
+    offset: int = 0,
+):
+    """
+    Rides with free seats leaving within `radius_km` of (lat, lng), nearest
+    first, then earliest departure. Only the 9 geohash cells around the point
+    are read, so the cost follows local density, not the size of Rides.
+    Each ride gets a transient `distance_km` attribute.
+    """
+    Ride = models.Ride
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+
+    # equirectangular distance (km^2) is exact enough to filter and order at these scales
+    kx = KM_PER_DEGREE_LAT * math.cos(math.radians(lat))
+    dx = (Ride.origin_lng - lng) * kx
+    dy = (Ride.origin_lat - lat) * KM_PER_DEGREE_LAT
+    dist2 = dx * dx + dy * dy
+
+    rides = (
+        db.query(Ride)
+        .filter(
+            or_(*(Ride.origin_geohash.startswith(cell, autoescape=True) for cell in covering_cells(lat, lng, radius_km))),
+            Ride.origin_lat.between(min_lat, max_lat),
+            Ride.origin_lng.between(min_lng, max_lng),
+            dist2 <= radius_km * radius_km,
+            Ride.available_seats > 0,
+        )
+        .order_by(dist2, Ride.departure_time, Ride.ride_id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    for ride in rides:
+        ride.distance_km = round(haversine_km(lat, lng, ride.origin_lat, ride.origin_lng), 2)
+    return rides
+
+
+def _set_origin_point(db_ride: models.Ride, lat: float | None, lng: float | None):
+    db_ride.origin_lat = lat
+    db_ride.origin_lng = lng
+    db_ride.origin_geohash = geohash_encode(lat, lng) if lat is not None and lng is not None else None
+
+
+def index_ride_locations(db: Session, ride: models.Ride):
+    """(Re)build the search tokens of one ride; the caller commits."""
+    tok = models.RideLocationToken
+    db.execute(delete(tok).where(tok.ride_id == ride.ride_id))
+    rows = [
+        {"ride_id": ride.ride_id, "field": field, "token": token}
+        for field, value in (("o", ride.origin), ("d", ride.destination))
+        for token in location_trigrams(value)
+    ]
+    if rows:
+        db.execute(insert(tok), rows)
+
+
+def index_missing_ride_locations(db: Session) -> int:
+    """Backfill tokens for rides created before the index existed."""
+    indexed = select(models.RideLocationToken.ride_id).distinct()
+    rides = db.query(models.Ride).filter(models.Ride.ride_id.not_in(indexed)).all()
+    for ride in rides:
+        index_ride_locations(db, ride)
+    db.commit()
+    return len(rides)
 
 
 def create_ride(db: Session, ride: schemas.RideCreate, driver_id: int):
@@ -32,7 +153,10 @@ def create_ride(db: Session, ride: schemas.RideCreate, driver_id: int):
         available_seats=ride.available_seats,
         status="open",
     )
+    _set_origin_point(db_ride, ride.origin_lat, ride.origin_lng)
     db.add(db_ride)
+    db.flush()
+    index_ride_locations(db, db_ride)
     db.commit()
     db.refresh(db_ride)
     return db_ride
@@ -41,8 +165,19 @@ def create_ride(db: Session, ride: schemas.RideCreate, driver_id: int):
 def update_ride(db: Session, ride_id: int, ride: schemas.RideUpdate):
     db_ride = get_ride(db, ride_id)
     if db_ride:
-        db_ride.available_seats = ride.available_seats
-        db_ride.status = ride.status
+        changes = ride.dict(exclude_unset=True, exclude={"origin_lat", "origin_lng"})
+        point_sent = bool(ride.__fields_set__ & {"origin_lat", "origin_lng"})
+        for field, value in changes.items():
+            setattr(db_ride, field, value.value if isinstance(value, RideStatus) else value)
+        state = inspect(db_ride)
+        origin_moved = state.attrs.origin.history.has_changes()
+        if point_sent:
+            _set_origin_point(db_ride, ride.origin_lat, ride.origin_lng)
+        elif origin_moved:
+            # the old coordinates describe the old origin; drop out of proximity search
+            _set_origin_point(db_ride, None, None)
+        if origin_moved or state.attrs.destination.history.has_changes():
+            index_ride_locations(db, db_ride)
         db.commit()
         db.refresh(db_ride)
     return db_ride
@@ -97,3 +232,91 @@ def get_pending_bookings_for_ride(db: Session, ride_id: int):
         models.Booking.ride_id == ride_id,
         models.Booking.status == "pending",
     ).all()
+
+
+# --- Seat reservation ---
+class SeatReservationError(Exception):
+    pass
+
+
+def request_booking(db: Session, ride_id: int, rider_id: int, seats: int) -> bool:
+    """
+    Create a pending booking in one INSERT ... SELECT that only yields a row
+    while the ride is open and has `seats` free, so no stale read can let an
+    impossible request through. Returns False when it was rejected.
+    """
+    Ride, Booking = models.Ride, models.Booking
+    eligible = select(
+        Ride.ride_id,
+        literal(rider_id),
+        literal(seats),
+        literal("pending"),
+    ).where(
+        Ride.ride_id == ride_id,
+        Ride.available_seats >= seats,
+        Ride.status == "open",
+    )
+    result = db.execute(
+        insert(Booking).from_select(["ride_id", "rider_id", "seats_reserved", "status"], eligible)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def accept_booking(db: Session, booking: models.Booking):
+    """
+    Atomically take the booking's seats and mark it accepted.
+
+    Seats are taken with a conditional UPDATE (which also row-locks the ride,
+    serializing concurrent accepts), and pending requests that no longer fit
+    are rejected in the same transaction. The ride is always locked before its
+    bookings to keep lock order consistent. Raises SeatReservationError.
+    """
+    Ride, Booking = models.Ride, models.Booking
+    seats = booking.seats_reserved
+
+    # status is assigned first: MySQL evaluates SET left to right on updated values
+    took_seats = db.execute(
+        update(Ride)
+        .where(Ride.ride_id == booking.ride_id, Ride.available_seats >= seats)
+        .ordered_values(
+            (Ride.status, case((Ride.available_seats == seats, "full"), else_=Ride.status)),
+            (Ride.available_seats, Ride.available_seats - seats),
+        )
+    ).rowcount
+    if not took_seats:
+        db.rollback()
+        reject_booking(db, booking.booking_id)
+        raise SeatReservationError("Not enough seats left for this booking")
+
+    accepted = db.execute(
+        update(Booking)
+        .where(Booking.booking_id == booking.booking_id, Booking.status == "pending")
+        .values(status="accepted")
+    ).rowcount
+    if not accepted:
+        db.rollback()
+        raise SeatReservationError("Booking is no longer pending")
+
+    remaining = select(Ride.available_seats).where(Ride.ride_id == booking.ride_id).scalar_subquery()
+    db.execute(
+        update(Booking)
+        .where(
+            Booking.ride_id == booking.ride_id,
+            Booking.status == "pending",
+            Booking.seats_reserved > remaining,
+        )
+        .values(status="rejected")
+    )
+    db.commit()
+
+
+def reject_booking(db: Session, booking_id: int) -> bool:
+    Booking = models.Booking
+    rejected = db.execute(
+        update(Booking)
+        .where(Booking.booking_id == booking_id, Booking.status == "pending")
+        .values(status="rejected")
+    ).rowcount
+    db.commit()
+    return rejected == 1
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.stripe_event import StripeEvent
+
+
+def claim_due_events(db: Session, limit: int, lease_seconds: float) -> list[StripeEvent]:
+    """
+    Lease up to `limit` unprocessed events, oldest first. Leased rows are
+    skipped by other processors until the lease runs out.
+    """
+    now = datetime.utcnow()
+    rows = db.scalars(
+        select(StripeEvent)
+        .where(StripeEvent.processed_at.is_(None), StripeEvent.next_attempt_at <= now)
+        .order_by(StripeEvent.received_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    lease_until = now + timedelta(seconds=lease_seconds)
+    for row in rows:
+        row.attempts += 1
+        row.next_attempt_at = lease_until
+    db.commit()
+    return rows
+
+
+def mark_event_processed(db: Session, event_id: str) -> datetime:
+    processed_at = datetime.utcnow()
+    db.execute(
+        update(StripeEvent)
+        .where(StripeEvent.event_id == event_id)
+        .values(processed_at=processed_at, last_error=None)
+    )
+    db.commit()
+    return processed_at
+
+
+def mark_event_failed(db: Session, event_id: str, error: str, retry_in: float):
+    db.execute(
+        update(StripeEvent)
+        .where(StripeEvent.event_id == event_id)
+        .values(last_error=error[:500], next_attempt_at=datetime.utcnow() + timedelta(seconds=retry_in))
+    )
+    db.commit()
+
+
+def get_backlog(db: Session) -> tuple[int, datetime | None]:
+    """(unprocessed events, receive time of the oldest one)."""
+    return db.execute(
+        select(func.count(), func.min(StripeEvent.received_at)).where(StripeEvent.processed_at.is_(None))
+    ).one()
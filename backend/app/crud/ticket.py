@@ -1,7 +1,11 @@
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.models.ticket import Ticket, TicketStatus
 from app.models.payment import Payment, PaymentStatus   
-from app.schemas.ticket import TicketCreate
+from app.schemas.ticket import ScanVerdict, TicketCreate
+from app.utils.ticket_codes import is_valid_code, new_ticket_code
+from app.utils.keyset import older_than, sort_key
 import uuid
 import json
 from datetime import datetime
@@ -17,7 +21,7 @@ def create_ticket(db: Session, firebase_uid: str, ticket_data: TicketCreate):
         ticket_type=ticket_data.ticket_type,
         date=ticket_data.date,
         price=ticket_data.price,
-        ticket_code=str(uuid.uuid4())[:8].upper(),
+        ticket_code=new_ticket_code(),
         status=TicketStatus.pending,
         #payment_status=PaymentStatus.unpaid,
     )
@@ -42,12 +46,51 @@ def confirm_ticket_payment(db: Session, ticket_code: str):
 
 
 # app/crud/ticket.py
+# tickets that have been paid for, whether or not they were scanned yet
+PAID_STATUSES = (TicketStatus.active, TicketStatus.used)
+
+
 def get_user_tickets(db, firebase_uid: str, only_paid: bool = False):
     q = db.query(Ticket).filter(Ticket.firebase_uid == firebase_uid)
     if only_paid:
-        q = q.filter(Ticket.status == "paid")
+        q = q.filter(Ticket.status.in_(PAID_STATUSES))
     return q.order_by(Ticket.created_at.desc()).all()
 
+
+def list_user_tickets(
+    db: Session,
+    firebase_uid: str,
+    statuses: list[TicketStatus] | None = None,
+    limit: int = 50,
+    before: tuple[datetime, int] | None = None,
+) -> list[dict]:
+    """
+    One page of a user's tickets, newest first, as plain dicts with the
+    TicketOut fields (no ORM objects). `before` is the (created_at, id) of
+    the last row of the previous page. Served by idx_ticket_owner_created /
+    idx_ticket_owner_status_created.
+    """
+    q = select(
+        Ticket.id,
+        Ticket.firebase_uid,
+        Ticket.event_name,
+        Ticket.ticket_type,
+        Ticket.date,
+        Ticket.price,
+        Ticket.ticket_code,
+        Ticket.status,
+        Ticket.purchase_date,
+        Ticket.created_at,
+    ).where(Ticket.firebase_uid == firebase_uid)
+
+    if statuses:
+        q = q.where(Ticket.status.in_(statuses))
+    if before is not None:
+        q = q.where(older_than(db, Ticket.created_at, Ticket.id, *before))
+
+    q = q.order_by(sort_key(db, Ticket.created_at).desc(), Ticket.id.desc()).limit(limit)
+    return [row._asdict() for row in db.execute(q)]
+
 def get_ticket_by_code(db: Session, code: str):
     return db.query(Ticket).filter_by(ticket_code=code).first()
 
@@ -103,32 +146,157 @@ def activate_tickets_for_payment(db: Session, payment_id: int, payment_intent_id
 
 
 
-def create_tickets_from_payment(db: Session, payment: Payment):
-    if not getattr(payment, "items_json", None):
+def _ticket_rows(firebase_uid: str, payment_id: int, items: list[dict], status: TicketStatus) -> list[dict]:
+    rows = []
+    now = datetime.utcnow()
+    for it in items:
+        for _ in range(int(it["quantity"])):
+            rows.append({
+                "firebase_uid": firebase_uid,
+                "payment_id": payment_id,
+                "issue_seq": len(rows),
+                "event_name": it.get("event_name", "RFF Festival 2025"),
+                "ticket_type": it["ticket_type"],
+                "date": it.get("date") or now,
+                "price": it["price"],
+                "amount_total_cents": int(it["amount_total_cents"]),
+                "status": status,
+                "ticket_code": new_ticket_code(),
+            })
+    return rows
+
+
+def get_issued_tickets(db: Session, payment_id: int):
+    """(id, ticket_code, event_name, ticket_type) rows of a payment's tickets, in issue order."""
+    return db.execute(
+        select(Ticket.id, Ticket.ticket_code, Ticket.event_name, Ticket.ticket_type)
+        .where(Ticket.payment_id == payment_id)
+        .order_by(Ticket.issue_seq, Ticket.id)
+    ).all()
+
+
+def issue_tickets(
+    db: Session,
+    firebase_uid: str,
+    payment_id: int,
+    items: list[dict],
+    status: TicketStatus = TicketStatus.active,
+    commit: bool = True,
+):
+    """
+    Issue every ticket of an order in one multi-row INSERT; idempotent per payment.
+    A payment that already has tickets gets those back, and a concurrent replay
+    that loses the race trips uq_ticket_payment_seq and reads the winner's rows;
+    any other integrity error is raised.
+    With commit=False the insert runs in a savepoint of the caller's transaction.
+    """
+    existing = get_issued_tickets(db, payment_id)
+    if existing:
+        return existing
+
+    rows = _ticket_rows(firebase_uid, payment_id, items, status)
+    if not rows:
         return []
+    try:
+        if commit:
+            db.execute(insert(Ticket), rows)
+            db.commit()
+        else:
+            with db.begin_nested():
+                db.execute(insert(Ticket), rows)
+    except IntegrityError:
+        if commit:
+            db.rollback()
+        issued = get_issued_tickets(db, payment_id)
+        if not issued:
+            # not a replay (bad payment or ride, code collision): nothing was issued
+            raise
+        return issued
+    return get_issued_tickets(db, payment_id)
 
+
+def issue_tickets_for_payment(db: Session, payment: Payment, commit: bool = True):
+    """Active tickets for a paid payment, from the cart stored in items_json."""
+    if not getattr(payment, "items_json", None):
+        return []
     items = json.loads(payment.items_json)
-    created = []
+    return issue_tickets(db, payment.firebase_uid, payment.id, items, TicketStatus.active, commit=commit)
 
-    for it in items:
-        qty = int(it["quantity"])
-        for _ in range(qty):
-          t = Ticket(
-              firebase_uid=payment.firebase_uid,
-              payment_id=payment.id,
-              event_name=it.get("event_name", "RFF Festival 2025"),
-              ticket_type=it["ticket_type"],
-              date=datetime.utcnow(),
-              price=it["price"],
-              amount_total_cents=int(it["amount_total_cents"]),
-              status=TicketStatus.active,  # paid => active
-          )
-          db.add(t)
-          created.append(t)
 
+def get_tickets_by_payment_id(db: Session, payment_id: int):
+    return db.query(Ticket).filter(Ticket.payment_id == payment_id).all()
+
+
+SCAN_CHUNK_SIZE = 500
+
+_VERDICT_BY_STATUS = {
+    TicketStatus.used: ScanVerdict.already_used,
+    TicketStatus.pending: ScanVerdict.not_paid,
+    TicketStatus.cancelled: ScanVerdict.cancelled,
+}
+
+
+def scan_tickets(db: Session, codes: list[str]) -> list[tuple[str, ScanVerdict, datetime | None]]:
+    """
+    Admit tickets at the gate: one conditional UPDATE (status active -> used)
+    per chunk, so two gates can never both admit the same ticket, then one
+    SELECT to tell every code's verdict. Rows this call admitted carry its
+    scan_id. A code repeated within `codes` is admitted once and reported
+    as already used after that. Codes failing the MAC check never reach
+    the database.
+    Returns (code, verdict, used_at) in input order.
+    """
+    scan_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    unique_codes = [c for c in dict.fromkeys(codes) if is_valid_code(c)]
+    found = {}
+    for i in range(0, len(unique_codes), SCAN_CHUNK_SIZE):
+        chunk = unique_codes[i:i + SCAN_CHUNK_SIZE]
+        db.execute(
+            update(Ticket)
+            .where(Ticket.ticket_code.in_(chunk), Ticket.status == TicketStatus.active)
+            .values(status=TicketStatus.used, used_at=now, scan_id=scan_id)
+            .execution_options(synchronize_session=False)
+        )
+        found.update(
+            (row.ticket_code, row)
+            for row in db.execute(
+                select(Ticket.ticket_code, Ticket.status, Ticket.used_at, Ticket.scan_id)
+                .where(Ticket.ticket_code.in_(chunk))
+            )
+        )
     db.commit()
-    return created
 
+    results = []
+    admitted = set()
+    for code in codes:
+        row = found.get(code)
+        if row is None:
+            results.append((code, ScanVerdict.invalid, None))
+        elif row.scan_id == scan_id and code not in admitted:
+            admitted.add(code)
+            results.append((code, ScanVerdict.admitted, row.used_at))
+        else:
+            results.append((code, _VERDICT_BY_STATUS.get(row.status, ScanVerdict.already_used), row.used_at))
+    return results
 
-def get_tickets_by_payment_id(db: Session, payment_id: int):
-    return db.query(Ticket).filter(Ticket.payment_id == payment_id).all()
\ No newline at end of file
+
+def scan_ticket(db: Session, code: str) -> tuple[ScanVerdict, datetime | None]:
+    """Single-code scan: the common (admitted) case is one UPDATE and the commit."""
+    if not is_valid_code(code):
+        return ScanVerdict.invalid, None
+    now = datetime.utcnow()
+    result = db.execute(
+        update(Ticket)
+        .where(Ticket.ticket_code == code, Ticket.status == TicketStatus.active)
+        .values(status=TicketStatus.used, used_at=now, scan_id=uuid.uuid4().hex)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    if result.rowcount == 1:
+        return ScanVerdict.admitted, now
+
+    row = db.execute(select(Ticket.status, Ticket.used_at).where(Ticket.ticket_code == code)).first()
+    if row is None:
+        return ScanVerdict.invalid, None
+    return _VERDICT_BY_STATUS.get(row.status, ScanVerdict.already_used), row.used_at
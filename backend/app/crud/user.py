@@ -1,11 +1,68 @@
+import random
+import secrets
+from dataclasses import fields
 from sqlalchemy.orm import Session
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import event, func, or_, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 
 from app.models.user import User
 from app.schemas.user import UserCreate
 from app.auth.auth import hash_password
+from app.auth import user_cache
+from app.auth.user_cache import UserSnapshot
+
+USERNAME_BASE_MAX = 40  # leaves room for a suffix within the 50-char column
+USERNAME_ATTEMPTS = 3
+
+
+def _username_candidates(base: str) -> list[str]:
+    # the readable names first, then random ones so popular bases don't need more lookups
+    return (
+        [base]
+        + [f"{base}_{i}" for i in range(1, 4)]
+        + [f"{base}_{random.randint(1000, 999999)}" for _ in range(8)]
+    )
+
+
+def allocate_username(db: Session, base: str | None, exclude: set[str] = frozenset()) -> str:
+    """
+    A username derived from `base` that is free right now. All candidates are
+    checked with a single IN lookup on the unique username index, so the cost
+    doesn't depend on how many users already share the base.
+    """
+    base = (base or "").strip()[:USERNAME_BASE_MAX] or "user"
+    candidates = [c for c in _username_candidates(base) if c not in exclude]
+    taken = set(db.scalars(select(User.username).where(User.username.in_(candidates))))
+    for candidate in candidates:
+        if candidate not in taken:
+            return candidate
+    return f"{base}_{secrets.token_hex(4)}"
+
+
+def add_user_with_unique_username(db: Session, user: User, base: str | None) -> User:
+    """
+    Insert and commit `user` under a username allocated from `base`. If a
+    concurrent signup takes the same name first, another one is allocated
+    (without the lost name) and the insert retried. Other integrity errors,
+    e.g. a duplicate email, are raised.
+    """
+    exclude = set()
+    for attempt in range(USERNAME_ATTEMPTS):
+        user.username = allocate_username(db, base, exclude)
+        db.add(user)
+        try:
+            db.commit()
+            return user
+        except IntegrityError:
+            db.rollback()
+            lost = db.scalar(select(User.user_id).where(User.username == user.username))
+            if lost is None or attempt == USERNAME_ATTEMPTS - 1:
+                raise
+            exclude.add(user.username)
+
 
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
@@ -30,6 +87,57 @@ def get_user_by_firebase_uid(db: Session, firebase_uid: str) -> User | None:
         select(User).where(User.firebase_uid == firebase_uid)
     ).scalar_one_or_none()
 
+_SNAPSHOT_COLUMNS = [getattr(User, f.name) for f in fields(UserSnapshot)]
+_INSERTS = {"mysql": mysql.insert, "mariadb": mysql.insert, "sqlite": sqlite.insert, "postgresql": postgresql.insert}
+_NO_RETURNING = ("mysql", "mariadb")
+
+
+def _upsert_statement(dialect: str, values: dict, updates: list[str]):
+    """
+    One INSERT keyed on firebase_uid that, for an existing row, writes only
+    `updates` and only when they differ. Conflicts on another user's email or
+    username must not touch that row.
+    """
+    stmt = _INSERTS[dialect](User).values(**values)
+    if dialect in _NO_RETURNING:
+        # ON DUPLICATE KEY fires for every unique key, hence the firebase_uid guard;
+        # MySQL already skips the write when nothing changes
+        own_row = User.firebase_uid == stmt.inserted.firebase_uid
+        return stmt.on_duplicate_key_update(
+            {c: func.if_(own_row, stmt.inserted[c], User.__table__.c[c]) for c in updates}
+            or {"firebase_uid": User.firebase_uid}
+        )
+    if not updates:
+        return stmt.on_conflict_do_nothing(index_elements=[User.firebase_uid]).returning(*_SNAPSHOT_COLUMNS)
+    return stmt.on_conflict_do_update(
+        index_elements=[User.firebase_uid],
+        set_={c: stmt.excluded[c] for c in updates},
+        where=or_(*(User.__table__.c[c].is_distinct_from(stmt.excluded[c]) for c in updates)),
+    ).returning(*_SNAPSHOT_COLUMNS)
+
+
+def _upsert_row(db: Session, values: dict, updates: list[str]):
+    dialect = db.get_bind().dialect.name
+    statement = _upsert_statement(dialect, values, updates)
+    if dialect in _NO_RETURNING:
+        # conflicts with other users are no-ops here, nothing to catch
+        db.execute(statement)
+        row = None
+    else:
+        try:
+            # a failed statement aborts the whole transaction on PostgreSQL,
+            # and with commit=False that is the caller's transaction too
+            with db.begin_nested():
+                row = db.execute(statement).one_or_none()
+        except IntegrityError:
+            # the insert hit another user's email or username
+            return None
+    if row is None:
+        # unchanged row (no RETURNING) or MySQL, which has no RETURNING at all
+        row = db.execute(select(*_SNAPSHOT_COLUMNS).where(User.firebase_uid == values["firebase_uid"])).one_or_none()
+    return row
+
+
 def upsert_user_from_firebase(
     db: Session,
     *,
@@ -38,45 +146,60 @@ def upsert_user_from_firebase(
     username: str | None = None,
     first_name: str | None = None,
     last_name: str | None = None,
-) -> User:
+    commit: bool = True,
+) -> UserSnapshot:
     """
-    Ensure a SQL User exists for this firebase_uid.
-    Safe to call on every request (idempotent).
+    Ensure a SQL User exists for this firebase_uid and return its snapshot.
+    Safe to call on every request (idempotent) and concurrently for the same
+    user: it is a single INSERT ... ON CONFLICT / ON DUPLICATE KEY UPDATE that
+    only writes the given fields that changed (None never overwrites).
+    With commit=False the change is left in the caller's transaction.
     """
-    user = get_user_by_firebase_uid(db, firebase_uid)
-
-    if user is None:
-        user = User(
-            firebase_uid=firebase_uid,
-            email=email,
-            username=username or (email.split("@")[0] if email else None),
-            first_name=first_name,
-            last_name=last_name,
-            is_verified=True,  # if you want; or keep False if you use your own verification
-            role="user",
-        )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-        return user
-
-    # Update fields if we got new info (don’t overwrite with None)
-    changed = False
-    if email and user.email != email:
-        user.email = email
-        changed = True
-    if username and user.username != username:
-        user.username = username
-        changed = True
-    if first_name is not None and user.first_name != first_name:
-        user.first_name = first_name
-        changed = True
-    if last_name is not None and user.last_name != last_name:
-        user.last_name = last_name
-        changed = True
-
-    if changed:
+    values = {
+        "firebase_uid": firebase_uid,
+        "email": email,
+        "username": username or (email.split("@")[0] if email else None),
+        "first_name": first_name,
+        "last_name": last_name,
+        "is_verified": True,  # if you want; or keep False if you use your own verification
+        "role": "user",
+    }
+    updates = [c for c, v in (("email", email), ("username", username)) if v]
+    updates += [c for c, v in (("first_name", first_name), ("last_name", last_name)) if v is not None]
+
+    row = _upsert_row(db, values, updates)
+    if row is None:
+        # the derived username belongs to someone else; an email conflict fails again below
+        values["username"] = allocate_username(db, values["username"])
+        row = _upsert_row(db, values, updates)
+    if row is None:
+        raise ValueError(f"Cannot create user {firebase_uid}: email or username belongs to another account")
+
+    if commit:
         db.commit()
-        db.refresh(user)
+    user_cache.invalidate(firebase_uid)
+    return UserSnapshot(**row._asdict())
+
+
+def ensure_user_from_firebase(
+    db: Session,
+    *,
+    firebase_uid: str,
+    email: str | None = None,
+    commit: bool = True,
+) -> UserSnapshot:
+    """
+    Cached front for upsert_user_from_firebase: when we already hold a snapshot
+    that matches the token, no query is issued at all.
+    With commit=False the snapshot is cached only once the caller commits.
+    """
+    cached = user_cache.get(firebase_uid)
+    if cached is not None and (not email or cached.email == email):
+        return cached
+
+    snapshot = upsert_user_from_firebase(db, firebase_uid=firebase_uid, email=email, commit=commit)
+    if commit:
+        return user_cache.put(snapshot)
 
-    return user
\ No newline at end of file
+    event.listen(db, "after_commit", lambda session: user_cache.put(snapshot), once=True)
+    return snapshot
\ No newline at end of file
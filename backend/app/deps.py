@@ -1,7 +1,43 @@
 # app/deps.py
-from fastapi import HTTPException
+import os
+from fastapi import Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import ENV
+from app.database import get_async_db
+from app.auth.firebase_verify import get_current_user
+from app.auth.user_cache import UserSnapshot
+from app.models.user import User
+
+# roles allowed to scan tickets at the gates
+GATE_ROLES = {r.strip() for r in os.getenv("GATE_ROLES", "staff,admin").split(",") if r.strip()}
+# roles allowed to read the operational /api/health endpoints
+STAFF_ROLES = {r.strip() for r in os.getenv("STAFF_ROLES", "staff,admin").split(",") if r.strip()}
 
 def dev_only():
     if ENV != "dev":
         raise HTTPException(status_code=404, detail="Not found")
+
+
+async def _current_role(user: UserSnapshot, db: AsyncSession) -> str | None:
+    # roles are granted and revoked straight in the database, so the cached
+    # snapshot may be stale on any worker; one primary key lookup per staff request
+    return await db.scalar(select(User.role).where(User.user_id == user.user_id))
+
+
+async def gate_staff(
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+) -> UserSnapshot:
+    if await _current_role(current_user, db) not in GATE_ROLES:
+        raise HTTPException(status_code=403, detail="Gate staff only")
+    return current_user
+
+
+async def staff_only(
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+) -> UserSnapshot:
+    if await _current_role(current_user, db) not in STAFF_ROLES:
+        raise HTTPException(status_code=403, detail="Staff only")
+    return current_user
@@ -0,0 +1,126 @@
+# app/gate/bundle.py
+"""
+Signed ticket bundles for offline validation at the gates.
+
+A bundle is a small binary blob a scanner can check codes against without a
+connection:
+
+    magic "RFFG" | u8 format | u8 kind (0 full, 1 delta) | u64 version | u64 since
+    | u32 n_active | u32 n_used | u32 n_removed
+    | n_active * 8-byte digests | n_used * 8-byte digests | n_removed * 8-byte digests
+    | 64-byte Ed25519 signature over everything before it
+
+All integers are big-endian. A digest is the first 8 bytes of
+sha256(ticket_code); each section is sorted so the scanner can binary-search
+it. A full bundle lists every active and used ticket; a delta lists the
+tickets changed since `since`, by their current state, with tickets that are
+no longer valid (pending again, cancelled) under "removed".
+
+`version` is the highest Ticket.sync_version in the bundle; scanners pass it
+back as `since` to get the next delta.
+"""
+import base64
+import hashlib
+import logging
+import os
+import struct
+
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import ENV
+from app.models.ticket import Ticket, TicketStatus
+from app.utils.cache import LRUCache
+from app.utils.ids import NODE_BITS, SEQUENCE_BITS
+
+logger = logging.getLogger("gate")
+
+MAGIC = b"RFFG"
+FORMAT_VERSION = 1
+KIND_FULL = 0
+KIND_DELTA = 1
+DIGEST_SIZE = 8
+_HEADER = struct.Struct(">4sBBQQIII")
+
+# sync versions are handed out before commit, so a slow transaction can land
+# with a version below one already synced; deltas re-send this much history
+DELTA_OVERLAP_MS = int(os.getenv("GATE_DELTA_OVERLAP_MS", "10000"))
+
+
+def _load_signing_key() -> Ed25519PrivateKey:
+    seed = os.getenv("GATE_BUNDLE_SIGNING_KEY")
+    if seed:
+        return Ed25519PrivateKey.from_private_bytes(base64.b64decode(seed))
+    if ENV != "dev":
+        # every worker would sign with its own key and scanners would reject most bundles
+        raise RuntimeError("GATE_BUNDLE_SIGNING_KEY must be set outside dev")
+    logger.warning("GATE_BUNDLE_SIGNING_KEY is not set, signing gate bundles with a throwaway key")
+    return Ed25519PrivateKey.generate()
+
+
+signing_key = _load_signing_key()
+
+
+def public_key_b64() -> str:
+    """Raw 32-byte Ed25519 public key scanners verify bundles with."""
+    raw = signing_key.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+    return base64.b64encode(raw).decode()
+
+
+def code_digest(ticket_code: str) -> bytes:
+    return hashlib.sha256(ticket_code.encode()).digest()[:DIGEST_SIZE]
+
+
+def _encode(kind: int, version: int, since: int, active, used, removed) -> bytes:
+    sections = [sorted(code_digest(c) for c in codes) for codes in (active, used, removed)]
+    body = _HEADER.pack(MAGIC, FORMAT_VERSION, kind, version, since, *(len(s) for s in sections))
+    body += b"".join(b"".join(s) for s in sections)
+    return body + signing_key.sign(body)
+
+
+def current_version(db: Session) -> int:
+    return db.scalar(select(func.max(Ticket.sync_version))) or 0
+
+
+_full_bundles = LRUCache(maxsize=2)
+
+
+def build_full_bundle(db: Session) -> tuple[bytes, int]:
+    """(bundle, version); rebuilt only when some ticket changed since the last build."""
+    # deleting a ticket doesn't move max(sync_version) but does change the count
+    version, count = db.execute(select(func.max(Ticket.sync_version), func.count(Ticket.id))).one()
+    version = version or 0
+    cached = _full_bundles.get((version, count))
+    if cached is not None:
+        return cached, version
+
+    active, used = [], []
+    rows = db.execute(
+        select(Ticket.ticket_code, Ticket.status)
+        .where(Ticket.status.in_([TicketStatus.active, TicketStatus.used]))
+    )
+    for code, status in rows:
+        (active if status == TicketStatus.active else used).append(code)
+    bundle = _encode(KIND_FULL, version, 0, active, used, [])
+    _full_bundles.put((version, count), bundle)
+    return bundle, version
+
+
+def build_delta_bundle(db: Session, since: int) -> tuple[bytes, int]:
+    """(bundle, version) with every ticket changed after `since` (plus the overlap window)."""
+    version = current_version(db)
+    floor = max(since - (DELTA_OVERLAP_MS << (NODE_BITS + SEQUENCE_BITS)), 0)
+    active, used, removed = [], [], []
+    rows = db.execute(
+        select(Ticket.ticket_code, Ticket.status).where(Ticket.sync_version > floor)
+    )
+    for code, status in rows:
+        if status == TicketStatus.active:
+            active.append(code)
+        elif status == TicketStatus.used:
+            used.append(code)
+        else:
+            removed.append(code)
+    return _encode(KIND_DELTA, max(version, since), since, active, used, removed), max(version, since)
@@ -0,0 +1,201 @@
+# app/mail/outbox.py
+"""
+Delivery of EmailOutbox rows.
+
+Rows are committed together with the change that causes them (e.g. ticket
+issuance), so a crash or restart never loses an email. One worker task per
+process leases due rows in batches, sends them over a small pool of
+persistent SMTP connections and retries failures with exponential backoff.
+"""
+import asyncio
+import collections
+import json
+import logging
+import os
+import time
+from email.message import EmailMessage
+from email.utils import formataddr, make_msgid
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.crud import outbox as crud_outbox
+from app.database import AsyncSessionLocal
+from app.mail.smtp import SMTPPool, pool_from_env
+from app.utils.qr import qr_cache
+
+logger = logging.getLogger("mail")
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_RETRY_BASE = float(os.getenv("OUTBOX_RETRY_BASE", "30"))
+OUTBOX_RETRY_MAX = float(os.getenv("OUTBOX_RETRY_MAX", "3600"))
+# how long a leased row stays invisible to other workers
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+
+MAIL_FROM = os.getenv("MAIL_FROM") or os.getenv("MAIL_USERNAME")
+MAIL_FROM_NAME = "RFF Festival"
+
+THROUGHPUT_WINDOW = 60.0
+
+
+def build_tickets_email(recipient: str, payload: dict) -> EmailMessage:
+    """One email for a whole order, every QR inline from memory."""
+    event_name = payload.get("event_name") or "RFF Festival"
+    tickets = payload["tickets"]
+
+    msg = EmailMessage()
+    msg["Subject"] = f"Your Ticket for {event_name}" if len(tickets) == 1 else f"Your {len(tickets)} Tickets for {event_name}"
+    msg["From"] = formataddr((MAIL_FROM_NAME, MAIL_FROM or ""))
+    msg["To"] = recipient
+
+    cids = [make_msgid(domain="rff.local")[1:-1] for _ in tickets]
+    blocks = "".join(
+        f"""
+    <p><b>{t["event_name"]}</b> &middot; {t["ticket_type"]}</p>
+    <img src="cid:{cid}" alt="QR Code" width="200" height="200"/>
+    <p><b>Ticket code:</b> {t["ticket_code"]}</p>
+    """
+        for t, cid in zip(tickets, cids)
+    )
+    msg.set_content(
+        "Your tickets:\n" + "\n".join(f"- {t['ticket_type']}: {t['ticket_code']}" for t in tickets)
+    )
+    msg.add_alternative(
+        f"<h3>Your Tickets for {event_name}</h3><p>Scan each QR code at entry:</p>{blocks}",
+        subtype="html",
+    )
+    html_part = msg.get_payload()[1]
+    for t, cid in zip(tickets, cids):
+        png, _ = qr_cache.get_png(t["ticket_code"])
+        html_part.add_related(png, maintype="image", subtype="png", cid=f"<{cid}>", filename=f"{t['ticket_code']}.png")
+    return msg
+
+
+BUILDERS = {
+    "tickets": build_tickets_email,
+}
+
+
+class OutboxStats:
+    def __init__(self):
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.send_seconds = 0.0
+        self._recent: collections.deque[float] = collections.deque()
+
+    def record_sent(self, seconds: float):
+        now = time.monotonic()
+        self.sent += 1
+        self.send_seconds += seconds
+        self._recent.append(now)
+        while self._recent and self._recent[0] < now - THROUGHPUT_WINDOW:
+            self._recent.popleft()
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        while self._recent and self._recent[0] < now - THROUGHPUT_WINDOW:
+            self._recent.popleft()
+        return {
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "sent_last_minute": len(self._recent),
+            "avg_send_ms": round(self.send_seconds / self.sent * 1000, 1) if self.sent else 0.0,
+        }
+
+
+def retry_delay(attempts: int) -> float | None:
+    """Backoff before the next attempt, None once the row should be given up on."""
+    if attempts >= OUTBOX_MAX_ATTEMPTS:
+        return None
+    return min(OUTBOX_RETRY_BASE * 2 ** (attempts - 1), OUTBOX_RETRY_MAX)
+
+
+class OutboxWorker:
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        pool: SMTPPool | None = None,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+    ):
+        self.session_factory = session_factory
+        self.pool = pool
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.stats = OutboxStats()
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        if self.pool is None:
+            self.pool = pool_from_env()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        # nothing to drain: undelivered rows stay in the table for the next start
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.pool.close()
+
+    def notify(self):
+        """Wake the worker now instead of at the next poll (new rows were committed)."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                delivered = await self.deliver_due()
+            except Exception:
+                logger.exception("Email outbox pass failed")
+                delivered = 0
+            if delivered < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def deliver_due(self) -> int:
+        """Lease one batch of due rows and try each of them; returns the batch size."""
+        async with self.session_factory() as db:
+            rows = await db.run_sync(crud_outbox.claim_due_emails, self.batch_size, OUTBOX_LEASE_SECONDS)
+            results = await asyncio.gather(*(self._send(row) for row in rows), return_exceptions=True)
+            await db.run_sync(self._record, rows, results)
+        return len(rows)
+
+    async def _send(self, row) -> float:
+        # rendering the QR codes takes ~10 ms a ticket; keep it off the event loop
+        message = await run_in_threadpool(BUILDERS[row.kind], row.recipient, json.loads(row.payload))
+        start = time.perf_counter()
+        await self.pool.send(message)
+        return time.perf_counter() - start
+
+    def _record(self, db: Session, rows, results):
+        for row, result in zip(rows, results):
+            if not isinstance(result, BaseException):
+                crud_outbox.mark_email_sent(db, row.id)
+                self.stats.record_sent(result)
+                continue
+            delay = retry_delay(row.attempts)
+            crud_outbox.mark_email_failed(db, row.id, repr(result), delay)
+            if delay is None:
+                self.stats.failed += 1
+                logger.error(f"Giving up on outbox email {row.id} after {row.attempts} attempts: {result!r}")
+            else:
+                self.stats.retried += 1
+                logger.warning(f"Outbox email {row.id} failed, retrying in {delay}s: {result!r}")
+
+
+outbox_worker = OutboxWorker()
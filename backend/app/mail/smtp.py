@@ -0,0 +1,127 @@
+# app/mail/smtp.py
+import asyncio
+import logging
+import os
+from email.message import EmailMessage
+
+import aiosmtplib
+
+logger = logging.getLogger("mail")
+
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+class SMTPPool:
+    """
+    Up to `size` SMTP connections kept open between messages.
+    A connection that errors is dropped and reopened on next use.
+    """
+
+    def __init__(
+        self,
+        hostname: str | None,
+        port: int | None,
+        username: str | None = None,
+        password: str | None = None,
+        start_tls: bool = True,
+        use_tls: bool = False,
+        size: int = SMTP_POOL_SIZE,
+        timeout: float = SMTP_TIMEOUT,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.use_tls = use_tls
+        self.size = size
+        self.timeout = timeout
+        self._idle: asyncio.LifoQueue | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+    def _ensure_started(self):
+        # created lazily so they bind to the running loop
+        if self._idle is None:
+            self._idle = asyncio.LifoQueue()
+            self._slots = asyncio.Semaphore(self.size)
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            timeout=self.timeout,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls,
+        )
+        await smtp.connect()
+        if self.username and self.password:
+            await smtp.login(self.username, self.password)
+        return smtp
+
+    async def send(self, message: EmailMessage):
+        self._ensure_started()
+        async with self._slots:
+            smtp = None
+            while not self._idle.empty():
+                candidate = self._idle.get_nowait()
+                if candidate.is_connected:
+                    smtp = candidate
+                    break
+            if smtp is not None:
+                try:
+                    await self._send_on(smtp, message)
+                    return
+                except (aiosmtplib.SMTPServerDisconnected, ConnectionError):
+                    # the server closed an idle connection; retry once on a fresh one
+                    pass
+
+            await self._send_on(await self._connect(), message)
+
+    async def _send_on(self, smtp: aiosmtplib.SMTP, message: EmailMessage):
+        """Send, then return the connection to the pool, or drop it if anything failed."""
+        sent = False
+        try:
+            await smtp.send_message(message)
+            sent = True
+        finally:
+            if sent:
+                self._idle.put_nowait(smtp)
+            else:
+                await self._discard(smtp)
+
+    async def _discard(self, smtp: aiosmtplib.SMTP):
+        try:
+            smtp.close()
+        except Exception:
+            pass
+
+    async def close(self):
+        if self._idle is None:
+            return
+        while not self._idle.empty():
+            smtp = self._idle.get_nowait()
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+
+
+def pool_from_env() -> SMTPPool:
+    """SMTPPool for the MAIL_* settings the fastapi-mail config uses."""
+    port = os.getenv("MAIL_PORT")
+    return SMTPPool(
+        hostname=os.getenv("MAIL_SERVER"),
+        port=int(port) if port else None,
+        username=os.getenv("MAIL_USERNAME"),
+        password=os.getenv("MAIL_PASSWORD"),
+        start_tls=_env_flag("MAIL_STARTTLS", True),
+        use_tls=_env_flag("MAIL_SSL_TLS", False),
+    )
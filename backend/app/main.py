@@ -1,9 +1,21 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.routers import auth, tickets, riders
-from app.database import init_db
+from app.database import init_db, SessionLocal
+from app.crud import ride as ride_crud
 from app.routers import webhooks_stripe
 from app.routers import payment
+from app.routers import chat
+from app.routers import gate
+from app.routers import health
+from app.auth.firebase_verify import token_verifier
+from app.chat.hub import hub
+from app.chat.persistence import message_writer
+from app.mail.outbox import outbox_worker
+from app.billing.inbox import stripe_event_processor
+from app.billing.catalog import catalog
+from app.utils.id_nodes import node_lease
 
 
 app = FastAPI(
@@ -11,6 +23,7 @@ app = FastAPI(
     docs_url="/api/docs",
     redoc_url="/api/redoc",
     openapi_url="/api/openapi.json",
+    default_response_class=ORJSONResponse,
 )
 
 origins = [
@@ -43,14 +56,68 @@ app.add_middleware(
 # Initialize database tables on startup
 init_db()
 
+# before anything can generate a Snowflake id
+node_lease.claim()
+
+
+def index_existing_rides():
+    # rides created before RideLocationTokens existed are invisible to search
+    db = SessionLocal()
+    try:
+        ride_crud.index_missing_ride_locations(db)
+    finally:
+        db.close()
+
+
+index_existing_rides()
+
+
+def load_catalog():
+    db = SessionLocal()
+    try:
+        catalog.load(db)
+    finally:
+        db.close()
+
+
+load_catalog()
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    token_verifier.keys.start()
+    await node_lease.start()
+    await hub.start()
+    await message_writer.start()
+    await outbox_worker.start()
+    await stripe_event_processor.start()
+    await catalog.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    # flush queued chat messages before anything else goes away
+    await message_writer.stop()
+    await catalog.stop()
+    await stripe_event_processor.stop()
+    await outbox_worker.stop()
+    await hub.stop()
+    await token_verifier.keys.stop()
+    await node_lease.stop()
+
+
 app.include_router(auth.router)
 app.include_router(tickets.router)
 app.include_router(payment.router)
 app.include_router(webhooks_stripe.router)
 app.include_router(riders.router)
+app.include_router(chat.router)
+app.include_router(gate.router)
+app.include_router(health.router)
 
 
 
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
+
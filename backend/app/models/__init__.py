@@ -1,6 +1,9 @@
 from app.models.user import User
-from app.models.rider import Ride, Booking
+from app.models.rider import Ride, Booking, RideLocationToken
 from app.models.ticket import Ticket
 from app.models.token import RefreshToken
+from app.models.outbox import EmailOutbox
+from app.models.stripe_event import StripeEvent
+from app.models.id_node import IdNodeLease
 
-__all__ = ["User", "Ride", "Booking", "Ticket", "RefreshToken"]
+__all__ = ["User", "Ride", "Booking", "RideLocationToken", "Ticket", "RefreshToken", "EmailOutbox", "StripeEvent", "IdNodeLease"]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, TIMESTAMP, text, Index
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, TIMESTAMP, text, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -12,17 +12,26 @@ class Chat(Base):
     passenger_uid = Column(String(50), nullable=False)
     created_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
 
+    # denormalized inbox data, kept current by crud.chat.save_message
+    last_message_id = Column(BigInteger, nullable=True)
+    last_message_at = Column(TIMESTAMP, nullable=True)
+    # last_message_at, or created_at while there are none; the inbox sorts on it
+    last_activity_at = Column(TIMESTAMP, nullable=False, server_default=text("CURRENT_TIMESTAMP"))
+
     messages = relationship("ChatMessage", back_populates="chat", cascade="all, delete")
 
     __table_args__ = (
         Index("idx_chat_users_ride", "ride_id", "driver_uid", "passenger_uid"),
+        Index("idx_chat_driver_last_activity", "driver_uid", "last_activity_at", "chat_id"),
+        Index("idx_chat_passenger_last_activity", "passenger_uid", "last_activity_at", "chat_id"),
     )
 
 
 class ChatMessage(Base):
     __tablename__ = "ChatMessages"
 
-    message_id = Column(Integer, primary_key=True, autoincrement=True)
+    # assigned by the app (app.utils.ids), so messages can be broadcast before they are written
+    message_id = Column(BigInteger, primary_key=True, autoincrement=False)
     chat_id = Column(Integer, ForeignKey("Chats.chat_id"), nullable=False, index=True)
     sender_uid = Column(String(50), nullable=False)
     content = Column(String(500), nullable=False)
@@ -33,9 +42,3 @@ class ChatMessage(Base):
     __table_args__ = (
         Index("idx_chatmessage_chatid_ts", "chat_id", "timestamp"),
     )
-
-class Ride(Base):
-    __tablename__ = "Rides"
-
-    ride_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    description = Column(String(255), nullable=True)
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from app.database import Base
+
+
+class IdNodeLease(Base):
+    """
+    Snowflake node ids (0-1023) leased to running processes, so no two
+    processes generate ids with the same node bits (times are UTC). Rows are
+    never deleted; an expired lease can be taken over by the next process.
+    """
+    __tablename__ = "IdNodeLeases"
+
+    node_id = Column(Integer, primary_key=True, autoincrement=False)
+    owner = Column(String(64), nullable=False)  # host:pid:random of the holder
+    expires_at = Column(DateTime, nullable=False)
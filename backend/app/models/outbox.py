@@ -0,0 +1,32 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, func
+from app.database import Base
+
+
+class EmailOutbox(Base):
+    """
+    Emails waiting to be sent. Rows are written in the same transaction as the
+    change that causes them and delivered by app.mail.outbox.OutboxWorker (times are UTC).
+    """
+    __tablename__ = "EmailOutbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    kind = Column(String(32), nullable=False)  # e.g. "tickets"
+    # one email per business event, e.g. "tickets:<payment_id>"
+    dedupe_key = Column(String(128), unique=True, nullable=False)
+    recipient = Column(String(255), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+
+    status = Column(String(16), nullable=False, default="pending")  # pending | sent | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    # due time for pending rows; also the lease expiry while a worker holds the row
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(String(500), nullable=True)
+
+    created_at = Column(DateTime, server_default=func.now())
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("idx_outbox_due", "status", "next_attempt_at"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey, DateTime, Float, Column , Integer, String, Boolean
+from sqlalchemy import ForeignKey, DateTime, Float, Column , Integer, String, Boolean, Index
 from datetime import datetime
 from app.database import Base
 from sqlalchemy.orm import relationship
@@ -15,9 +15,17 @@ class Ride(Base):
     price = Column(Float, nullable=False)
     status = Column(String(20), default="open")
 
+    # optional coordinates of the pickup point; origin_geohash backs proximity search
+    origin_lat = Column(Float, nullable=True)
+    origin_lng = Column(Float, nullable=True)
+    origin_geohash = Column(String(12), nullable=True)
 
     driver = relationship("User", backref="rides_created")
 
+    __table_args__ = (
+        Index("idx_ride_origin_geohash", "origin_geohash"),
+    )
+
 class Booking(Base):
     __tablename__ = "Bookings"
 
@@ -28,4 +36,17 @@ class Booking(Base):
     status = Column(String(20), default="pending")
 
     ride = relationship("Ride", backref="bookings")
-    rider = relationship("User", backref="my_bookings")
\ No newline at end of file
+    rider = relationship("User", backref="my_bookings")
+
+
+class RideLocationToken(Base):
+    """Trigram index over Ride.origin / Ride.destination, maintained by crud.ride."""
+    __tablename__ = "RideLocationTokens"
+
+    ride_id = Column(Integer, ForeignKey("Rides.ride_id", ondelete="CASCADE"), primary_key=True)
+    field = Column(String(1), primary_key=True)  # "o" = origin, "d" = destination
+    token = Column(String(3), primary_key=True)
+
+    __table_args__ = (
+        Index("idx_ride_token_lookup", "token", "field", "ride_id"),
+    )
@@ -0,0 +1,28 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from app.database import Base
+
+
+class StripeEvent(Base):
+    """
+    Inbox of verified Stripe webhook events, one row per Stripe event id.
+    The webhook only inserts; app.billing.inbox.StripeEventProcessor applies
+    them (times are UTC).
+    """
+    __tablename__ = "StripeEvents"
+
+    event_id = Column(String(255), primary_key=True)
+    type = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False)  # raw event JSON as Stripe sent it
+
+    received_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+
+    attempts = Column(Integer, nullable=False, default=0)
+    # due time while unprocessed; also the lease expiry while a processor holds the row
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(String(500), nullable=True)
+
+    __table_args__ = (
+        Index("idx_stripe_event_due", "processed_at", "next_attempt_at"),
+    )
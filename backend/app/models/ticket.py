@@ -1,8 +1,9 @@
-import uuid
-from sqlalchemy import DECIMAL, Column, Integer, String, ForeignKey, Enum, DateTime, func
+from sqlalchemy import DECIMAL, BigInteger, Column, Integer, String, ForeignKey, Enum, DateTime, Index, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 import enum
 from app.database import Base
+from app.utils.ids import id_generator
+from app.utils.ticket_codes import new_ticket_code
 
 class TicketStatus(str, enum.Enum):
     pending = "pending"      # waiting payment confirmation
@@ -20,6 +21,8 @@ class Ticket(Base):
 
     # link to the payment/order (required for "cart")
     payment_id = Column(Integer, ForeignKey("Payments.id"), nullable=False, index=True)
+    # position within the payment's order; unique per payment so a replayed issuance can't double-issue
+    issue_seq = Column(Integer, nullable=True)
 
     # ticket data
     event_name = Column(String(255), nullable=False)
@@ -29,7 +32,7 @@ class Ticket(Base):
     # IMPORTANT: store money in minor units ideally, but keeping DECIMAL if you already use it
     price = Column(DECIMAL(10, 2), nullable=False)
 
-    ticket_code = Column(String(32), unique=True, nullable=False, default=lambda: uuid.uuid4().hex)
+    ticket_code = Column(String(32), unique=True, nullable=False, default=new_ticket_code)
 
     purchase_date = Column(DateTime, server_default=func.now())
 
@@ -38,6 +41,14 @@ class Ticket(Base):
 
     amount_total_cents = Column(Integer, nullable=False, default=0)
 
+    # set by the gate scan that admitted the ticket
+    used_at = Column(DateTime, nullable=True)
+    scan_id = Column(String(32), nullable=True)
+
+    # time-ordered change marker, bumped on every insert/update (ORM and Core);
+    # offline gate bundles sync "everything with sync_version > N"
+    sync_version = Column(BigInteger, nullable=True, index=True, default=id_generator.next_id, onupdate=id_generator.next_id)
+
     created_at = Column(DateTime, server_default=func.now())
 
     stripe_session_id = Column(String(255), nullable=True)
@@ -47,3 +58,10 @@ class Ticket(Base):
     # relationships
     user = relationship("User", back_populates="tickets")
     payment = relationship("Payment", back_populates="tickets")
+
+    __table_args__ = (
+        UniqueConstraint("payment_id", "issue_seq", name="uq_ticket_payment_seq"),
+        # keyset pages of /api/tickets/me, with and without a status filter
+        Index("idx_ticket_owner_created", "firebase_uid", "created_at", "id"),
+        Index("idx_ticket_owner_status_created", "firebase_uid", "status", "created_at", "id"),
+    )
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Body, Header, BackgroundTasks
 from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db, get_async_db
 from app.schemas.user import UserCreate, UserOut
 from app.crud.user import create_user, get_user_by_email
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
@@ -19,32 +21,11 @@ from app.firebase_admin import auth
 from app.models.ticket import Ticket, TicketStatus
 from app.schemas.auth_register import FirebaseRegisterRequest
 from app.crud import user as crud_user
+from app.auth import user_cache
 
 router = APIRouter(prefix="/api/auth", tags=["Auth"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
 
-from sqlalchemy.exc import IntegrityError
-
-def _make_unique_username(db: Session, base: str) -> str:
-    base = (base or "").strip()
-    if not base:
-        base = "user"
-
-    # foarte important: limite + curatare minima
-    base = base[:40]
-
-    candidate = base
-    i = 0
-    while True:
-        exists = db.query(User).filter(User.username == candidate).first()
-        if not exists:
-            return candidate
-        i += 1
-        candidate = f"{base}_{i}"
-        if len(candidate) > 50:
-            candidate = candidate[:50]
-
-
 #old register, using local
 # @router.post("/register", response_model=UserOut)
 # async def register_user(user: UserCreate, db: Session = Depends(get_db), captcha_token: str = Body(..., embed = True), background_tasks: BackgroundTasks = Depends()) :
@@ -76,27 +57,15 @@ def register_firebase_user(
         user = db.query(User).filter(User.email == email).first()
 
     if not user:
-        base_username = (payload.username or email.split("@")[0]).strip()
-        username = _make_unique_username(db, base_username)
-
         user = User(
             email=email,
-            username=username,
             firebase_uid=firebase_uid,
             first_name=payload.first_name,
             last_name=payload.last_name,
         )
-        db.add(user)
-        try:
-            db.commit()
-        except IntegrityError:
-            db.rollback()
-            # retry simplu: regenereaza username (race condition)
-            username = _make_unique_username(db, f"{base_username}_1")
-            user.username = username
-            db.add(user)
-            db.commit()
+        crud_user.add_user_with_unique_username(db, user, payload.username or email.split("@")[0])
         db.refresh(user)
+        user_cache.invalidate(firebase_uid)
     else:
         # update “non-destructiv”: seteaza doar daca payload are valori
         changed = False
@@ -108,8 +77,7 @@ def register_firebase_user(
         # daca user nu are username set (la tine e NOT NULL, deci probabil exista),
         # dar las aici ca safety
         if not user.username:
-            base_username = (payload.username or email.split("@")[0]).strip()
-            user.username = _make_unique_username(db, base_username)
+            user.username = crud_user.allocate_username(db, payload.username or email.split("@")[0])
             changed = True
 
         if payload.first_name is not None and payload.first_name != user.first_name:
@@ -123,6 +91,7 @@ def register_firebase_user(
         if changed:
             db.commit()
             db.refresh(user)
+            user_cache.invalidate(firebase_uid)
 
     return {
         "ok": True,
@@ -251,7 +220,7 @@ def register_firebase_user(
 @router.post("/login/firebase")
 async def firebase_login(
     user_data: dict = Depends(get_current_firebase_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Logs in a Firebase-authenticated user.
@@ -264,22 +233,11 @@ async def firebase_login(
         raise HTTPException(status_code=400, detail="Invalid Firebase token payload")
 
     # Ensure user exists in the local database
-    user = db.query(User).filter(User.email == email).first()
+    user = await db.scalar(select(User).where(User.email == email))
     if not user:
-        # Generate username from email (take part before @)
-        username = email.split("@")[0]
-        # Ensure username is unique
-        username_count = db.query(User).filter(User.username.like(f"{username}%")).count()
-        if username_count > 0:
-            username = f"{username}_{username_count}"
-        
-        user = User(
-            email=email,
-            username=username,
-            firebase_uid=firebase_uid
-        )
-        db.add(user)
-        db.commit()
+        # username from the part of the email before @, made unique
+        user = User(email=email, firebase_uid=firebase_uid)
+        await db.run_sync(crud_user.add_user_with_unique_username, user, email.split("@")[0])
 
     return {
         "message": "Login successful",
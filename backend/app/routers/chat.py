@@ -1,37 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import or_, select, func, desc
-from typing import Dict, List
+from datetime import datetime
 
-from app.database import get_db
-from app.schemas.chat import ChatInitiateRequest, ChatResponse
-from app.crud.chat import get_existing_chat, create_chat, save_message, get_chat_messages, get_user_chats
+from app.database import get_async_db, AsyncSessionLocal
+from app.schemas.chat import ChatInitiateRequest, ChatResponse, message_payload
+from app.crud.chat import get_existing_chat, create_chat, get_chat_messages, get_user_chats
 from app.models.user import User
 from app.models.chat import Chat, ChatMessage
 from app.auth.firebase_verify import get_current_firebase_user, verify_firebase_token
+from app.chat.hub import hub
+from app.chat.persistence import message_writer
+from app.utils.serializers import json_list
 import logging
 
 logger = logging.getLogger("chat")
 logger.setLevel(logging.INFO)
 
 router = APIRouter(prefix="/api/chat", tags=["Chat"])
-# dict: chat_id -> list of websockets
-active_connections: Dict[int, List[WebSocket]] = {}
 
 @router.post("/initiate", response_model=ChatResponse)
 async def initiate_chat(
     payload: ChatInitiateRequest,
     current_user: dict = Depends(get_current_firebase_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
 
     # check if driver exists
-    driver = db.query(User).filter(User.firebase_uid == payload.driver_uid).first()
+    driver = await db.scalar(select(User).where(User.firebase_uid == payload.driver_uid))
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
 
     # check if passenger exists
-    passenger = db.query(User).filter(User.firebase_uid == payload.passenger_uid).first()
+    passenger = await db.scalar(select(User).where(User.firebase_uid == payload.passenger_uid))
     if not passenger:
         raise HTTPException(status_code=404, detail="Passenger not found")
 
@@ -40,8 +41,8 @@ async def initiate_chat(
         raise HTTPException(status_code=403, detail="Not allowed to create this chat")
 
     # check if chat already exists
-    existing = get_existing_chat(
-        db,
+    existing = await db.run_sync(
+        get_existing_chat,
         payload.ride_id,
         payload.driver_uid,
         payload.passenger_uid
@@ -51,8 +52,8 @@ async def initiate_chat(
         return ChatResponse(chat_id=existing.chat_id)
 
     # create new chat
-    chat = create_chat(
-        db,
+    chat = await db.run_sync(
+        create_chat,
         payload.ride_id,
         payload.driver_uid,
         payload.passenger_uid
@@ -61,9 +62,9 @@ async def initiate_chat(
     return ChatResponse(chat_id=chat.chat_id)
 
 @router.get("/users")
-def list_users(
+async def list_users(
     user_data: dict = Depends(get_current_firebase_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Return all users from DB except the current logged user.
@@ -72,29 +73,28 @@ def list_users(
 
     current_email = user_data.get("email")
 
-    users = (
-        db.query(User)
-        .filter(User.email != current_email)
-        .all()
+    rows = await db.execute(
+        select(
+            User.user_id,
+            User.username,
+            User.first_name,
+            User.last_name,
+            User.email,
+            User.firebase_uid,
+        ).where(User.email != current_email)
     )
+    return json_list(row._asdict() for row in rows)
+
+async def _load_chat(chat_id: int):
+    # short-lived session: the socket itself may stay open for hours
+    async with AsyncSessionLocal() as db:
+        return await db.get(Chat, chat_id)
 
-    return [
-        {
-            "user_id": u.user_id,
-            "username": u.username,
-            "first_name": u.first_name,
-            "last_name": u.last_name,
-            "email": u.email,
-            "firebase_uid": u.firebase_uid,
-        }
-        for u in users
-    ]
 
 @router.websocket("/ws/{chat_id}")
 async def chat_websocket(
     websocket: WebSocket,
     chat_id: int,
-    db: Session = Depends(get_db)
 ):
     await websocket.accept()
 
@@ -110,7 +110,7 @@ async def chat_websocket(
         return
 
     user_uid = token_data.get("uid")
-    chat = db.query(Chat).filter(Chat.chat_id == chat_id).first()
+    chat = await _load_chat(chat_id)
 
     if not chat or user_uid not in [
         chat.driver_uid,
@@ -119,7 +119,7 @@ async def chat_websocket(
         await websocket.close(code=4003)
         return
 
-    active_connections.setdefault(chat_id, []).append(websocket)
+    connection = await hub.join(chat_id, websocket)
     logger.info(f"WS connected chat={chat_id} user={user_uid}")
 
     try:
@@ -130,76 +130,72 @@ async def chat_websocket(
             if not content:
                 continue
 
-            msg = save_message(db, chat_id, user_uid, content)
+            msg = await message_writer.submit(chat_id, user_uid, content)
 
             payload = {
                 "type": "message",
-                "message_id": msg.message_id,
-                "sender_uid": user_uid,
-                "content": content,
-                "timestamp": str(msg.timestamp),
+                **message_payload(msg["message_id"], user_uid, content, str(msg["timestamp"])),
             }
 
-            for conn in active_connections.get(chat_id, []):
-                await conn.send_json(payload)
+            await hub.publish(chat_id, payload)
 
     except WebSocketDisconnect:
         logger.info(f"WS disconnected chat={chat_id} user={user_uid}")
 
     finally:
-        if chat_id in active_connections:
-            active_connections[chat_id] = [
-                c for c in active_connections[chat_id]
-                if c != websocket
-            ]
-            if not active_connections[chat_id]:
-                del active_connections[chat_id]
+        await hub.leave(chat_id, connection)
 
 
 @router.get("/{chat_id}/messages")
-def get_messages(
+async def get_messages(
     chat_id: int,
     limit: int = 30,
-    before_id: int | None = None,
+    before_id: int | None = Query(None, description="message_id (as sent, a decimal string) of the oldest message held"),
     user_data: dict = Depends(get_current_firebase_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     user_uid = user_data["uid"]
 
-    chat = db.query(Chat).filter(Chat.chat_id == chat_id).first()
+    chat = await db.get(Chat, chat_id)
     if not chat:
         raise HTTPException(404)
 
     if user_uid not in [chat.driver_uid, chat.passenger_uid]:
         raise HTTPException(403)
 
-    messages = get_chat_messages(db, chat_id, limit, before_id)
+    messages = await db.run_sync(get_chat_messages, chat_id, limit, before_id)
 
     return [
-        {
-            "message_id": m.message_id,
-            "sender_uid": m.sender_uid,
-            "content": m.content,
-            "timestamp": m.timestamp,
-        }
+        message_payload(m.message_id, m.sender_uid, m.content, m.timestamp)
         for m in reversed(messages)  # frontend-friendly
     ]
 
 @router.get("/list")
-def list_chats(user_data: dict = Depends(get_current_firebase_user), db: Session = Depends(get_db)):
+async def list_chats(
+    limit: int = Query(50, ge=1, le=200),
+    before_ts: datetime | None = None,
+    before_id: int | None = None,
+    user_data: dict = Depends(get_current_firebase_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Paginate with the `updated_at` and `chat_id` of the last chat received
+    as `before_ts` / `before_id`.
+    """
     uid = user_data["uid"]
-    return get_user_chats(db, uid)
+    before = (before_ts, before_id) if before_ts is not None and before_id is not None else None
+    return json_list(await db.run_sync(get_user_chats, uid, limit, before))
 
 @router.get("/{chat_id}/info")
-def get_chat_info(chat_id: int, user_data: dict = Depends(get_current_firebase_user), db: Session = Depends(get_db)):
+async def get_chat_info(chat_id: int, user_data: dict = Depends(get_current_firebase_user), db: AsyncSession = Depends(get_async_db)):
     uid = user_data["uid"]
-    chat = db.query(Chat).filter(Chat.chat_id == chat_id).first()
+    chat = await db.get(Chat, chat_id)
     if not chat:
         raise HTTPException(404, "Chat not found")
     if uid not in [chat.driver_uid, chat.passenger_uid]:
         raise HTTPException(403, "Unauthorized")
 
     other_uid = chat.passenger_uid if chat.driver_uid == uid else chat.driver_uid
-    other_user = db.query(User).filter(User.firebase_uid == other_uid).first()
+    other_user = await db.scalar(select(User).where(User.firebase_uid == other_uid))
 
     return {"chat_id": chat.chat_id, "other_username": other_user.username}
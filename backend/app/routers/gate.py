@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.crud import ticket as crud_ticket
+from app.deps import gate_staff
+from app.gate import bundle as gate_bundle
+from app.schemas.ticket import ScanBatchIn, ScanBatchOut, ScanResult
+from app.utils.http import etag_matches
+
+router = APIRouter(prefix="/api/gate", tags=["Gate"], dependencies=[Depends(gate_staff)])
+
+BUNDLE_MEDIA_TYPE = "application/vnd.rff.gate-bundle"
+
+
+def _bundle_response(data: bytes, version: int, etag: str | None = None) -> Response:
+    headers = {"X-Bundle-Version": str(version), "Cache-Control": "private, no-cache"}
+    if etag:
+        headers["ETag"] = etag
+    return Response(content=data, media_type=BUNDLE_MEDIA_TYPE, headers=headers)
+
+
+@router.get("/bundle/key")
+def get_bundle_key():
+    """Public key scanners verify bundle signatures with."""
+    return {"algorithm": "Ed25519", "public_key": gate_bundle.public_key_b64()}
+
+
+@router.get("/bundle")
+def get_full_bundle(request: Request, db: Session = Depends(get_db)):
+    """Every active and used ticket, signed; see app/gate/bundle.py for the format."""
+    data, version = gate_bundle.build_full_bundle(db)
+    etag = f'"v{version}"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "X-Bundle-Version": str(version)})
+    return _bundle_response(data, version, etag)
+
+
+@router.get("/bundle/delta")
+def get_delta_bundle(since: int = Query(..., ge=0), db: Session = Depends(get_db)):
+    """Tickets changed since a bundle version (the X-Bundle-Version of the last sync)."""
+    data, version = gate_bundle.build_delta_bundle(db, since)
+    return _bundle_response(data, version)
+
+
+@router.post("/reconcile", response_model=ScanBatchOut)
+def reconcile_scans(payload: ScanBatchIn, db: Session = Depends(get_db)):
+    """
+    Codes a scanner admitted while offline. Each is marked used the same way a
+    live scan is; 'already_used' flags a ticket admitted elsewhere as well.
+    """
+    results = crud_ticket.scan_tickets(db, payload.codes)
+    return ScanBatchOut(
+        results=[ScanResult(ticket_code=code, verdict=verdict, used_at=used_at) for code, verdict, used_at in results]
+    )
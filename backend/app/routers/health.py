@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.billing.inbox import stripe_event_processor
+from app.crud import outbox as crud_outbox
+from app.crud import stripe_event as crud_stripe_event
+from app.database import get_db, get_pool_stats
+from app.deps import staff_only
+from app.mail.outbox import outbox_worker
+
+router = APIRouter(prefix="/api/health", tags=["Health"], dependencies=[Depends(staff_only)])
+
+
+@router.get("/db-pool")
+def db_pool_stats():
+    return get_pool_stats()
+
+
+@router.get("/email-outbox")
+def email_outbox_stats(db: Session = Depends(get_db)):
+    return {**outbox_worker.stats.snapshot(), "rows": crud_outbox.count_emails_by_status(db)}
+
+
+@router.get("/stripe-events")
+def stripe_event_stats(db: Session = Depends(get_db)):
+    backlog, oldest = crud_stripe_event.get_backlog(db)
+    return {
+        **stripe_event_processor.stats.snapshot(),
+        "backlog": backlog,
+        "oldest_unprocessed_age_s": round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else 0.0,
+    }
@@ -1,20 +1,43 @@
 import email
 import os
 import stripe
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.auth.firebase_verify import get_current_firebase_user
 from app.schemas.checkout import CreateCheckoutSessionRequest
 from app.crud import payment as crud_payment
-from app.crud import product as crud_product
 from app.crud import user as crud_user
+from app.billing.catalog import catalog
+from app.utils.http import etag_matches
 
 router = APIRouter(prefix="/api/payment", tags=["Payment"])
 
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "https://localhost")
+PRICE_LIST_MAX_AGE = int(os.getenv("PRICE_LIST_MAX_AGE", "60"))
+
+
+@router.get("/prices")
+def get_price_list(request: Request, response: Response, db: Session = Depends(get_db)):
+    """Public price list of active products, straight from the catalog snapshot."""
+    snapshot = catalog.snapshot(db)
+    headers = {"ETag": snapshot.etag, "Cache-Control": f"public, max-age={PRICE_LIST_MAX_AGE}"}
+    if etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return [
+        {
+            "sku": p.sku,
+            "name": p.name,
+            "description": p.description,
+            "unit_amount_cents": p.unit_amount_cents,
+            "currency": p.currency,
+        }
+        for p in snapshot.products.values()
+    ]
 
 @router.post("/checkout-session")
 def create_session(
@@ -24,7 +47,6 @@ def create_session(
 ):
     firebase_uid = user_data.get("uid")
     email = user_data.get("email")
-    crud_user.upsert_user_from_firebase(db, firebase_uid=firebase_uid, email=email)
 
     if not firebase_uid:
         raise HTTPException(status_code=401, detail="Unauthorized")
@@ -33,35 +55,11 @@ def create_session(
         raise HTTPException(status_code=400, detail="Cart is empty")
 
     skus = [i.sku for i in payload.items]
-    products = crud_product.get_active_products_by_skus(db, skus)
-
-    product_by_sku = {p.sku: p for p in products}
+    product_by_sku = catalog.get_many(db, skus)
     missing = [sku for sku in skus if sku not in product_by_sku]
     if missing:
         raise HTTPException(status_code=400, detail=f"Unknown SKU(s): {', '.join(missing)}")
 
-    # Create pending payment in DB (store totals if you want)
-    payment = crud_payment.create_pending_payment_for_cart(
-        db=db,
-        firebase_uid=firebase_uid,
-        items=[{"sku": i.sku, "quantity": i.quantity} for i in payload.items],
-    )
-
-    crud_payment.set_payment_items(
-        db,
-        payment.id,
-        [ 
-            {
-                "ticket_type": product_by_sku[item.sku].name,
-                "event_name": "RFF Festival 2025",
-                "price": product_by_sku[item.sku].unit_amount_cents / 100,
-                "amount_total_cents": product_by_sku[item.sku].unit_amount_cents * item.quantity,
-                "quantity": item.quantity,
-            }
-            for item in payload.items
-        ],
-    )
-
     line_items = []
     for item in payload.items:
         p = product_by_sku[item.sku]
@@ -80,17 +78,37 @@ def create_session(
                 "quantity": item.quantity,
             })
 
+    # user, payment and its items in one transaction, committed before talking to Stripe
+    crud_user.ensure_user_from_firebase(db, firebase_uid=firebase_uid, email=email, commit=False)
+    payment = crud_payment.create_pending_payment_for_cart(
+        db=db,
+        firebase_uid=firebase_uid,
+        items=[
+            {
+                "ticket_type": product_by_sku[item.sku].name,
+                "event_name": "RFF Festival 2025",
+                "price": product_by_sku[item.sku].unit_amount_cents / 100,
+                "amount_total_cents": product_by_sku[item.sku].unit_amount_cents * item.quantity,
+                "quantity": item.quantity,
+            }
+            for item in payload.items
+        ],
+        commit=False,
+    )
+    payment_id = payment.id
+    db.commit()
+
     session = stripe.checkout.Session.create(
         mode="payment",
         payment_method_types=["card"],
         line_items=line_items,
         success_url=f"{FRONTEND_URL}/tickets/success?session_id={{CHECKOUT_SESSION_ID}}",
         cancel_url=f"{FRONTEND_URL}/cart",
-        client_reference_id=str(payment.id),
-        metadata={"payment_id": str(payment.id), "firebase_uid": firebase_uid},
+        client_reference_id=str(payment_id),
+        metadata={"payment_id": str(payment_id), "firebase_uid": firebase_uid},
     )
 
-    crud_payment.attach_stripe_session_to_payment(db, payment.id, session.id)
+    crud_payment.attach_stripe_session_to_payment(db, payment_id, session.id)
 
     return {"checkout_url": session.url}
 
@@ -1,41 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app import models, schemas
 from app.crud import ride as ride_crud
 from app.auth.firebase_verify import get_current_user
+from app.auth.user_cache import UserSnapshot
+from app.utils.serializers import json_list, row_serializer
 
 router = APIRouter(prefix="/api/rides", tags=["Rides"])
 
+# list endpoints below return these directly; response_model is kept for the docs
+serialize_ride = row_serializer(schemas.RideOut)
+serialize_booking = row_serializer(schemas.BookingOut)
+
 
 @router.get("/search", response_model=list[schemas.RideOut])
-def search_rides(origin: str, destination: str, db: Session = Depends(get_db)):
-    """Search for available rides by origin and destination"""
-    results = ride_crud.search_rides(db, origin, destination)
-    return results
+def search_rides(
+    origin: str = "",
+    destination: str = "",
+    lat: float | None = Query(None, ge=-90, le=90),
+    lng: float | None = Query(None, ge=-180, le=180),
+    radius_km: float = Query(15, gt=0, le=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Search for available rides by origin and destination (typo tolerant, best match first),
+    or, when lat/lng are given, rides leaving within radius_km of that point (nearest first).
+    """
+    if lat is not None and lng is not None:
+        return json_list(ride_crud.search_rides_near(db, lat, lng, radius_km, limit, offset), serialize_ride)
+    results = ride_crud.search_rides(db, origin, destination, limit, offset)
+    return json_list(results, serialize_ride)
 
 @router.post("/book/{ride_id}")
 def request_seat(
     ride_id: int,
     payload: schemas.BookRideRequest,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
-    ride = ride_crud.get_ride(db, ride_id)
-    seats = payload.seats
-
-    if not ride or ride.available_seats < seats:
+    if not ride_crud.request_booking(db, ride_id, current_user.user_id, payload.seats):
         raise HTTPException(status_code=400, detail="There are no seats available")
 
-    booking_create = schemas.BookingCreate(seats_reserved=seats)
-    ride_crud.create_booking(db, booking_create, ride_id, current_user.user_id)
     return {"message": "The request was sent to the driver and is pending."}
 
 @router.get("/driver/pending-bookings/{ride_id}", response_model=list[schemas.BookingOut])
 def get_pending_bookings(
     ride_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
     # optional: verifica daca ride_id apartine driverului
     ride = ride_crud.get_ride(db, ride_id)
@@ -44,7 +59,7 @@ def get_pending_bookings(
     if ride.driver_id != current_user.user_id:
         raise HTTPException(status_code=403, detail="You are not the driver of this ride")
 
-    return ride_crud.get_pending_bookings_for_ride(db, ride_id)
+    return json_list(ride_crud.get_pending_bookings_for_ride(db, ride_id), serialize_booking)
 
 
 @router.post("/driver/manage-booking/{booking_id}")
@@ -52,7 +67,7 @@ def manage_booking(
     booking_id: int,
     payload: schemas.ManageBookingRequest,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
     action = payload.action
 
@@ -65,50 +80,40 @@ def manage_booking(
         raise HTTPException(status_code=403, detail="You are not the driver of this ride")
 
     if action == "accept":
-        ...
+        try:
+            ride_crud.accept_booking(db, booking)
+        except ride_crud.SeatReservationError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return {"message": "Booking accepted"}
     elif action == "reject":
-        ...
+        if not ride_crud.reject_booking(db, booking_id):
+            raise HTTPException(status_code=409, detail="Booking is no longer pending")
+        return {"message": "Booking rejected"}
     else:
         raise HTTPException(status_code=400, detail="Invalid action")
 
 
 
-@router.post("/book/{ride_id}")
-def request_seat(
-    ride_id: int,
-    payload: schemas.BookRideRequest,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
-):
-    ride = ride_crud.get_ride(db, ride_id)
-    seats = payload.seats
-
-    if not ride or ride.available_seats < seats:
-        raise HTTPException(status_code=400, detail="There are no seats available")
-
-    booking_create = schemas.BookingCreate(seats_reserved=seats)
-    ride_crud.create_booking(db, booking_create, ride_id, current_user.user_id)
-    return {"message": "The request was sent to the driver and is pending."}
 
 
 
 @router.get("/my-bookings", response_model=list[schemas.BookingOut])
 def get_my_bookings(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
     """Get all bookings made by the current user"""
     bookings = ride_crud.get_rider_bookings(db, current_user.user_id)
-    return bookings
+    return json_list(bookings, serialize_booking)
 
 
 @router.get("/my-offered-rides", response_model=list[schemas.RideOut])
 def get_my_offered_rides(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
     """Get all rides offered by the current user"""
     rides = ride_crud.get_driver_rides(db, current_user.user_id)
-    return rides
+    return json_list(rides, serialize_ride)
 
 
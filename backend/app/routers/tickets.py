@@ -1,17 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Response
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request, Response
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.crud import ticket as crud_ticket
-from app.schemas.ticket import TicketCreate, TicketOut
+from app.schemas.ticket import ScanBatchIn, ScanBatchOut, ScanResult, ScanVerdict, TicketCreate, TicketOut
 from app.auth.firebase_verify import get_current_firebase_user
 from app.utils.mailer import send_ticket_email
-from app.utils.qr import generate_qr_bytes
-from app.models.ticket import Ticket
+from app.utils.http import etag_matches
+from app.utils.serializers import json_list, row_serializer
+from app.utils.ticket_codes import is_valid_code
+from app.utils.qr import MAX_BORDER, MAX_SCALE, MEDIA_TYPES, QR_BORDER, QR_SCALE, qr_cache, render_key
+from app.models.ticket import Ticket, TicketStatus
 from app.models.user import User
-from app.deps import dev_only
+from app.deps import dev_only, gate_staff
+from app.auth.user_cache import UserSnapshot
 
 router = APIRouter(prefix="/api/tickets", tags=["Tickets"])
 
+# /me returns this directly; response_model is kept for the docs
+serialize_ticket = row_serializer(TicketOut)
+
+# a ticket's QR never changes, so the browser may keep it for as long as it likes
+QR_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
 #backend/app/routers/tickets.py
 
 # Create ticket (development mock purchase)
@@ -33,33 +44,67 @@ def create_ticket(
     return TicketOut.from_orm(ticket)  #  converts ORM to dict
 
 
-# Get all tickets for current Firebase user
+# Get the current Firebase user's tickets, newest first
 @router.get("/me", response_model=list[TicketOut])
 def get_my_tickets(
+    limit: int = Query(50, ge=1, le=200),
+    before_ts: datetime | None = None,
+    before_id: int | None = None,
+    status: list[TicketStatus] | None = Query(None),
+    only_paid: bool = False,
     user_data: dict = Depends(get_current_firebase_user),
     db: Session = Depends(get_db)
 ):
+    """
+    Paginate with the `created_at` and `id` of the last ticket received as
+    `before_ts` / `before_id`. Filter with `status` (repeatable) or
+    `only_paid` (active and used tickets).
+    """
     firebase_uid = user_data.get("uid")
     if not firebase_uid:
         raise HTTPException(status_code=400, detail="Missing Firebase UID")
 
-    tickets = crud_ticket.get_user_tickets(db, firebase_uid=firebase_uid)
-    # print("DEBUG:", type(tickets), tickets)
-    #return [TicketOut.from_orm(ticket) for ticket in tickets]
-    return list(map(TicketOut.from_orm, tickets))
+    statuses = status or (list(crud_ticket.PAID_STATUSES) if only_paid else None)
+    before = (before_ts, before_id) if before_ts is not None and before_id is not None else None
+    return json_list(crud_ticket.list_user_tickets(db, firebase_uid, statuses=statuses, limit=limit, before=before), serialize_ticket)
 
 
 # Verify and mark ticket as used (dev only)
 @router.post("/verify/{ticket_code}", dependencies=[Depends(dev_only)])
 def verify_ticket(ticket_code: str, db: Session = Depends(get_db)):
-    ticket = crud_ticket.get_ticket_by_code(db, ticket_code)
-    if not ticket:
+    verdict, _ = crud_ticket.scan_ticket(db, ticket_code)
+    if verdict == ScanVerdict.invalid:
         raise HTTPException(status_code=404, detail="Invalid ticket code")
-    if ticket.status == "used":
+    if verdict == ScanVerdict.already_used:
         raise HTTPException(status_code=400, detail="Ticket already used")
+    if verdict != ScanVerdict.admitted:
+        raise HTTPException(status_code=400, detail=f"Ticket not valid: {verdict.value}")
+
+    return {"message": "Ticket verified and marked as used", "ticket_code": ticket_code}
+
+
+# Gate scanning: atomic check-and-mark, for staff devices
+@router.post("/scan/{ticket_code}", response_model=ScanResult)
+def scan_ticket(
+    ticket_code: str,
+    staff: UserSnapshot = Depends(gate_staff),
+    db: Session = Depends(get_db),
+):
+    verdict, used_at = crud_ticket.scan_ticket(db, ticket_code)
+    return ScanResult(ticket_code=ticket_code, verdict=verdict, used_at=used_at)
 
-    updated = crud_ticket.mark_ticket_used(db, ticket_code)
-    return {"message": "Ticket verified and marked as used", "ticket_code": updated.ticket_code}
+
+@router.post("/scan", response_model=ScanBatchOut)
+def scan_tickets(
+    payload: ScanBatchIn,
+    staff: UserSnapshot = Depends(gate_staff),
+    db: Session = Depends(get_db),
+):
+    """Flush a scanner's queued scans in one request; one verdict per submitted code."""
+    results = crud_ticket.scan_tickets(db, payload.codes)
+    return ScanBatchOut(
+        results=[ScanResult(ticket_code=code, verdict=verdict, used_at=used_at) for code, verdict, used_at in results]
+    )
 
 
 # Mock payment confirmation (dev only)
@@ -105,9 +150,47 @@ async def confirm_ticket_payment(
 
 
 
+def _negotiate_qr_format(accept: str | None) -> str:
+    """Best of MEDIA_TYPES for an Accept header; PNG on ties and when nothing matches."""
+    if not accept:
+        return "png"
+    ranges = []
+    for part in accept.split(","):
+        media_range, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ranges.append((media_range.strip().lower(), q))
+
+    def quality(media_type: str) -> float:
+        # the most specific matching range decides
+        major = media_type.split("/")[0] + "/*"
+        for candidate in (media_type, major, "*/*"):
+            for media_range, q in ranges:
+                if media_range == candidate:
+                    return q
+        return 0.0
+
+    best, best_q = "png", 0.0
+    for fmt, media_type in MEDIA_TYPES.items():
+        q = quality(media_type)
+        if q > best_q:
+            best, best_q = fmt, q
+    return best
+
+
 @router.get("/{ticket_code}/qr")
 def get_ticket_qr(
     ticket_code: str,
+    request: Request,
+    format: str | None = Query(None, pattern="^(png|svg)$"),
+    scale: int = Query(QR_SCALE, ge=1, le=MAX_SCALE),
+    border: int = Query(QR_BORDER, ge=0, le=MAX_BORDER),
     user_data: dict = Depends(get_current_firebase_user),
     db: Session = Depends(get_db)
 ):
@@ -115,6 +198,8 @@ def get_ticket_qr(
     if not firebase_uid:
         raise HTTPException(status_code=400, detail="Missing Firebase UID")
 
+    if not is_valid_code(ticket_code):
+        raise HTTPException(status_code=404, detail="Ticket not found")
     ticket = db.query(Ticket).filter_by(ticket_code=ticket_code).first()
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
@@ -127,5 +212,13 @@ def get_ticket_qr(
     if ticket.status != "active":
         raise HTTPException(status_code=403, detail="Ticket not paid")
 
-    qr_bytes = generate_qr_bytes(ticket.ticket_code)
-    return Response(content=qr_bytes, media_type="image/png")
+    fmt = format or _negotiate_qr_format(request.headers.get("accept"))
+
+    # the ETag is the render key, so a revalidation needs no image at all
+    etag = f'"{render_key(ticket.ticket_code, fmt, scale, border)}"'
+    headers = {"ETag": etag, "Cache-Control": QR_CACHE_CONTROL, "Vary": "Accept"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    qr_bytes, _ = qr_cache.get(ticket.ticket_code, fmt, scale, border)
+    return Response(content=qr_bytes, media_type=MEDIA_TYPES[fmt], headers=headers)
@@ -11,3 +11,17 @@ class ChatResponse(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+def message_payload(message_id: int, sender_uid: str, content: str, timestamp) -> dict:
+    """
+    A chat message as sent over the socket and by /messages. message_id is a
+    64-bit Snowflake, above what a JavaScript number holds exactly (2**53),
+    so it goes out as a string; `before_id` takes it back in that form.
+    """
+    return {
+        "message_id": str(message_id),
+        "sender_uid": sender_uid,
+        "content": content,
+        "timestamp": timestamp,
+    }
@@ -31,33 +31,40 @@ class RideCreate(BaseModel):
     destination: str
     price: float
     available_seats: int
+    origin_lat: Optional[float] = Field(None, ge=-90, le=90)
+    origin_lng: Optional[float] = Field(None, ge=-180, le=180)
 
 class RideUpdate(BaseModel):
+    """Partial update: only the fields that are sent are changed."""
     origin: Optional[str] = None
     destination: Optional[str] = None
     price: Optional[float] = None
     available_seats: Optional[int] = None
-    status: Optional[str] = None
+    status: Optional[RideStatus] = None
+    origin_lat: Optional[float] = Field(None, ge=-90, le=90)
+    origin_lng: Optional[float] = Field(None, ge=-180, le=180)
 
 class RideCreateRequest(BaseModel):
     origin: str = Field(min_length=1, max_length=100)
     destination: str = Field(min_length=1, max_length=100)
     price: float = Field(ge=0)
     seats: int = Field(ge=1, le=8)
+    origin_lat: Optional[float] = Field(None, ge=-90, le=90)
+    origin_lng: Optional[float] = Field(None, ge=-180, le=180)
 
 class BookRideRequest(BaseModel):
     seats: int = Field(ge=1, le=8)
 
-class RideUpdate(BaseModel):
-    available_seats: int
-    status: RideStatus
-
 
 class RideOut(RideBase):
     ride_id: int
     driver_id: int
     departure_time: datetime
     status: RideStatus
+    origin_lat: Optional[float] = None
+    origin_lng: Optional[float] = None
+    # only set by proximity search
+    distance_km: Optional[float] = None
 
     class Config:
         orm_mode = True
@@ -1,5 +1,5 @@
 # app/schemas/ticket.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from enum import Enum
 
@@ -43,4 +43,27 @@ class TicketOut(TicketBase):
     created_at: datetime | None = None
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+
+# --- Gate scanning ---
+class ScanVerdict(str, Enum):
+    admitted = "admitted"
+    already_used = "already_used"
+    not_paid = "not_paid"
+    cancelled = "cancelled"
+    invalid = "invalid"
+
+
+class ScanBatchIn(BaseModel):
+    codes: list[str] = Field(..., min_items=1, max_items=1000)
+
+
+class ScanResult(BaseModel):
+    ticket_code: str
+    verdict: ScanVerdict
+    used_at: datetime | None = None
+
+
+class ScanBatchOut(BaseModel):
+    results: list[ScanResult]
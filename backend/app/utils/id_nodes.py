@@ -0,0 +1,121 @@
+# app/utils/id_nodes.py
+"""
+Database leases for Snowflake node ids.
+
+At startup each process leases a free node id from IdNodeLeases and hands it
+to `id_generator`; a background task renews the lease every quarter of
+ID_NODE_LEASE_TTL. The generator only accepts the node until the confirmed
+lease (minus ID_NODE_LEASE_MARGIN for clock skew between hosts) runs out, so
+if renewals keep failing it stops issuing ids before another process can
+take the node over.
+"""
+import asyncio
+import logging
+import os
+import secrets
+import socket
+import time
+
+from app.crud.id_node import claim_id_node, release_id_node, renew_id_node
+from app.database import AsyncSessionLocal, SessionLocal
+from app.utils.ids import MAX_NODE, SnowflakeGenerator, id_generator
+
+logger = logging.getLogger("ids")
+
+ID_NODE_LEASE_TTL = float(os.getenv("ID_NODE_LEASE_TTL", "60"))
+ID_NODE_LEASE_MARGIN = float(os.getenv("ID_NODE_LEASE_MARGIN", "10"))
+
+
+class NodeLease:
+    def __init__(
+        self,
+        generator: SnowflakeGenerator = id_generator,
+        session_factory=SessionLocal,
+        async_session_factory=AsyncSessionLocal,
+        ttl: float = ID_NODE_LEASE_TTL,
+        margin: float = ID_NODE_LEASE_MARGIN,
+    ):
+        self.generator = generator
+        self.session_factory = session_factory
+        self.async_session_factory = async_session_factory
+        self.ttl = ttl
+        self.margin = margin
+        self.owner = f"{socket.gethostname()[:40]}:{os.getpid()}:{secrets.token_hex(4)}"
+        self.node_id: int | None = None
+        self._task: asyncio.Task | None = None
+
+    def _confirmed(self, started: float):
+        # measured from before the statement, so the local view never outlives the row
+        self.generator.assign(self.node_id, started + self.ttl - self.margin)
+
+    def claim(self) -> int | None:
+        """Lease a node id for this process (no-op when ID_NODE pins one)."""
+        if self.generator.pinned:
+            return self.generator.node_id
+        started = time.time()
+        db = self.session_factory()
+        try:
+            self.node_id = claim_id_node(db, self.owner, self.ttl, MAX_NODE)
+        finally:
+            db.close()
+        if self.node_id is None:
+            raise RuntimeError(f"All {MAX_NODE + 1} id nodes are leased")
+        self._confirmed(started)
+        logger.info(f"Leased id node {self.node_id} as {self.owner}")
+        return self.node_id
+
+    def _renew(self, db) -> bool:
+        return renew_id_node(db, self.node_id, self.owner, self.ttl)
+
+    async def start(self):
+        if self.node_id is None:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._renew_loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self.node_id is None:
+            return
+        try:
+            async with self.async_session_factory() as db:
+                await db.run_sync(release_id_node, self.node_id, self.owner)
+        except Exception:
+            logger.exception(f"Releasing id node {self.node_id} failed")
+
+    async def _renew_loop(self):
+        while True:
+            await asyncio.sleep(self.ttl / 4)
+            started = time.time()
+            try:
+                async with self.async_session_factory() as db:
+                    renewed = await db.run_sync(self._renew)
+            except Exception:
+                logger.exception(f"Renewing id node {self.node_id} failed")
+                continue
+            if renewed:
+                self._confirmed(started)
+                continue
+
+            logger.error(f"Lost the lease on id node {self.node_id}, leasing a new one")
+            self.generator.assign(None)
+            started = time.time()
+            try:
+                async with self.async_session_factory() as db:
+                    self.node_id = await db.run_sync(claim_id_node, self.owner, self.ttl, MAX_NODE)
+            except Exception:
+                logger.exception("Leasing a new id node failed")
+                self.node_id = None
+            if self.node_id is None:
+                logger.error("No id node available, id generation stays off")
+                return
+            self._confirmed(started)
+
+
+node_lease = NodeLease()
@@ -0,0 +1,84 @@
+# app/utils/ids.py
+import logging
+import math
+import os
+import threading
+import time
+
+from app.config import ENV
+
+logger = logging.getLogger("ids")
+
+# 2025-01-01T00:00:00Z in ms
+EPOCH_MS = 1735689600000
+
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+
+class SnowflakeGenerator:
+    """
+    Time-ordered 63-bit ids: 41 bits of milliseconds, 10 bits of node, 12 bits
+    of sequence. Ids from different processes sort by creation time (to the ms),
+    so they can be handed out before the row reaches the database.
+
+    Every process must use a distinct node id. The app leases one from the
+    database at startup (app.utils.id_nodes); ID_NODE pins it instead, which
+    is only safe for a single process. Until a node is assigned, next_id
+    fails outside dev.
+    """
+
+    def __init__(self, node_id: int | None = None):
+        self.node_id: int | None = None
+        self.pinned = False
+        self._valid_until = math.inf
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+        if node_id is None and os.getenv("ID_NODE"):
+            node_id = int(os.getenv("ID_NODE"))
+        if node_id is not None:
+            self.assign(node_id)
+            self.pinned = True
+
+    def assign(self, node_id: int | None, valid_until: float = math.inf):
+        """
+        Use `node_id` until `valid_until` (epoch seconds), after which next_id
+        fails until the lease is extended; None stops id generation.
+        """
+        if node_id is not None and not 0 <= node_id <= MAX_NODE:
+            raise ValueError(f"Node id {node_id} is outside 0-{MAX_NODE}")
+        with self._lock:
+            self.node_id = node_id
+            self._valid_until = valid_until
+
+    def _check_node(self):
+        if self.node_id is None:
+            if ENV != "dev":
+                raise RuntimeError("No id node assigned to this process")
+            self.node_id = os.getpid() & MAX_NODE
+            logger.warning(f"No id node assigned, using {self.node_id} from the pid (dev only)")
+        elif time.time() > self._valid_until:
+            raise RuntimeError(f"Lease on id node {self.node_id} has expired")
+
+    def next_id(self) -> int:
+        with self._lock:
+            self._check_node()
+            now = int(time.time() * 1000) - EPOCH_MS
+            # never go backwards if the wall clock does
+            if now < self._last_ms:
+                now = self._last_ms
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    # 4096 ids in this ms already, borrow the next one
+                    now += 1
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return (now << (NODE_BITS + SEQUENCE_BITS)) | (self.node_id << SEQUENCE_BITS) | self._sequence
+
+
+id_generator = SnowflakeGenerator()
@@ -0,0 +1,30 @@
+# app/utils/keyset.py
+"""
+Keyset ("seek") pagination on (timestamp, id), newest first.
+
+SQLite keeps datetimes as text and compares them as strings. Values written
+by CURRENT_TIMESTAMP have no fractional seconds while bound datetimes always
+carry them, so a row at exactly `before_ts` would sort below it and come back
+on the next page. There both sides go through datetime() (second precision)
+for the sort and the comparison alike.
+"""
+from datetime import datetime
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+
+def _sqlite(db: Session) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def sort_key(db: Session, column):
+    """`column` as it has to be ordered by and compared."""
+    return func.datetime(column) if _sqlite(db) else column
+
+
+def older_than(db: Session, ts_column, id_column, before_ts: datetime, before_id: int):
+    """Rows after (before_ts, before_id) in (ts_column DESC, id_column DESC) order."""
+    key = sort_key(db, ts_column)
+    bound = func.datetime(before_ts) if _sqlite(db) else before_ts
+    return or_(key < bound, and_(key == bound, id_column < before_id))
@@ -4,10 +4,10 @@ from fastapi.requests import Request
 from pydantic import EmailStr, BaseModel
 import os
 import base64
-import qrcode
-from io import BytesIO
 import tempfile
 
+from app.utils.qr import qr_cache
+
 
 conf = ConnectionConfig(
     MAIL_USERNAME = os.getenv("MAIL_USERNAME"),
@@ -39,19 +39,9 @@ async def send_confirmation_email(email: str, token: str):
     await fm.send_message(message)
 
 
-def generate_qr_bytes(ticket_code: str) -> bytes:
-    qr = qrcode.QRCode(
-        version=1, box_size=10, border=4, error_correction=qrcode.constants.ERROR_CORRECT_H
-    )
-    qr.add_data(ticket_code)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
-
 async def send_ticket_email(email: EmailStr, ticket_code: str, event_name: str):
-    qr_bytes = generate_qr_bytes(ticket_code)
+    # email clients need a raster image; shares the endpoint's cached PNG
+    qr_bytes, _ = qr_cache.get_png(ticket_code)
 
     # 🔹 Save QR image temporarily (FastAPI-Mail needs a path)
     with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
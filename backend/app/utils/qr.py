@@ -1,19 +1,175 @@
-# app/utils/qrcode_utils.py
+# app/utils/qr.py
+"""
+QR rendering shared by the ticket endpoint and the mailer.
+
+The module matrix is computed once by `qrcode`; the images are then drawn
+directly from it: SVG as one <path> of row runs, PNG as a two-colour palette
+image (1 bit per pixel) scaled with nearest-neighbour, instead of Pillow
+drawing every module as an RGB box.
+"""
+import hashlib
+import logging
+import os
+import tempfile
 import qrcode
 from io import BytesIO
-import base64
+from PIL import Image
 
-def generate_qr_bytes(ticket_code: str) -> bytes:
-    """Generate QR PNG bytes from a ticket code."""
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger("qr")
+
+QR_MEMORY_CACHE_SIZE = int(os.getenv("QR_MEMORY_CACHE_SIZE", "2048"))
+# empty string disables the disk tier
+QR_CACHE_DIR = os.getenv("QR_CACHE_DIR", os.path.join(tempfile.gettempdir(), "rff-qr-cache"))
+
+QR_SCALE = int(os.getenv("QR_SCALE", "10"))
+QR_BORDER = int(os.getenv("QR_BORDER", "4"))
+MAX_SCALE = 40
+MAX_BORDER = 10
+
+# bump when the renderer output changes, so cached images and ETags roll over
+RENDER_VERSION = 3
+ERROR_CORRECTION = "H"
+_ERROR_CORRECTION = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+
+MEDIA_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+
+def qr_matrix(data: str, border: int = QR_BORDER) -> list[list[bool]]:
+    """Module matrix (True = dark) including the quiet zone."""
     qr = qrcode.QRCode(
         version=1,
-        box_size=10,
-        border=4,
-        error_correction=qrcode.constants.ERROR_CORRECT_H,
+        border=border,
+        error_correction=_ERROR_CORRECTION[ERROR_CORRECTION],
     )
-    qr.add_data(ticket_code)
+    qr.add_data(data)
     qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
+    return qr.get_matrix()
+
+
+# palette index 0 = white (light module), 1 = black (dark module)
+_PALETTE = [255, 255, 255, 0, 0, 0]
+
+
+def render_png(data: str, scale: int = QR_SCALE, border: int = QR_BORDER) -> bytes:
+    """1-bit palette PNG (colour type 3), `scale` pixels per module."""
+    matrix = qr_matrix(data, border)
+    size = len(matrix)
+    img = Image.new("P", (size, size))
+    img.putpalette(_PALETTE)
+    img.putdata([1 if dark else 0 for row in matrix for dark in row])
+    if scale > 1:
+        img = img.resize((size * scale, size * scale), Image.NEAREST)
     buf = BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
\ No newline at end of file
+    img.save(buf, format="PNG", bits=1, optimize=True)
+    return buf.getvalue()
+
+
+def render_svg(data: str, scale: int = QR_SCALE, border: int = QR_BORDER) -> bytes:
+    """SVG in module units (viewBox), displayed at `scale` px per module."""
+    matrix = qr_matrix(data, border)
+    size = len(matrix)
+    runs = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and row[x]:
+                x += 1
+            runs.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+    px = size * scale
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{px}" height="{px}" '
+        f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path fill="#000" d="{"".join(runs)}"/></svg>'
+    ).encode()
+
+
+RENDERERS = {
+    "png": render_png,
+    "svg": render_svg,
+}
+
+
+def generate_qr_bytes(ticket_code: str) -> bytes:
+    """Generate QR PNG bytes from a ticket code."""
+    return render_png(ticket_code)
+
+
+def render_key(ticket_code: str, fmt: str = "png", scale: int = QR_SCALE, border: int = QR_BORDER) -> str:
+    """
+    Content address of a rendered QR: the image is fully determined by the
+    code and the render parameters, so this doubles as its strong ETag.
+    """
+    raw = f"v{RENDER_VERSION}|{fmt}|ec={ERROR_CORRECTION},scale={scale},border={border}|{ticket_code}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class QRImageCache:
+    """Rendered QR images: a bounded in-memory LRU in front of an on-disk store."""
+
+    def __init__(self, maxsize: int = QR_MEMORY_CACHE_SIZE, directory: str | None = QR_CACHE_DIR):
+        self.memory = LRUCache(maxsize)
+        self.directory = directory or None
+
+    def get(
+        self, ticket_code: str, fmt: str = "png", scale: int = QR_SCALE, border: int = QR_BORDER
+    ) -> tuple[bytes, str]:
+        """(image bytes, render key) for `ticket_code`, rendering at most once."""
+        key = render_key(ticket_code, fmt, scale, border)
+        data = self.memory.get(key)
+        if data is None:
+            data = self._read_disk(key)
+            if data is None:
+                data = RENDERERS[fmt](ticket_code, scale, border)
+                self._write_disk(key, data)
+            self.memory.put(key, data)
+        return data, key
+
+    def get_png(self, ticket_code: str) -> tuple[bytes, str]:
+        return self.get(ticket_code, "png")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _read_disk(self, key: str) -> bytes | None:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"QR cache read failed: {e}")
+            return None
+
+    def _write_disk(self, key: str, data: bytes):
+        if not self.directory:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # write-then-rename so concurrent readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"QR cache write failed: {e}")
+
+
+qr_cache = QRImageCache()
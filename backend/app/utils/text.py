@@ -0,0 +1,32 @@
+# app/utils/text.py
+import re
+import unicodedata
+
+# cedilla forms still show up in Romanian data next to the comma-below ones
+_FOLD = str.maketrans({
+    "ș": "s", "ş": "s", "ț": "t", "ţ": "t",
+    "Ș": "s", "Ş": "s", "Ț": "t", "Ţ": "t",
+})
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_location(value: str) -> list[str]:
+    """'Brașov, Centru' -> ['brasov', 'centru']: lowercased, diacritics folded."""
+    value = (value or "").translate(_FOLD)
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(c for c in value if not unicodedata.combining(c)).lower()
+    return [w for w in _NON_WORD.split(value) if w]
+
+
+def location_trigrams(value: str) -> set[str]:
+    """
+    Padded word trigrams ('cluj' -> '__c', '_cl', 'clu', 'luj', 'uj_'), the
+    scheme pg_trgm uses, so prefixes and small typos still share most grams.
+    Padding is '_' rather than a space because MySQL's PAD SPACE collations
+    ignore trailing spaces when comparing.
+    """
+    grams = set()
+    for word in normalize_location(value):
+        padded = f"__{word}_"
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
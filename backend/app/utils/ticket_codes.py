@@ -0,0 +1,116 @@
+# app/utils/ticket_codes.py
+"""
+Self-authenticating ticket codes.
+
+    "T" | key id (1 char) | base32(8 random bytes + 5-byte HMAC-SHA256 tag)
+
+e.g. "TD0N2Z87Q27NHD9YRS0YVRS" (23 chars, Crockford base32, upper case). The tag covers the prefix and the random part, so a forged or mistyped
+code is rejected by `is_valid_code` in constant time before any lookup.
+Keys rotate by id: TICKET_CODE_KEYS holds every key still accepted
+("A:<base64>,B:<base64>") and TICKET_CODE_KEY_ID picks the one new codes use.
+
+Without TICKET_CODE_KEYS, dev signs with a fixed development key (id "D"),
+so codes survive restarts and every worker agrees on them; anywhere else
+the keys are required.
+
+Codes issued before this format (32 hex chars, or 8 upper-case chars) carry no
+tag; they are let through to the database while TICKET_CODE_ACCEPT_LEGACY is on.
+"""
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import re
+import secrets
+
+from app.config import ENV
+
+logger = logging.getLogger("tickets")
+
+PREFIX = "T"
+NONCE_BYTES = 8
+TAG_BYTES = 5
+CODE_LENGTH = 2 + 21  # 13 bytes -> 21 base32 chars
+
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"  # Crockford: no I, L, O, U
+_DECODE = {c: i for i, c in enumerate(_ALPHABET)}
+_LEGACY = re.compile(r"^(?:[0-9a-f]{32}|[0-9A-F]{8})$")
+
+TICKET_CODE_ACCEPT_LEGACY = os.getenv("TICKET_CODE_ACCEPT_LEGACY", "true").lower() in ("1", "true", "yes")
+
+# public by construction: never accepted outside dev (see _load_keys)
+DEV_KEY_ID = "D"
+_DEV_KEY = hashlib.sha256(b"rff ticket codes: development key").digest()
+
+
+def _load_keys() -> tuple[dict[str, bytes], str]:
+    raw = os.getenv("TICKET_CODE_KEYS")
+    if not raw:
+        if ENV != "dev":
+            raise RuntimeError("TICKET_CODE_KEYS must be set outside dev")
+        logger.warning("TICKET_CODE_KEYS is not set, using the development key")
+        return {DEV_KEY_ID: _DEV_KEY}, DEV_KEY_ID
+    keys = {}
+    for entry in raw.split(","):
+        kid, _, secret = entry.strip().partition(":")
+        if len(kid) != 1 or kid not in _ALPHABET or not secret:
+            raise ValueError(f"Bad TICKET_CODE_KEYS entry for key id {kid!r}")
+        keys[kid] = base64.b64decode(secret)
+    active = os.getenv("TICKET_CODE_KEY_ID") or next(iter(keys))
+    if active not in keys:
+        raise ValueError(f"TICKET_CODE_KEY_ID {active!r} is not in TICKET_CODE_KEYS")
+    return keys, active
+
+
+KEYS, ACTIVE_KEY_ID = _load_keys()
+
+
+def _b32encode(data: bytes) -> str:
+    n = int.from_bytes(data, "big")
+    chars = []
+    for _ in range((len(data) * 8 + 4) // 5):
+        chars.append(_ALPHABET[n & 31])
+        n >>= 5
+    return "".join(reversed(chars))
+
+
+def _b32decode(text: str, nbytes: int) -> bytes | None:
+    n = 0
+    for c in text:
+        v = _DECODE.get(c)
+        if v is None:
+            return None
+        n = (n << 5) | v
+    if n >> (nbytes * 8):
+        return None
+    return n.to_bytes(nbytes, "big")
+
+
+def _tag(key: bytes, kid: str, nonce: bytes) -> bytes:
+    return hmac.new(key, (PREFIX + kid).encode() + nonce, hashlib.sha256).digest()[:TAG_BYTES]
+
+
+def new_ticket_code() -> str:
+    nonce = secrets.token_bytes(NONCE_BYTES)
+    tag = _tag(KEYS[ACTIVE_KEY_ID], ACTIVE_KEY_ID, nonce)
+    return PREFIX + ACTIVE_KEY_ID + _b32encode(nonce + tag)
+
+
+def is_legacy_code(code: str) -> bool:
+    return bool(_LEGACY.match(code))
+
+
+def is_valid_code(code: str) -> bool:
+    """
+    False for anything that cannot be a ticket we issued; needs no database.
+    Legacy codes pass (when accepted) and still have to be looked up.
+    """
+    if len(code) != CODE_LENGTH or code[0] != PREFIX:
+        return TICKET_CODE_ACCEPT_LEGACY and is_legacy_code(code)
+    key = KEYS.get(code[1])
+    raw = _b32decode(code[2:], NONCE_BYTES + TAG_BYTES)
+    if key is None or raw is None:
+        return False
+    nonce, tag = raw[:NONCE_BYTES], raw[NONCE_BYTES:]
+    return hmac.compare_digest(tag, _tag(key, code[1], nonce))
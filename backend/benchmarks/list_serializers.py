@@ -0,0 +1,93 @@
+"""
+List response rendering: response_model vs the precompiled serializers.
+
+    cd backend && python -m benchmarks.list_serializers [--rows 1000] [--runs 50]
+
+Renders `--rows` Ride ORM objects (RideOut) and ticket rows (TicketOut, as
+returned by crud.ticket.list_user_tickets) to response bytes both ways:
+
+  response_model   what FastAPI does for a route returning the objects:
+                   validate into list[Schema], jsonable_encoder, JSONResponse
+  row_serializer   app.utils.serializers.json_list with row_serializer(Schema)
+
+and checks that both decode to the same JSON.
+"""
+import os
+
+# the models import app.database, which needs a URL; nothing is written to it
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("CHECK_SERIALIZERS", "false")
+
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import parse_obj_as
+
+from app import models, schemas
+from app.models import payment  # noqa: F401  (mapper target of Ticket.payment)
+from app.schemas.ticket import TicketOut, TicketStatus
+from app.utils.serializers import json_list, row_serializer
+
+
+def make_rides(n: int) -> list:
+    start = datetime(2026, 7, 1, 8, 0)
+    return [
+        models.Ride(ride_id=i, driver_id=i % 50, origin=f"Origin {i}", destination="Sibiu", price=30.0 + i % 7,
+                    available_seats=i % 4 + 1, status="open", departure_time=start + timedelta(minutes=i),
+                    origin_lat=46.77, origin_lng=23.6)
+        for i in range(n)
+    ]
+
+
+def make_tickets(n: int) -> list[dict]:
+    start = datetime(2026, 6, 1, 12, 0)
+    return [
+        {"id": i, "firebase_uid": "u1", "event_name": "RFF", "ticket_type": "standard", "date": datetime(2026, 7, 1),
+         "price": Decimal("49.90"), "ticket_code": f"{i:032x}", "status": TicketStatus.active,
+         "purchase_date": start, "created_at": start - timedelta(seconds=i)}
+        for i in range(n)
+    ]
+
+
+def median_ms(fn, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    cases = {
+        "RideOut": (schemas.RideOut, make_rides(args.rows)),
+        "TicketOut": (TicketOut, make_tickets(args.rows)),
+    }
+    print(f"{args.rows} rows, median of {args.runs} runs")
+    for name, (schema, rows) in cases.items():
+        serializer = row_serializer(schema, check=False)
+
+        def via_response_model():
+            return JSONResponse(jsonable_encoder(parse_obj_as(list[schema], rows))).body
+
+        def via_serializer():
+            return json_list(rows, serializer).body
+
+        assert orjson.loads(via_response_model()) == orjson.loads(via_serializer()), name
+        slow, fast = median_ms(via_response_model, args.runs), median_ms(via_serializer, args.runs)
+        print(f"  {name:<10} response_model {slow:8.2f} ms   row_serializer {fast:7.2f} ms   {slow / fast:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
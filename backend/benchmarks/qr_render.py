@@ -0,0 +1,62 @@
+"""
+Render time and size of the QR formats in app.utils.qr.
+
+    cd backend && python -m benchmarks.qr_render [--runs 200] [--code TEXT]
+
+"previous" is the renderer the ticket endpoint and the mailer used before
+app.utils.qr drew images from the module matrix: qrcode's own RGB image at
+box_size=10. Caching is bypassed; every run renders from scratch.
+"""
+import argparse
+import statistics
+import time
+from io import BytesIO
+
+import qrcode
+
+from app.utils import qr
+
+
+def previous_png(data: str) -> bytes:
+    q = qrcode.QRCode(version=1, box_size=10, border=4, error_correction=qrcode.constants.ERROR_CORRECT_H)
+    q.add_data(data)
+    q.make(fit=True)
+    buf = BytesIO()
+    q.make_image(fill_color="black", back_color="white").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+CASES = {
+    "previous PNG": previous_png,
+    "palette PNG": qr.render_png,
+    "SVG": qr.render_svg,
+    "matrix alone": qr.qr_matrix,
+}
+
+
+def measure(fn, data: str, runs: int) -> tuple[float, int | None]:
+    """(median ms, output size in bytes or None)."""
+    out = fn(data)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(data)
+        times.append(time.perf_counter() - start)
+    size = len(out) if isinstance(out, bytes) else None
+    return statistics.median(times) * 1000, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--code", default="RFF-" + "7f3a9c" * 5)
+    args = parser.parse_args()
+
+    print(f"{len(args.code)}-char code, median of {args.runs} runs, scale={qr.QR_SCALE} border={qr.QR_BORDER}")
+    for name, fn in CASES.items():
+        ms, size = measure(fn, args.code, args.runs)
+        print(f"  {name:<14} {ms:7.2f} ms  {f'{size} B' if size is not None else '-':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Seat reservation under contention: many clients hammering one ride.
+
+    cd backend && python -m benchmarks.seat_booking [--clients 32] [--requests 400] [--seats 40]
+
+Phase 1: `--requests` riders request a seat on one ride, spread over
+`--clients` threads each with its own session (crud.ride.request_booking).
+Phase 2: the same threads race to accept every pending booking
+(crud.ride.accept_booking). Reports throughput and latency per phase and
+checks the ride was not oversold.
+
+Uses DATABASE_URL when set (point it at a scratch database: tables are
+created and rides inserted), otherwise a throwaway SQLite file. SQLite
+serializes writers, so run it against MySQL for representative numbers.
+"""
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='rff-bench-')}/bench.db")
+
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import OperationalError
+
+import app.models.payment  # noqa: F401  (mapper targets)
+from app import models
+from app.crud import ride as ride_crud
+from app.database import SessionLocal, init_db
+
+
+def run_phase(clients: int, jobs: list, fn) -> tuple[list, list[float], float]:
+    """Run fn(db, job) for every job on `clients` threads; (results, latencies, wall time)."""
+    local = threading.local()
+    start = threading.Barrier(clients)
+    sessions = []
+
+    def session():
+        if not hasattr(local, "db"):
+            local.db = SessionLocal()
+            sessions.append(local.db)
+            start.wait()
+        return local.db
+
+    def one(job):
+        db = session()
+        t0 = time.perf_counter()
+        try:
+            result = fn(db, job)
+        except (ride_crud.SeatReservationError, OperationalError) as e:
+            db.rollback()
+            result = e
+        return result, time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        # each thread's first job waits at the barrier, so all clients start together
+        out = list(pool.map(one, jobs))
+    wall = time.perf_counter() - t0
+    for db in sessions:
+        db.close()
+    return [r for r, _ in out], [t for _, t in out], wall
+
+
+def report(name: str, results: list, latencies: list[float], wall: float, ok):
+    lat = sorted(latencies)
+    p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))]
+    errors = sum(isinstance(r, OperationalError) for r in results)
+    print(
+        f"  {name:<8} {len(results) / wall:8.0f} req/s   p50 {statistics.median(lat) * 1000:7.2f} ms   "
+        f"p99 {p99 * 1000:7.2f} ms   ok {sum(ok(r) for r in results):5d}   db errors {errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--seats", type=int, default=40)
+    args = parser.parse_args()
+    if args.requests < args.clients:
+        parser.error("--requests must be at least --clients")
+
+    init_db()
+    db = SessionLocal()
+    ride = models.Ride(driver_id=1, origin="Cluj", destination="Sibiu", available_seats=args.seats, price=30)
+    db.add(ride)
+    db.commit()
+    ride_id = ride.ride_id
+
+    print(f"{args.clients} clients, {args.requests} riders, one ride with {args.seats} seats ({db.get_bind().dialect.name})")
+    results, latencies, wall = run_phase(
+        args.clients, list(range(args.requests)),
+        lambda s, i: ride_crud.request_booking(s, ride_id, rider_id=10_000 + i, seats=1),
+    )
+    report("request", results, latencies, wall, lambda r: r is True)
+
+    pending = db.query(models.Booking).filter_by(ride_id=ride_id, status="pending").all()
+    results, latencies, wall = run_phase(args.clients, pending, ride_crud.accept_booking)
+    report("accept", results, latencies, wall, lambda r: r is None)
+
+    db.expire_all()
+    ride = db.get(models.Ride, ride_id)
+    accepted = db.query(models.Booking).filter_by(ride_id=ride_id, status="accepted").count()
+    print(f"  accepted {accepted} of {args.seats} seats, {ride.available_seats} left, status {ride.status}")
+    db.close()
+    if accepted > args.seats or ride.available_seats != args.seats - accepted:
+        raise SystemExit("OVERSOLD")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import os
+import socket
+import tempfile
+
+# the app reads its settings at import time
+_tmp = tempfile.mkdtemp(prefix="rff-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/test.db")
+os.environ.setdefault("ENV", "dev")
+os.environ.setdefault("ID_NODE", "0")
+os.environ.setdefault("QR_CACHE_DIR", os.path.join(_tmp, "qr"))
+os.environ.setdefault("MAIL_FROM", "tickets@example.com")
+# app.utils.mailer validates its fastapi-mail config on import; nothing is sent through it
+os.environ.setdefault("MAIL_USERNAME", "tickets@example.com")
+os.environ.setdefault("MAIL_PASSWORD", "unused")
+os.environ.setdefault("MAIL_SERVER", "127.0.0.1")
+os.environ.setdefault("MAIL_PORT", "25")
+
+import pytest
+from sqlalchemy import event
+
+import app.models  # noqa: F401  (registers every table)
+import app.models.chat  # noqa: F401
+import app.models.payment  # noqa: F401
+import app.models.product  # noqa: F401
+from app.database import ASYNC_DATABASE_URL, Base, SessionLocal, engine
+
+
+@pytest.fixture
+def db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_ride(db):
+    """make_ride(seats=3) adds an open ride and returns its ride_id."""
+    from app import models
+
+    def make(seats: int = 3) -> int:
+        ride = models.Ride(driver_id=1, origin="Cluj", destination="Sibiu", available_seats=seats, price=30)
+        db.add(ride)
+        db.commit()
+        return ride.ride_id
+
+    return make
+
+
+@pytest.fixture
+def async_sessions(db):
+    """
+    async_sessionmaker on the test database for code run under asyncio.run().
+    NullPool: every test runs its own event loop, so no connection may outlive it.
+    """
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+    yield async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture
+def smtp_server():
+    """Local aiosmtpd server; yields (host, port, handler) with handler.messages and handler.sessions."""
+    from aiosmtpd.controller import Controller
+
+    class Handler:
+        def __init__(self):
+            self.messages = []
+            self.sessions = 0
+            self.refuse = set()
+
+        async def handle_EHLO(self, server, session, envelope, hostname, responses):
+            self.sessions += 1
+            session.host_name = hostname
+            return responses
+
+        async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+            if address in self.refuse:
+                return "550 No such user"
+            envelope.rcpt_tos.append(address)
+            return "250 OK"
+
+        async def handle_DATA(self, server, session, envelope):
+            self.messages.append(envelope)
+            return "250 OK"
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    handler = Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        yield "127.0.0.1", port, handler
+    finally:
+        controller.stop()
+
+
+@pytest.fixture
+def statements():
+    """First word of every SQL statement sent to the sync engine while the test runs."""
+    seen: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement.split(None, 1)[0].upper())
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", record)
@@ -0,0 +1,73 @@
+"""Product catalog snapshot: served from memory, reloaded only on change."""
+from sqlalchemy import text
+
+from app.billing.catalog import ProductCatalog, catalog
+from app.models.product import Product
+
+
+def _products(db, *skus: str, cents: int = 5000):
+    for sku in skus:
+        db.add(Product(sku=sku, name=sku.title(), unit_amount_cents=cents))
+    db.commit()
+
+
+def test_warm_snapshot_issues_no_query(db, statements):
+    _products(db, "day", "full")
+    fresh = ProductCatalog()
+    fresh.load(db)
+    statements.clear()
+
+    found = fresh.get_many(db, ["day", "full", "missing"])
+
+    assert sorted(found) == ["day", "full"]
+    assert statements == []
+
+
+def test_orm_edits_invalidate_the_snapshot(db):
+    _products(db, "day")
+    assert catalog.get_many(db, ["day"])["day"].unit_amount_cents == 5000
+
+    product = db.query(Product).filter_by(sku="day").one()
+    product.unit_amount_cents = 6500
+    db.commit()
+
+    assert catalog.get_many(db, ["day"])["day"].unit_amount_cents == 6500
+
+    product.is_active = False
+    db.commit()
+    assert catalog.get_many(db, ["day"]) == {}
+
+
+def test_refresh_reloads_only_when_the_version_moves(db, statements):
+    _products(db, "day")
+    fresh = ProductCatalog()
+    first = fresh.load(db)
+
+    statements.clear()
+    assert fresh.refresh_if_changed(db) is False
+    assert statements == ["SELECT"]  # just the (max(updated_at), count) probe
+    assert fresh.snapshot(db) is first
+
+    # written behind the ORM's back, as another worker would
+    db.execute(text("UPDATE Products SET unit_amount_cents = 7000, updated_at = '2099-01-01 00:00:00'"))
+    db.commit()
+    assert fresh.refresh_if_changed(db) is True
+    assert fresh.get_many(db, ["day"])["day"].unit_amount_cents == 7000
+
+    db.execute(text("INSERT INTO Products (sku, name, unit_amount_cents, currency, is_active, updated_at) "
+                    "VALUES ('vip', 'Vip', 9000, 'eur', 1, '2000-01-01 00:00:00')"))
+    db.commit()
+    assert fresh.refresh_if_changed(db) is True  # count changed, max(updated_at) did not
+    assert "vip" in fresh.get_many(db, ["vip"])
+    assert fresh.refresh_if_changed(db) is False
+
+
+def test_etag_follows_the_content(db):
+    _products(db, "day")
+    fresh = ProductCatalog()
+    before = fresh.load(db).etag
+    assert fresh.load(db).etag == before
+
+    db.query(Product).filter_by(sku="day").one().unit_amount_cents = 5100
+    db.commit()
+    assert fresh.load(db).etag != before
@@ -0,0 +1,80 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from app.chat.broker import ChatBroker, InProcessBroker, RedisBroker
+
+
+def test_broker_interface_is_abstract():
+    class Partial(ChatBroker):
+        async def start(self, handler):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+class Worker:
+    """One uvicorn worker's broker plus whatever it delivered to its sockets."""
+
+    def __init__(self, server: fakeredis.FakeServer):
+        self.broker = RedisBroker("redis://test", client=fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+        self.delivered: list[tuple[int, str]] = []
+        self.got_one = asyncio.Event()
+
+    async def deliver(self, chat_id: int, data: str):
+        self.delivered.append((chat_id, data))
+        self.got_one.set()
+
+
+async def _wait(worker: Worker):
+    await asyncio.wait_for(worker.got_one.wait(), timeout=5)
+    worker.got_one.clear()
+
+
+def test_redis_fan_out_reaches_only_subscribed_workers():
+    async def run():
+        server = fakeredis.FakeServer()
+        a, b, c = Worker(server), Worker(server), Worker(server)
+        for w in (a, b, c):
+            await w.broker.start(w.deliver)
+        await a.broker.subscribe(1)
+        await b.broker.subscribe(1)
+        await c.broker.subscribe(2)
+
+        await c.broker.publish(1, '{"content": "hi"}')
+        await _wait(a)
+        await _wait(b)
+
+        await b.broker.unsubscribe(1)
+        await c.broker.publish(1, '{"content": "again"}')
+        await _wait(a)
+        await asyncio.sleep(0.2)
+
+        for w in (a, b, c):
+            await w.broker.stop()
+        return a, b, c
+
+    a, b, c = asyncio.run(run())
+    assert a.delivered == [(1, '{"content": "hi"}'), (1, '{"content": "again"}')]
+    assert b.delivered == [(1, '{"content": "hi"}')]
+    assert c.delivered == []
+
+
+def test_in_process_broker_delivers_subscribed_chats():
+    async def run():
+        broker = InProcessBroker()
+        delivered = []
+
+        async def deliver(chat_id, data):
+            delivered.append((chat_id, data))
+
+        await broker.start(deliver)
+        await broker.subscribe(1)
+        await broker.publish(1, "x")
+        await broker.publish(2, "y")
+        await broker.stop()
+        return delivered
+
+    assert asyncio.run(run()) == [(1, "x")]
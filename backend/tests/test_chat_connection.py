@@ -0,0 +1,99 @@
+"""Per-socket send queues and the hub's shutdown."""
+import asyncio
+
+from app.chat.broker import InProcessBroker
+from app.chat.connection import OVERFLOW_CLOSE_CODE, ChatConnection
+from app.chat.hub import ChatHub
+
+
+class SlowSocket:
+    """WebSocket stand-in whose sends wait until `release` is set."""
+
+    def __init__(self, fail: bool = False):
+        self.release = asyncio.Event()
+        self.sent: list[str] = []
+        self.closed_with: int | None = None
+        self.fail = fail
+
+    async def send_text(self, data: str):
+        await self.release.wait()
+        if self.fail:
+            raise ConnectionResetError("client went away")
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_drop_oldest_keeps_the_newest_messages():
+    async def run():
+        ws = SlowSocket()
+        conn = ChatConnection(ws, queue_size=3, overflow="drop_oldest")
+        conn.offer("m0")
+        await _settle()  # m0 is now stuck in send_text
+        for i in range(1, 7):
+            conn.offer(f"m{i}")
+        ws.release.set()
+        await _settle()
+        await conn.stop()
+        return ws, conn
+
+    ws, conn = asyncio.run(run())
+
+    assert ws.sent == ["m0", "m4", "m5", "m6"]
+    assert conn.dropped == 3 and ws.closed_with is None
+
+
+def test_disconnect_policy_closes_a_slow_client():
+    async def run():
+        ws = SlowSocket()
+        conn = ChatConnection(ws, queue_size=2, overflow="disconnect")
+        conn.offer("m0")
+        await _settle()
+        for i in range(1, 4):
+            conn.offer(f"m{i}")
+        await conn.stop()  # also waits for the close it started
+        conn.offer("late")
+        return ws, conn
+
+    ws, conn = asyncio.run(run())
+
+    assert ws.closed_with == OVERFLOW_CLOSE_CODE
+    assert conn.closed and conn._task.done() and conn._close_task.done()
+    assert ws.sent == []
+
+
+def test_writer_stops_on_send_failure_and_on_stop():
+    async def run():
+        failing = ChatConnection(SlowSocket(fail=True))
+        failing.offer("m0")
+        failing.websocket.release.set()
+        await _settle()
+        failed_closed = failing.closed and failing._task.done()
+
+        idle = ChatConnection(SlowSocket())
+        await idle.stop()
+        return failed_closed, idle._task.cancelled()
+
+    assert asyncio.run(run()) == (True, True)
+
+
+def test_hub_stop_survives_concurrent_leaves():
+    async def run():
+        hub = ChatHub(InProcessBroker())
+        await hub.start()
+        joined = [(chat_id, await hub.join(chat_id, SlowSocket())) for chat_id in (1, 1, 1, 2, 2)]
+        leaving = [asyncio.create_task(hub.leave(chat_id, conn)) for chat_id, conn in joined]
+        await hub.stop()
+        await asyncio.gather(*leaving)
+        return hub, joined
+
+    hub, joined = asyncio.run(run())
+
+    assert hub._local == {}
+    assert all(conn.closed for _, conn in joined)
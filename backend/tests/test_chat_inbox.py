@@ -0,0 +1,52 @@
+"""Chat inbox ordering and keyset pagination."""
+from datetime import datetime, timedelta
+
+from sqlalchemy import text, update
+
+from app.crud import chat as chat_crud
+from app.models.chat import Chat
+
+
+def _pages(db, uid: str, limit: int) -> list[list[int]]:
+    pages, before = [], None
+    for _ in range(20):  # a keyset that repeats rows never runs out of pages
+        page = chat_crud.get_user_chats(db, uid, limit, before)
+        if not page:
+            break
+        pages.append([c["chat_id"] for c in page])
+        before = (page[-1]["updated_at"], page[-1]["chat_id"])
+    return pages
+
+
+def test_inbox_pages_cover_driver_and_passenger_chats_once(db, make_ride):
+    ride_id = make_ride()
+    chats = [chat_crud.create_chat(db, ride_id, "me", f"p{i}").chat_id for i in range(5)]
+    chats += [chat_crud.create_chat(db, ride_id, f"d{i}", "me").chat_id for i in range(5)]
+    chats.append(chat_crud.create_chat(db, ride_id, "me", "me").chat_id)
+    chat_crud.create_chat(db, ride_id, "someone", "else")
+    # every chat created in the same second, stored the way CURRENT_TIMESTAMP
+    # writes it: only the id orders them
+    db.execute(update(Chat).values(last_activity_at=text("'2026-01-01 12:00:00'")))
+    db.commit()
+
+    pages = _pages(db, "me", limit=4)
+
+    assert [len(p) for p in pages] == [4, 4, 3]
+    assert sum(pages, []) == sorted(chats, reverse=True)
+
+
+def test_inbox_orders_by_last_activity(db, make_ride):
+    ride_id = make_ride()
+    quiet = chat_crud.create_chat(db, ride_id, "me", "p1").chat_id
+    busy = chat_crud.create_chat(db, ride_id, "d1", "me").chat_id
+    newest = chat_crud.create_chat(db, ride_id, "me", "p2").chat_id
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    for chat_id, at in ((quiet, start), (busy, start), (newest, start + timedelta(minutes=1))):
+        db.execute(update(Chat).where(Chat.chat_id == chat_id).values(last_activity_at=at))
+    db.commit()
+
+    chat_crud.save_message(db, busy, "d1", "see you at 8")
+
+    inbox = chat_crud.get_user_chats(db, "me")
+    assert [c["chat_id"] for c in inbox] == [busy, newest, quiet]
+    assert inbox[0]["last_message"] == "see you at 8" and inbox[0]["has_new"]
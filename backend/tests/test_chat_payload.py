@@ -0,0 +1,19 @@
+"""Chat message ids survive a trip through a JavaScript client."""
+import orjson
+
+from app.schemas.chat import message_payload
+from app.utils.ids import id_generator
+
+
+def test_message_ids_go_out_as_exact_strings():
+    first = id_generator.next_id()
+    # ids handed out within one millisecond differ only in the sequence bits
+    ids = [first + k for k in range(5)]
+    assert first > 2**53
+    # what JSON.parse would make of them as numbers
+    assert len({float(i) for i in ids}) < len(ids)
+
+    sent = [orjson.loads(orjson.dumps(message_payload(i, "u1", "hi", "2026-01-01 12:00:00")))["message_id"] for i in ids]
+
+    assert sent == [str(i) for i in ids]
+    assert [int(s) for s in sent] == ids  # before_id is parsed back into the same int
@@ -0,0 +1,92 @@
+"""Write-behind chat persistence during database outages."""
+import asyncio
+
+import pytest
+
+from app.chat import persistence
+from app.chat.persistence import MessageWriter
+
+
+class FlakyDatabase:
+    """Session factory whose first `failures` flushes raise."""
+
+    def __init__(self, failures: int | None):
+        self.failures = failures  # None: never comes back
+        self.attempts = 0
+        self.written: list[dict] = []
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run_sync(self, fn, batch):
+        self.attempts += 1
+        if self.failures is None or self.failures > 0:
+            if self.failures:
+                self.failures -= 1
+            raise ConnectionError("database unavailable")
+        self.written.extend(batch)
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(persistence, "RETRY_DELAY", 0.001)
+    monkeypatch.setattr(persistence, "MAX_RETRY_DELAY", 0.002)
+
+
+def _writer(db: FlakyDatabase, **kwargs) -> MessageWriter:
+    return MessageWriter(session_factory=db, flush_interval=0.001, flush_attempts=3, **kwargs)
+
+
+def test_outage_longer_than_the_attempt_limit_loses_nothing():
+    async def run():
+        db = FlakyDatabase(failures=25)
+        writer = _writer(db)
+        await writer.start()
+        sent = [await writer.submit(1, "u1", f"m{i}") for i in range(5)]
+        while len(db.written) < 5:
+            await asyncio.sleep(0.005)
+        await writer.stop()
+        return db, writer, sent
+
+    db, writer, sent = asyncio.run(run())
+
+    assert db.attempts > 25
+    assert [m["message_id"] for m in db.written] == [m["message_id"] for m in sent]
+    assert writer.dropped == 0
+
+
+def test_stop_gives_up_on_a_dead_database_and_counts_the_drops():
+    async def run():
+        db = FlakyDatabase(failures=None)
+        writer = _writer(db, shutdown_timeout=5)
+        await writer.start()
+        for i in range(4):
+            await writer.submit(1, "u1", f"m{i}")
+        await asyncio.sleep(0.05)  # retrying, well past flush_attempts
+        await asyncio.wait_for(writer.stop(), timeout=2)
+        return writer
+
+    writer = asyncio.run(run())
+
+    assert writer.dropped == 4
+
+
+def test_stop_drains_what_is_queued():
+    async def run():
+        db = FlakyDatabase(failures=2)
+        writer = _writer(db)
+        await writer.start()
+        for i in range(10):
+            await writer.submit(1, "u1", f"m{i}")
+        await writer.stop()
+        return db, writer
+
+    db, writer = asyncio.run(run())
+
+    assert len(db.written) == 10 and writer.dropped == 0
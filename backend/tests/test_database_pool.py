@@ -0,0 +1,25 @@
+"""Engine pool selection per database backend."""
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+from app.database import _pool_options
+from app.utils.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, pool_status
+
+
+def test_server_databases_get_the_instrumented_pool():
+    options = _pool_options("mysql+pymysql://u:p@db/app", InstrumentedQueuePool)
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_size"] > 0
+    assert _pool_options("mysql+aiomysql://u:p@db/app", InstrumentedAsyncQueuePool)["poolclass"] is InstrumentedAsyncQueuePool
+
+
+def test_in_memory_sqlite_keeps_one_shared_connection():
+    assert _pool_options("sqlite://", InstrumentedQueuePool) == {}
+    engine = create_engine("sqlite://", **_pool_options("sqlite://", InstrumentedQueuePool))
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+    with engine.connect() as conn:
+        assert conn.scalar(text("SELECT x FROM t")) == 1
+    assert not isinstance(engine.pool, QueuePool)
+    assert pool_status(engine.pool) == {"pool": type(engine.pool).__name__}
@@ -0,0 +1,109 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+from app.billing.inbox import apply_checkout_completed
+from app.crud import outbox as crud_outbox
+from app.mail.outbox import OutboxWorker
+from app.mail.smtp import SMTPPool
+from app.models.outbox import EmailOutbox
+from app.models.payment import Payment, PaymentStatus
+from app.models.ticket import Ticket
+from app.models.user import User
+
+CART = [{"ticket_type": "Day", "event_name": "RFF", "price": 50.0, "amount_total_cents": 5000, "quantity": 2}]
+
+
+def _unpaid_payment(db) -> Payment:
+    db.add(User(email="ana@example.com", username="ana", firebase_uid="u1"))
+    payment = Payment(firebase_uid="u1", items_json=json.dumps(CART))
+    db.add(payment)
+    db.commit()
+    return payment
+
+
+def test_checkout_commits_payment_tickets_and_email_together(db):
+    payment = _unpaid_payment(db)
+
+    assert apply_checkout_completed(db, {"id": "cs_1", "metadata": {"payment_id": str(payment.id)}})
+
+    db.expire_all()
+    assert db.get(Payment, payment.id).status == PaymentStatus.paid
+    assert db.query(Ticket).filter_by(payment_id=payment.id).count() == 2
+    row = db.query(EmailOutbox).one()
+    assert (row.dedupe_key, row.recipient) == (f"tickets:{payment.id}", "ana@example.com")
+    assert len(json.loads(row.payload)["tickets"]) == 2
+
+
+def test_nothing_is_committed_when_queueing_the_email_fails(db, monkeypatch):
+    payment = _unpaid_payment(db)
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("outbox unavailable")
+
+    monkeypatch.setattr(crud_outbox, "enqueue_email", broken)
+    with pytest.raises(RuntimeError):
+        apply_checkout_completed(db, {"id": "cs_1", "metadata": {"payment_id": str(payment.id)}})
+    db.rollback()
+
+    assert db.get(Payment, payment.id).status == PaymentStatus.pending
+    assert db.query(Ticket).count() == 0
+
+
+def test_replayed_checkout_adds_nothing(db):
+    payment = _unpaid_payment(db)
+    session = {"id": "cs_1", "metadata": {"payment_id": str(payment.id)}}
+
+    apply_checkout_completed(db, session)
+    apply_checkout_completed(db, session)
+
+    assert db.query(Ticket).count() == 2
+    assert db.query(EmailOutbox).count() == 1
+
+
+def _enqueue(db, n: int):
+    for i in range(n):
+        crud_outbox.enqueue_email(db, kind="tickets", dedupe_key=f"tickets:{i}", recipient=f"r{i}@example.com", payload={
+            "event_name": "RFF",
+            "tickets": [{"ticket_code": f"T{i}", "event_name": "RFF", "ticket_type": "Day"}],
+        })
+    db.commit()
+
+
+def test_worker_delivers_due_emails(db, smtp_server):
+    host, port, handler = smtp_server
+    _enqueue(db, 3)
+    worker = OutboxWorker(pool=SMTPPool(host, port, start_tls=False, timeout=5))
+
+    async def run():
+        delivered = await worker.deliver_due()
+        await worker.pool.close()
+        return delivered
+
+    assert asyncio.run(run()) == 3
+    assert sorted(m.rcpt_tos[0] for m in handler.messages) == ["r0@example.com", "r1@example.com", "r2@example.com"]
+    db.expire_all()
+    assert {r.status for r in db.query(EmailOutbox)} == {"sent"}
+    assert worker.stats.sent == 3
+
+
+def test_worker_backs_off_when_the_server_refuses(db, smtp_server):
+    host, port, handler = smtp_server
+    _enqueue(db, 1)
+    handler.refuse.add("r0@example.com")
+    worker = OutboxWorker(pool=SMTPPool(host, port, start_tls=False, timeout=5))
+
+    async def run():
+        await worker.deliver_due()
+        await worker.pool.close()
+
+    asyncio.run(run())
+    db.expire_all()
+    row = db.query(EmailOutbox).one()
+    assert (row.status, row.attempts) == ("pending", 1)
+    assert row.next_attempt_at > datetime.utcnow()
+    assert row.last_error and worker.stats.retried == 1
+    # leased rows aren't handed out again before they are due
+    assert crud_outbox.claim_due_emails(db, 10, 60) == []
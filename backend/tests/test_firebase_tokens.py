@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwt
+
+from app.auth.firebase_tokens import CLOCK_SKEW_SECONDS, FirebaseTokenVerifier, InvalidFirebaseToken
+
+PROJECT = "rff-test"
+_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+PRIVATE_PEM = _key.private_bytes(
+    serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+).decode()
+PUBLIC_PEM = _key.public_key().public_bytes(
+    serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+).decode()
+
+
+def _verifier() -> FirebaseTokenVerifier:
+    verifier = FirebaseTokenVerifier(PROJECT)
+    verifier.keys.load({"k1": PUBLIC_PEM}, max_age=3600)
+    return verifier
+
+
+def _token(**claims) -> str:
+    now = int(time.time())
+    payload = {"aud": PROJECT, "iss": f"https://securetoken.google.com/{PROJECT}", "sub": "u1",
+               "iat": now, "exp": now + 3600, "auth_time": now, **claims}
+    return jwt.encode(payload, PRIVATE_PEM, algorithm="RS256", headers={"kid": "k1"})
+
+
+def test_valid_token():
+    claims = asyncio.run(_verifier().verify(_token()))
+    assert claims["uid"] == "u1"
+
+
+@pytest.mark.parametrize("claim", ["iat", "auth_time"])
+def test_future_issue_times_are_rejected_and_not_cached(claim):
+    verifier = _verifier()
+    token = _token(**{claim: int(time.time()) + 10000})
+
+    with pytest.raises(InvalidFirebaseToken):
+        asyncio.run(verifier.verify(token))
+    assert verifier.cache.get(verifier.cache.key_for(token)) is None
+
+
+def test_issue_time_within_clock_skew_is_accepted():
+    token = _token(iat=int(time.time()) + CLOCK_SKEW_SECONDS // 2)
+    assert asyncio.run(_verifier().verify(token))["uid"] == "u1"
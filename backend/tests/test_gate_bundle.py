@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from app.gate import bundle
+from app.models.ticket import Ticket, TicketStatus
+
+
+def _counts(data: bytes) -> tuple[int, int, int]:
+    return bundle._HEADER.unpack_from(data)[-3:]
+
+
+def _ticket(db, seq: int, status=TicketStatus.active) -> Ticket:
+    ticket = Ticket(firebase_uid="u1", payment_id=1, issue_seq=seq, event_name="RFF", date=datetime(2026, 7, 1),
+                    price=50, status=status)
+    db.add(ticket)
+    db.commit()
+    return ticket
+
+
+def test_full_bundle_is_cached_until_tickets_change(db):
+    _ticket(db, 0)
+    first, version = bundle.build_full_bundle(db)
+
+    again, _ = bundle.build_full_bundle(db)
+    assert again is first
+
+    _ticket(db, 1, TicketStatus.used)
+    data, newer = bundle.build_full_bundle(db)
+    assert newer > version and _counts(data) == (1, 1, 0)
+
+
+def test_deleting_a_ticket_invalidates_the_full_bundle(db):
+    _ticket(db, 0)
+    _ticket(db, 1)
+    # the older ticket, so max(sync_version) stays the same
+    oldest = db.query(Ticket).order_by(Ticket.sync_version).first()
+    data, _ = bundle.build_full_bundle(db)
+    assert _counts(data) == (2, 0, 0)
+
+    db.delete(oldest)
+    db.commit()
+
+    data, _ = bundle.build_full_bundle(db)
+    assert _counts(data) == (1, 0, 0)
@@ -0,0 +1,70 @@
+"""Gate endpoints are for gate staff only."""
+import os
+from datetime import datetime
+
+import pytest
+
+if not os.path.exists("app/firebase_service_account.json"):
+    # app.auth.firebase_verify initialises firebase_admin from it on import
+    pytest.skip("Firebase service account not configured", allow_module_level=True)
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth.firebase_verify import get_current_user
+from app.auth.user_cache import UserSnapshot
+from app.database import get_async_db, get_db
+from app.models.ticket import Ticket, TicketStatus
+from app.models.user import User
+from app.routers import tickets
+
+app = FastAPI()
+app.include_router(tickets.router)
+
+
+@pytest.fixture
+def client(db, async_sessions):
+    async def async_db():
+        async with async_sessions() as session:
+            yield session
+
+    db.add(User(user_id=1, firebase_uid="uid-1", email="a@example.com", username="a", role="user"))
+    db.commit()
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_async_db] = async_db
+    # the cached snapshot always claims staff; only the role in the database counts
+    user = UserSnapshot(1, "uid-1", "a@example.com", "a", None, None, "staff", True)
+    app.dependency_overrides[get_current_user] = lambda: user
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def _as(db, role: str):
+    db.get(User, 1).role = role
+    db.commit()
+
+
+def test_scan_requires_gate_staff(client, db):
+    ticket = Ticket(firebase_uid="u1", payment_id=1, issue_seq=0, event_name="RFF", date=datetime(2026, 7, 1),
+                    price=50, status=TicketStatus.active)
+    db.add(ticket)
+    db.commit()
+
+    _as(db, "user")
+    assert client.post(f"/api/tickets/scan/{ticket.ticket_code}").status_code == 403
+    assert client.post("/api/tickets/scan", json={"codes": [ticket.ticket_code]}).status_code == 403
+    db.refresh(ticket)
+    assert ticket.status == TicketStatus.active
+
+    _as(db, "staff")
+    resp = client.post("/api/tickets/scan", json={"codes": [ticket.ticket_code, ticket.ticket_code]})
+    assert resp.status_code == 200
+    assert [r["verdict"] for r in resp.json()["results"]] == ["admitted", "already_used"]
+
+
+def test_revoked_role_applies_at_once(client, db):
+    _as(db, "staff")
+    assert client.post("/api/tickets/scan", json={"codes": ["nope"]}).status_code == 200
+
+    _as(db, "user")
+    assert client.post("/api/tickets/scan", json={"codes": ["nope"]}).status_code == 403
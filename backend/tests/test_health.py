@@ -0,0 +1,54 @@
+"""The /api/health endpoints are for staff only."""
+import os
+
+import pytest
+
+if not os.path.exists("app/firebase_service_account.json"):
+    # app.auth.firebase_verify initialises firebase_admin from it on import
+    pytest.skip("Firebase service account not configured", allow_module_level=True)
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth.firebase_verify import get_current_user
+from app.auth.user_cache import UserSnapshot
+from app.database import get_async_db
+from app.models.user import User
+from app.routers import health
+
+HEALTH = ["/api/health/db-pool", "/api/health/email-outbox", "/api/health/stripe-events"]
+
+app = FastAPI()
+app.include_router(health.router)
+
+
+def _as(db, role: str):
+    # the role is read from the database, not from the cached snapshot
+    user = UserSnapshot(1, "uid-1", "a@example.com", "a", None, None, "staff", True)
+    app.dependency_overrides[get_current_user] = lambda: user
+    db.merge(User(user_id=1, firebase_uid="uid-1", email="a@example.com", username="a", role=role))
+    db.commit()
+
+
+@pytest.fixture
+def client(db, async_sessions):
+    async def async_db():
+        async with async_sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = async_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize("path", HEALTH)
+def test_health_requires_a_token(client, path):
+    assert client.get(path).status_code == 401
+
+
+@pytest.mark.parametrize("path", HEALTH)
+def test_health_is_staff_only(client, db, path):
+    _as(db, "user")
+    assert client.get(path).status_code == 403
+    _as(db, "staff")
+    assert client.get(path).status_code == 200
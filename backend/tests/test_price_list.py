@@ -0,0 +1,43 @@
+"""/api/payment/prices is cacheable by ETag."""
+import os
+
+import pytest
+
+if not os.path.exists("app/firebase_service_account.json"):
+    # app.auth.firebase_verify initialises firebase_admin from it on import
+    pytest.skip("Firebase service account not configured", allow_module_level=True)
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.database import get_db
+from app.models.product import Product
+from app.routers import payment
+
+app = FastAPI()
+app.include_router(payment.router)
+
+
+@pytest.fixture
+def client(db):
+    app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_prices_carry_an_etag_and_revalidate(client, db):
+    db.add(Product(sku="day", name="Day", unit_amount_cents=5000))
+    db.commit()
+
+    first = client.get("/api/payment/prices")
+    assert first.status_code == 200
+    assert [p["sku"] for p in first.json()] == ["day"]
+    etag = first.headers["etag"]
+
+    cached = client.get("/api/payment/prices", headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.headers["etag"] == etag and not cached.content
+
+    db.query(Product).filter_by(sku="day").one().unit_amount_cents = 5500
+    db.commit()
+    changed = client.get("/api/payment/prices", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
@@ -0,0 +1,24 @@
+"""QR rendering: the PNG is a 1-bit palette image of the module matrix."""
+import struct
+from io import BytesIO
+
+from PIL import Image
+
+from app.utils.qr import qr_matrix, render_png
+
+CODE = "RFF-" + "7f3a9c" * 5
+
+
+def test_png_is_a_one_bit_palette_image():
+    png = render_png(CODE, scale=3, border=2)
+
+    width, height, bit_depth, colour_type = struct.unpack(">IIBB", png[16:26])
+    assert (bit_depth, colour_type) == (1, 3)  # 1 bit per pixel, indexed colour
+
+    matrix = qr_matrix(CODE, border=2)
+    assert width == height == len(matrix) * 3
+
+    img = Image.open(BytesIO(png)).convert("L")
+    for y, row in enumerate(matrix):
+        for x, dark in enumerate(row):
+            assert img.getpixel((x * 3 + 1, y * 3 + 1)) == (0 if dark else 255)
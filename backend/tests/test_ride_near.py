@@ -0,0 +1,74 @@
+"""Proximity search over the origin geohash, and keeping it right on edits."""
+from app import schemas
+from app.crud import ride as ride_crud
+from app.utils.geo import KM_PER_DEGREE_LAT, geohash_encode
+
+
+def _ride(db, lat=None, lng=None, origin="Cluj", seats=3):
+    return ride_crud.create_ride(
+        db,
+        schemas.RideCreate(
+            origin=origin, destination="Sibiu", price=30, available_seats=seats, origin_lat=lat, origin_lng=lng
+        ),
+        driver_id=1,
+    )
+
+
+def _near(db, lat, lng, radius_km):
+    return [r.ride_id for r in ride_crud.search_rides_near(db, lat, lng, radius_km)]
+
+
+def test_nearest_first_with_free_seats_only(db):
+    far = _ride(db, 46.80, 23.60)
+    near = _ride(db, 46.771, 23.590)
+    _ride(db, 46.770, 23.589, seats=0)
+    _ride(db)  # no coordinates
+
+    rides = ride_crud.search_rides_near(db, 46.770, 23.589, radius_km=5)
+
+    assert [r.ride_id for r in rides] == [near.ride_id, far.ride_id]
+    assert rides[0].distance_km < 0.2 < rides[1].distance_km < 5
+
+
+def test_rides_across_a_cell_boundary_are_found(db):
+    # (0, 0) splits the four top-level cells, so these share no geohash prefix
+    neighbours = [_ride(db, lat, lng) for lat, lng in ((0.005, 0.005), (-0.005, 0.005), (0.005, -0.005), (-0.005, -0.005))]
+    assert len({geohash_encode(r.origin_lat, r.origin_lng, 1) for r in neighbours}) == 4
+
+    assert sorted(_near(db, 0.001, 0.001, radius_km=2)) == [r.ride_id for r in neighbours]
+
+
+def test_radius_not_the_bounding_box_decides(db):
+    step = 1.9 / KM_PER_DEGREE_LAT  # degrees for 1.9 km at the equator
+    inside = _ride(db, step, 0.0)
+    corner = _ride(db, step, step)  # inside the 2 km box, ~2.7 km away
+
+    assert _near(db, 0.0, 0.0, radius_km=2) == [inside.ride_id]
+    assert _near(db, 0.0, 0.0, radius_km=3) == [inside.ride_id, corner.ride_id]
+
+
+def test_moving_the_origin_without_coordinates_clears_them(db):
+    ride = _ride(db, 46.770, 23.589)
+
+    ride_crud.update_ride(db, ride.ride_id, schemas.RideUpdate(origin="Brasov"))
+
+    assert (ride.origin_lat, ride.origin_lng, ride.origin_geohash) == (None, None, None)
+    assert _near(db, 46.770, 23.589, radius_km=5) == []
+
+
+def test_new_coordinates_move_the_ride(db):
+    ride = _ride(db, 46.770, 23.589)
+
+    ride_crud.update_ride(db, ride.ride_id, schemas.RideUpdate(origin="Brasov", origin_lat=45.657, origin_lng=25.601))
+
+    assert ride.origin_geohash == geohash_encode(45.657, 25.601)
+    assert _near(db, 46.770, 23.589, radius_km=5) == []
+    assert _near(db, 45.657, 25.601, radius_km=5) == [ride.ride_id]
+
+
+def test_other_edits_keep_the_coordinates(db):
+    ride = _ride(db, 46.770, 23.589)
+
+    ride_crud.update_ride(db, ride.ride_id, schemas.RideUpdate(destination="Brasov", available_seats=2))
+
+    assert _near(db, 46.770, 23.589, radius_km=5) == [ride.ride_id]
@@ -0,0 +1,27 @@
+"""Editing a ride keeps the location search index in step."""
+from app import schemas
+from app.crud import ride as ride_crud
+
+
+def test_update_ride_reindexes_a_changed_route(db):
+    ride = ride_crud.create_ride(
+        db, schemas.RideCreate(origin="Cluj", destination="Sibiu", price=30, available_seats=3), driver_id=1
+    )
+
+    ride_crud.update_ride(db, ride.ride_id, schemas.RideUpdate(origin="Brasov"))
+
+    assert [r.ride_id for r in ride_crud.search_rides(db, "Brasov", "Sibiu")] == [ride.ride_id]
+    assert ride_crud.search_rides(db, "Cluj", "") == []
+    db.refresh(ride)
+    assert (ride.destination, ride.available_seats, ride.status) == ("Sibiu", 3, "open")
+
+
+def test_update_ride_changes_only_the_fields_sent(db):
+    ride = ride_crud.create_ride(
+        db, schemas.RideCreate(origin="Cluj", destination="Sibiu", price=30, available_seats=3), driver_id=1
+    )
+
+    ride_crud.update_ride(db, ride.ride_id, schemas.RideUpdate(available_seats=0, status="full"))
+
+    db.refresh(ride)
+    assert (ride.origin, ride.available_seats, ride.status) == ("Cluj", 0, "full")
@@ -0,0 +1,60 @@
+"""Seat booking under contention: many riders racing for one ride's seats."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import OperationalError
+
+from app import models
+from app.crud import ride as ride_crud
+from app.database import SessionLocal
+
+SEATS = 5
+RIDERS = 24
+
+
+def _race(fn, n: int) -> list:
+    start = threading.Barrier(n)
+
+    def run(i):
+        start.wait()
+        db = SessionLocal()
+        try:
+            return fn(db, i)
+        except (ride_crud.SeatReservationError, OperationalError) as e:
+            return e
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        return list(pool.map(run, range(n)))
+
+
+def test_concurrent_accepts_never_overbook(db, make_ride):
+    ride_id = make_ride(SEATS)
+    for rider in range(RIDERS):
+        assert ride_crud.request_booking(db, ride_id, rider_id=100 + rider, seats=1)
+    bookings = db.query(models.Booking).filter_by(ride_id=ride_id).all()
+
+    results = _race(lambda s, i: ride_crud.accept_booking(s, bookings[i]), RIDERS)
+
+    db.expire_all()
+    ride = db.get(models.Ride, ride_id)
+    accepted = db.query(models.Booking).filter_by(ride_id=ride_id, status="accepted").count()
+    assert accepted == SEATS
+    assert ride.available_seats == 0 and ride.status == "full"
+    assert sum(1 for r in results if r is None) == SEATS
+    assert all(r is None or isinstance(r, ride_crud.SeatReservationError) for r in results)
+
+
+def test_concurrent_multi_seat_accepts_never_overbook(db, make_ride):
+    ride_id = make_ride(SEATS)
+    for rider in range(RIDERS):
+        ride_crud.request_booking(db, ride_id, rider_id=100 + rider, seats=2)
+    bookings = db.query(models.Booking).filter_by(ride_id=ride_id).all()
+
+    _race(lambda s, i: ride_crud.accept_booking(s, bookings[i]), len(bookings))
+
+    db.expire_all()
+    taken = sum(b.seats_reserved for b in db.query(models.Booking).filter_by(ride_id=ride_id, status="accepted"))
+    assert taken <= SEATS
+    assert db.get(models.Ride, ride_id).available_seats == SEATS - taken >= 0
@@ -0,0 +1,63 @@
+"""Precompiled list serializers encode exactly what response_model would."""
+from datetime import datetime
+
+import orjson
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from app import schemas
+from app.crud import ride as ride_crud
+from app.crud import ticket as crud_ticket
+from app.models.ticket import Ticket, TicketStatus
+from app.schemas.ticket import TicketOut
+from app.utils.serializers import json_list, row_serializer
+
+
+def _body(rows, serializer=None):
+    return orjson.loads(json_list(rows, serializer).body)
+
+
+def _rides(db):
+    for i, (origin, lat) in enumerate((("Cluj", 46.77), ("Turda", 46.57), ("Sibiu", None))):
+        ride_crud.create_ride(
+            db,
+            schemas.RideCreate(origin=origin, destination="Brasov", price=30.5 + i, available_seats=3,
+                               origin_lat=lat, origin_lng=23.6 if lat else None),
+            driver_id=1,
+        )
+
+
+def test_ride_serializer_matches_ride_out(db):
+    _rides(db)
+    rides = ride_crud.get_rides(db)
+    near = ride_crud.search_rides_near(db, 46.77, 23.6, 50)  # sets distance_km
+    assert any(r.distance_km for r in near)
+
+    for rows in (rides, near):
+        expected = [jsonable_encoder(schemas.RideOut.from_orm(r)) for r in rows]
+        assert _body(rows, row_serializer(schemas.RideOut, check=False)) == expected
+
+
+def test_ticket_rows_match_ticket_out(db):
+    for i, status in enumerate((TicketStatus.active, TicketStatus.used, TicketStatus.pending)):
+        db.add(Ticket(firebase_uid="u1", payment_id=1, issue_seq=i, event_name="RFF", ticket_type="vip",
+                      date=datetime(2026, 7, 1, 18, 30), price="49.90", status=status))
+    db.commit()
+
+    rows = crud_ticket.list_user_tickets(db, "u1")
+    tickets = {t.id: t for t in db.query(Ticket).all()}
+    expected = [jsonable_encoder(TicketOut.from_orm(tickets[r["id"]])) for r in rows]
+
+    assert len(rows) == 3
+    assert _body(rows, row_serializer(TicketOut, check=False)) == expected
+
+
+def test_checked_serializer_rejects_rows_that_drift_from_the_schema():
+    serialize = row_serializer(TicketOut, check=True)
+    row = {"id": 1, "firebase_uid": "u1", "event_name": "RFF", "ticket_type": "vip", "date": datetime(2026, 7, 1),
+           "price": 49.9, "ticket_code": "c", "status": TicketStatus.active, "purchase_date": datetime(2026, 6, 1),
+           "created_at": None}
+    assert serialize(row) == row
+
+    with pytest.raises(ValueError):
+        serialize({**row, "price": "49.90"})  # would go out as a string, response_model makes it a float
@@ -0,0 +1,69 @@
+import asyncio
+from email.message import EmailMessage
+
+import aiosmtplib
+import pytest
+
+from app.mail.smtp import SMTPPool
+
+
+def _message(to: str = "ana@example.com") -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = "tickets@example.com"
+    msg["To"] = to
+    msg["Subject"] = "Tickets"
+    msg.set_content("hello")
+    return msg
+
+
+def _pool(smtp_server) -> SMTPPool:
+    host, port, _ = smtp_server
+    return SMTPPool(host, port, start_tls=False, size=2, timeout=5)
+
+
+def test_connections_are_reused(smtp_server):
+    pool = _pool(smtp_server)
+
+    async def run():
+        for _ in range(5):
+            await pool.send(_message())
+        await pool.close()
+
+    asyncio.run(run())
+    handler = smtp_server[2]
+    assert len(handler.messages) == 5
+    assert handler.sessions == 1
+
+
+def test_failed_send_discards_the_connection(smtp_server):
+    pool = _pool(smtp_server)
+    smtp_server[2].refuse.add("nobody@example.com")
+
+    async def run():
+        await pool.send(_message())
+        reused = pool._idle._queue[-1]
+        # fails on the reused connection with something other than a disconnect
+        with pytest.raises(aiosmtplib.SMTPRecipientsRefused):
+            await pool.send(_message("nobody@example.com"))
+        assert pool._idle.qsize() == 0
+        assert not reused.is_connected
+        await pool.send(_message())
+        await pool.close()
+
+    asyncio.run(run())
+    handler = smtp_server[2]
+    assert len(handler.messages) == 2
+    assert handler.sessions == 2
+
+
+def test_closed_idle_connection_is_replaced(smtp_server):
+    pool = _pool(smtp_server)
+
+    async def run():
+        await pool.send(_message())
+        pool._idle._queue[-1].close()
+        await pool.send(_message())
+        await pool.close()
+
+    asyncio.run(run())
+    assert len(smtp_server[2].messages) == 2
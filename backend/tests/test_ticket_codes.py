@@ -0,0 +1,62 @@
+"""Self-authenticating ticket codes."""
+import base64
+
+import pytest
+
+from app.utils import ticket_codes
+from app.utils.ticket_codes import CODE_LENGTH, _load_keys, is_valid_code, new_ticket_code
+
+
+def test_new_codes_validate():
+    codes = {new_ticket_code() for _ in range(100)}
+    assert len(codes) == 100
+    assert all(len(c) == CODE_LENGTH and is_valid_code(c) for c in codes)
+
+
+def test_a_changed_character_is_rejected():
+    code = new_ticket_code()
+    for i in range(2, CODE_LENGTH):
+        swapped = "1" if code[i] != "1" else "2"
+        assert not is_valid_code(code[:i] + swapped + code[i + 1:])
+
+
+def test_unknown_key_id_is_rejected():
+    code = new_ticket_code()
+    other = next(k for k in "ABC" if k != code[1])
+    assert not is_valid_code(code[0] + other + code[2:])
+
+
+def test_legacy_codes_pass_only_while_accepted(monkeypatch):
+    legacy = ["0123456789abcdef0123456789abcdef", "AB12CD34"]
+    assert all(is_valid_code(c) for c in legacy)
+    assert not is_valid_code("0123456789ABCDEF0123456789ABCDEF")
+
+    monkeypatch.setattr(ticket_codes, "TICKET_CODE_ACCEPT_LEGACY", False)
+    assert not any(is_valid_code(c) for c in legacy)
+
+
+def test_dev_key_is_stable_across_processes(monkeypatch):
+    monkeypatch.delenv("TICKET_CODE_KEYS", raising=False)
+    assert _load_keys() == _load_keys() == ({"D": ticket_codes._DEV_KEY}, "D")
+
+
+def test_keys_are_required_outside_dev(monkeypatch):
+    monkeypatch.delenv("TICKET_CODE_KEYS", raising=False)
+    monkeypatch.setattr(ticket_codes, "ENV", "prod")
+    with pytest.raises(RuntimeError):
+        _load_keys()
+
+
+def test_rotated_keys_keep_old_codes_valid(monkeypatch):
+    a, b = base64.b64encode(b"a" * 32).decode(), base64.b64encode(b"b" * 32).decode()
+    monkeypatch.setenv("TICKET_CODE_KEYS", f"A:{a},B:{b}")
+    monkeypatch.setenv("TICKET_CODE_KEY_ID", "A")
+    monkeypatch.setattr(ticket_codes, "KEYS", _load_keys()[0])
+    monkeypatch.setattr(ticket_codes, "ACTIVE_KEY_ID", "A")
+    old = new_ticket_code()
+
+    monkeypatch.setattr(ticket_codes, "ACTIVE_KEY_ID", "B")
+    new = new_ticket_code()
+
+    assert (old[1], new[1]) == ("A", "B")
+    assert is_valid_code(old) and is_valid_code(new)
@@ -0,0 +1,49 @@
+"""Paging through a user's tickets with the (created_at, id) keyset."""
+from datetime import datetime
+
+from sqlalchemy import text, update
+
+from app.crud import ticket as crud_ticket
+from app.models.ticket import Ticket, TicketStatus
+
+
+def _tickets(db, n: int, payment_id: int = 1) -> list[int]:
+    tickets = [
+        Ticket(firebase_uid="u1", payment_id=payment_id, issue_seq=i, event_name="RFF", date=datetime(2026, 7, 1),
+               price=50, status=TicketStatus.active)
+        for i in range(n)
+    ]
+    db.add_all(tickets)
+    db.commit()
+    return [t.id for t in tickets]
+
+
+def _page(db, before=None, limit=3):
+    rows = crud_ticket.list_user_tickets(db, "u1", limit=limit, before=before)
+    return [r["id"] for r in rows], (rows[-1]["created_at"], rows[-1]["id"]) if rows else None
+
+
+def test_two_pages_do_not_overlap_when_tickets_share_a_timestamp(db):
+    ids = _tickets(db, 5)
+    # one purchase: every ticket gets the same server-side created_at, as func.now() writes it
+    db.execute(update(Ticket).values(created_at=text("'2026-06-01 12:00:00'")))
+    db.commit()
+
+    first, cursor = _page(db)
+    second, _ = _page(db, before=cursor)
+
+    assert first == sorted(ids, reverse=True)[:3]
+    assert second == sorted(ids, reverse=True)[3:]
+
+
+def test_pages_follow_created_at_then_id(db):
+    older, newer = _tickets(db, 2, payment_id=1), _tickets(db, 2, payment_id=2)
+    db.execute(update(Ticket).where(Ticket.id.in_(older)).values(created_at=text("'2026-06-01 12:00:00'")))
+    db.execute(update(Ticket).where(Ticket.id.in_(newer)).values(created_at=text("'2026-06-02 09:30:00'")))
+    db.commit()
+
+    first, cursor = _page(db, limit=3)
+    second, _ = _page(db, before=cursor, limit=3)
+
+    assert first == sorted(newer, reverse=True) + [max(older)]
+    assert second == [min(older)]
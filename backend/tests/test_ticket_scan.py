@@ -0,0 +1,66 @@
+"""Gate scanning: verdicts, duplicates and chunked batches."""
+from datetime import datetime
+
+from app.crud import ticket as crud_ticket
+from app.models.ticket import Ticket, TicketStatus
+from app.schemas.ticket import ScanVerdict
+from app.utils.ticket_codes import new_ticket_code
+
+V = ScanVerdict
+
+
+def _ticket(db, status: TicketStatus, seq: int = 0) -> str:
+    ticket = Ticket(firebase_uid="u1", payment_id=1, issue_seq=seq, event_name="RFF", date=datetime(2026, 7, 1),
+                    price=50, status=status)
+    db.add(ticket)
+    db.commit()
+    return ticket.ticket_code
+
+
+def test_single_scan_verdicts(db):
+    codes = {s: _ticket(db, s, i) for i, s in enumerate(TicketStatus)}
+
+    verdict, used_at = crud_ticket.scan_ticket(db, codes[TicketStatus.active])
+    assert verdict == V.admitted and used_at is not None
+    assert crud_ticket.scan_ticket(db, codes[TicketStatus.active])[0] == V.already_used
+    assert crud_ticket.scan_ticket(db, codes[TicketStatus.used])[0] == V.already_used
+    assert crud_ticket.scan_ticket(db, codes[TicketStatus.pending])[0] == V.not_paid
+    assert crud_ticket.scan_ticket(db, codes[TicketStatus.cancelled])[0] == V.cancelled
+    # well-formed but never issued, and forged
+    assert crud_ticket.scan_ticket(db, new_ticket_code()) == (V.invalid, None)
+    assert crud_ticket.scan_ticket(db, "T" + "D" * 22) == (V.invalid, None)
+
+
+def test_batch_verdicts_in_input_order(db):
+    active, used = _ticket(db, TicketStatus.active, 0), _ticket(db, TicketStatus.used, 1)
+    pending, cancelled = _ticket(db, TicketStatus.pending, 2), _ticket(db, TicketStatus.cancelled, 3)
+    unknown = new_ticket_code()
+
+    results = crud_ticket.scan_tickets(db, [unknown, active, used, pending, cancelled, "garbage"])
+
+    assert [v for _, v, _ in results] == [V.invalid, V.admitted, V.already_used, V.not_paid, V.cancelled, V.invalid]
+    assert [c for c, _, _ in results][:2] == [unknown, active]
+    db.expire_all()
+    assert db.query(Ticket).filter_by(ticket_code=active).one().status == TicketStatus.used
+
+
+def test_duplicate_code_in_a_batch_is_admitted_once(db):
+    code = _ticket(db, TicketStatus.active)
+
+    results = crud_ticket.scan_tickets(db, [code, code, code])
+
+    assert [v for _, v, _ in results] == [V.admitted, V.already_used, V.already_used]
+    assert len({used_at for _, _, used_at in results}) == 1
+
+
+def test_batch_spanning_several_chunks(db, monkeypatch):
+    monkeypatch.setattr(crud_ticket, "SCAN_CHUNK_SIZE", 3)
+    active = [_ticket(db, TicketStatus.active, i) for i in range(7)]
+    used = _ticket(db, TicketStatus.used, 7)
+
+    results = crud_ticket.scan_tickets(db, active[:4] + [used] + active[4:])
+
+    verdicts = [v for _, v, _ in results]
+    assert verdicts == [V.admitted] * 4 + [V.already_used] + [V.admitted] * 3
+    db.expire_all()
+    assert db.query(Ticket).filter(Ticket.status == TicketStatus.used).count() == 8
@@ -0,0 +1,71 @@
+"""firebase_uid -> UserSnapshot cache in front of the Users table."""
+import pytest
+
+from app.auth import user_cache
+from app.crud import user as crud_user
+from app.models.user import User
+from app.utils import cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+
+def _user(**overrides):
+    values = dict(user_id=7, firebase_uid="uid-7", email="ana@example.com", username="ana", role="user")
+    return User(**{**values, **overrides})
+
+
+def test_put_snapshots_the_row():
+    snapshot = user_cache.put(_user(first_name="Ana"))
+
+    assert user_cache.get("uid-7") is snapshot
+    assert (snapshot.user_id, snapshot.username, snapshot.first_name, snapshot.role) == (7, "ana", "Ana", "user")
+
+
+def test_legacy_rows_are_keyed_by_the_token_uid():
+    legacy = _user(firebase_uid=None)
+
+    user_cache.put(legacy)
+    assert len(user_cache._users) == 0
+
+    user_cache.put(legacy, "uid-from-token")
+    assert user_cache.get("uid-from-token").user_id == 7
+
+
+def test_invalidate_and_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    user_cache.put(_user())
+    user_cache.put(_user(user_id=8, firebase_uid="uid-8", email="b@example.com", username="b"))
+
+    user_cache.invalidate("uid-7")
+    user_cache.invalidate(None)
+    assert user_cache.get("uid-7") is None
+    assert user_cache.get("uid-8") is not None
+
+    now[0] += user_cache.USER_CACHE_TTL
+    assert user_cache.get("uid-8") is None
+
+
+def test_ensure_serves_from_cache_until_a_write(db, statements):
+    first = crud_user.ensure_user_from_firebase(db, firebase_uid="u1", email="ana@example.com")
+    statements.clear()
+
+    assert crud_user.ensure_user_from_firebase(db, firebase_uid="u1", email="ana@example.com") is first
+    assert statements == []
+
+    crud_user.upsert_user_from_firebase(db, firebase_uid="u1", email="ana@example.com", first_name="Ana")
+    assert user_cache.get("u1") is None
+    assert crud_user.ensure_user_from_firebase(db, firebase_uid="u1", email="ana@example.com").first_name == "Ana"
+
+
+def test_uncommitted_snapshot_is_cached_on_commit(db):
+    snapshot = crud_user.ensure_user_from_firebase(db, firebase_uid="u1", email="ana@example.com", commit=False)
+    assert user_cache.get("u1") is None
+
+    db.commit()
+    assert user_cache.get("u1") == snapshot
@@ -0,0 +1,62 @@
+from sqlalchemy.dialects import mysql
+
+from app.crud import user as crud_user
+from app.models.user import User
+
+ROW = ["SAVEPOINT", "INSERT", "RELEASE"]  # one upsert statement inside its savepoint
+
+
+def test_insert_is_one_statement(db, statements):
+    snapshot = crud_user.upsert_user_from_firebase(db, firebase_uid="u1", email="ana@example.com")
+
+    assert statements == ROW
+    assert (snapshot.firebase_uid, snapshot.email, snapshot.username, snapshot.role) == ("u1", "ana@example.com", "ana", "user")
+
+
+def test_changed_fields_are_one_statement(db, statements):
+    crud_user.upsert_user_from_firebase(db, firebase_uid="u1", email="ana@example.com")
+    statements.clear()
+
+    snapshot = crud_user.upsert_user_from_firebase(db, firebase_uid="u1", email="ana@example.org", first_name="Ana")
+
+    assert statements == ROW
+    assert (snapshot.email, snapshot.first_name, snapshot.username) == ("ana@example.org", "Ana", "ana")
+
+
+def test_unchanged_user_writes_nothing(db, statements):
+    first = crud_user.upsert_user_from_firebase(db, firebase_uid="u1", email="ana@example.com")
+    statements.clear()
+
+    again = crud_user.upsert_user_from_firebase(db, firebase_uid="u1", email="ana@example.com")
+
+    # the conditional update matches no row, so the snapshot is read back
+    assert statements == ROW + ["SELECT"]
+    assert again == first
+
+
+def test_username_clash_allocates_another(db):
+    crud_user.upsert_user_from_firebase(db, firebase_uid="u1", email="ana@example.com")
+
+    snapshot = crud_user.upsert_user_from_firebase(db, firebase_uid="u2", email="ana@example.org")
+
+    assert snapshot.username != "ana" and snapshot.username.startswith("ana_")
+    assert db.query(User).count() == 2
+
+
+def test_clash_keeps_the_callers_transaction_usable(db):
+    crud_user.upsert_user_from_firebase(db, firebase_uid="u1", email="ana@example.com")
+
+    crud_user.upsert_user_from_firebase(db, firebase_uid="u2", email="ana@example.org", commit=False)
+    db.add(User(email="bob@example.com", username="bob", firebase_uid="u3"))
+    db.commit()
+
+    assert {u.firebase_uid for u in db.query(User)} == {"u1", "u2", "u3"}
+
+
+def test_mysql_update_is_guarded_by_firebase_uid():
+    values = {"firebase_uid": "u1", "email": "ana@example.com", "username": "ana",
+              "first_name": None, "last_name": None, "is_verified": True, "role": "user"}
+
+    sql = str(crud_user._upsert_statement("mysql", values, ["email"]).compile(dialect=mysql.dialect()))
+
+    assert "ON DUPLICATE KEY UPDATE email = if(`Users`.firebase_uid = VALUES(firebase_uid), VALUES(email), `Users`.email)" in sql
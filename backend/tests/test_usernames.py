@@ -0,0 +1,67 @@
+"""Username allocation for new accounts: one lookup, retried only on a lost race."""
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.crud import user as crud_user
+from app.database import SessionLocal
+from app.models.user import User
+
+
+def _users(db, *usernames: str):
+    for name in usernames:
+        db.add(User(email=f"{name}@example.com", username=name))
+    db.commit()
+
+
+@pytest.fixture
+def allocations(monkeypatch):
+    """Records the `exclude` set of every allocate_username call made by the signup path."""
+    calls = []
+    allocate = crud_user.allocate_username
+
+    def recording(db, base, exclude=frozenset()):
+        calls.append(set(exclude))
+        return allocate(db, base, exclude)
+
+    monkeypatch.setattr(crud_user, "allocate_username", recording)
+    return calls
+
+
+def test_popular_base_costs_one_lookup(db, statements):
+    _users(db, "ana", "ana_1", "ana_2", "ana_3")
+    statements.clear()
+
+    user = crud_user.add_user_with_unique_username(db, User(email="new@example.com"), "ana")
+
+    assert statements == ["SELECT", "INSERT"]
+    assert user.username.startswith("ana_") and user.username not in {"ana_1", "ana_2", "ana_3"}
+
+
+def test_lost_race_allocates_again_without_the_lost_name(db, allocations, monkeypatch):
+    allocate = crud_user.allocate_username
+
+    def racing(db, base, exclude=frozenset()):
+        name = allocate(db, base, exclude)
+        if len(allocations) == 1:
+            # another signup commits the same name between our lookup and our insert
+            with SessionLocal() as other:
+                _users(other, name)
+        return name
+
+    monkeypatch.setattr(crud_user, "allocate_username", racing)
+
+    user = crud_user.add_user_with_unique_username(db, User(email="new@example.com"), "ana")
+
+    assert allocations == [set(), {"ana"}]
+    assert user.username == "ana_1"
+    assert db.query(User).count() == 2
+
+
+def test_duplicate_email_is_raised(db, allocations):
+    _users(db, "ana")
+
+    with pytest.raises(IntegrityError):
+        crud_user.add_user_with_unique_username(db, User(email="ana@example.com"), "maria")
+
+    assert allocations == [set()]
+    assert db.query(User).count() == 1
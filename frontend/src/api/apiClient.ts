@@ -124,4 +124,28 @@ export async function apiFetchBlob(
   }
 
   return await res.blob();
-}
\ No newline at end of file
+}
+
+/**
+ * apiFetchAll - Fetch every item of a keyset-paginated list endpoint.
+ *
+ * Requests pages of `limit` items, passing the `before_ts` / `before_id`
+ * that `cursor` returns for the last item of the previous page, until a
+ * short page comes back.
+ */
+export async function apiFetchAll<T>(
+  url: string,
+  cursor: (item: T) => [string, number],
+  limit = 200
+): Promise<T[]> {
+  const items: T[] = [];
+  const base = `${url}${url.includes("?") ? "&" : "?"}limit=${limit}`;
+  let next = base;
+  for (;;) {
+    const page = await apiFetch<T[]>(next);
+    items.push(...page);
+    if (page.length < limit) return items;
+    const [beforeTs, beforeId] = cursor(page[page.length - 1]);
+    next = `${base}&before_ts=${encodeURIComponent(beforeTs)}&before_id=${beforeId}`;
+  }
+}
@@ -1,4 +1,4 @@
-import { apiFetch } from "./apiClient";
+import { apiFetch, apiFetchAll } from "./apiClient";
 
 // const API_BASE = import.meta.env.VITE_API_BASE_URL || "http://localhost:8000";
 
@@ -44,12 +44,23 @@ export async function createTicket(type: string) {
 //   return data;
 // }
 
+export type MyTicket = {
+  id: number;
+  event_name: string;
+  ticket_type: string;
+  ticket_code: string;
+  status: string;
+  purchase_date: string;
+  created_at: string;
+};
+
 /**
  * Get all tickets belonging to the currently authenticated Firebase user.
+ * /api/tickets/me is paginated (newest first), so this follows every page.
  */
-export async function getMyTickets() {
-  const data = await apiFetch("/api/tickets/me");
-  console.log("Fetched tickets:", data);
+export async function getMyTickets(): Promise<MyTicket[]> {
+  const data = await apiFetchAll<MyTicket>("/api/tickets/me", (t) => [t.created_at, t.id]);
+  console.log("Fetched tickets:", data.length);
   return data;
 }
 
@@ -17,7 +17,8 @@ import { apiFetch } from "../api/apiClient";
 import { useNavigate, useParams } from "react-router-dom";
 
 type Message = {
-  message_id: number;
+  // 64-bit id sent as a string: a JS number would round it
+  message_id: string;
   sender_uid: string;
   content: string;
   timestamp: string;
@@ -84,7 +85,7 @@ useEffect(() => {
 
     let canceled = false;
 
-    const loadMessages = async (beforeId?: number) => {
+    const loadMessages = async (beforeId?: string) => {
       try {
         const res = await apiFetch<Message[]>(
           `/api/chat/${chatId}/messages?limit=30${beforeId ? `&before_id=${beforeId}` : ""}`
@@ -7,13 +7,13 @@ import {
   Typography, Divider, Paper, CircularProgress, Chip,
 } from "@mui/material";
 import { useNavigate } from "react-router-dom";
-import { apiFetch } from "../api/apiClient";
+import { apiFetchAll } from "../api/apiClient";
 
 type ChatListItem = {
   chat_id: number;
   title: string;
   last_message?: string;
-  updated_at?: string;
+  updated_at: string;
   has_new?: boolean;
 };
 
@@ -42,7 +42,8 @@ export default function ChatsListPage() {
     async function loadChats() {
       setLoading(true);
       try {
-        const data = await apiFetch<ChatListItem[]>("/api/chat/list");
+        // /api/chat/list is paginated (most recent first); follow every page
+        const data = await apiFetchAll<ChatListItem>("/api/chat/list", (c) => [c.updated_at, c.chat_id]);
         setChats(data);
       } catch (e) {
         console.error(e);
@@ -24,6 +24,7 @@ import { doc, getDoc, updateDoc } from "firebase/firestore";
 import { logoutUser } from "../firebase/auth";
 import { useNavigate } from "react-router-dom";
 import { apiFetch } from "../api/apiClient"; 
+import { getMyTickets } from "../api/tickets";
 
 interface Ticket {
   id: number;
@@ -74,11 +75,7 @@ export default function Profile() {
           }
 
           // 🔹 Fetch user tickets securely from backend
-          const ticketRes = await apiFetch("/api/tickets/me");
-          if (ticketRes.ok) {
-            const userTickets = await ticketRes.json();
-            setTickets(userTickets);
-          }
+          setTickets(await getMyTickets());
         } catch (err) {
           console.error("Profile fetch error:", err);
         }